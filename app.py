@@ -4,6 +4,11 @@ import dash_bootstrap_components as dbc
 from flask import request
 import uuid
 import json
+import os
+import tempfile
+from utils.session_store import SessionStore, DiretorioBackend
+from utils.memo_filtros import MemoFiltros
+from utils import cta_api, figuras, metricas
 
 app = dash.Dash(
     __name__,
@@ -45,16 +50,76 @@ def set_data():
         return {"status": "Erro", "message": "Requisição não é JSON"}
     data = request.json
     session_id = str(uuid.uuid4())
+    # O token vai só para o job da carga; o session_control pode estar em disco
     session_control[session_id] = {
-        "token": data.get("token"),
         "dtDe": data.get("dtDe"),
         "dtA": data.get("dtA"),
         "guid": session_id,
         "id": data.get("id"),
+        # Outros workers esperam em vez de iniciar outra carga (ingestao.aguardar)
+        "status": "na_fila",
     }
+    # A busca no BIExpress começa agora, enquanto o navegador abre /loading
+    from pages.loading import ingestao
+
+    ingestao.iniciar(session_id, token=data.get("token"))
 
     return {"status": "Sucesso", "session_id": session_id}
 
-session_control = {}
-session_dataframes_cta_express = {}
-session_dataframes_cta_checkout = {}
+
+def _session_backend(nome: str):
+    if static.Settings.SessionBackend != "diretorio":
+        return None
+    base = static.Settings.SessionDir or os.path.join(
+        tempfile.gettempdir(), "serverbi_sessoes"
+    )
+    return DiretorioBackend(os.path.join(base, nome))
+
+
+session_control = SessionStore(
+    ttl=static.Settings.SessionTTL,
+    backend=_session_backend("controle"),
+)
+session_dataframes_cta_express = SessionStore(
+    max_bytes=static.Settings.SessionMaxMB * 1024 * 1024,
+    ttl=static.Settings.SessionTTL,
+    backend=_session_backend("cta_express"),
+)
+session_dataframes_cta_checkout = SessionStore(
+    max_bytes=static.Settings.SessionMaxMB * 1024 * 1024,
+    ttl=static.Settings.SessionTTL,
+    backend=_session_backend("cta_checkout"),
+)
+
+# Resultados por estado de filtro; a versão muda a cada carga da sessão
+memo_filtros = MemoFiltros(
+    max_entradas=static.Settings.MemoEntradas,
+    max_bytes=static.Settings.MemoMaxMB * 1024 * 1024,
+    versao=lambda session_id: (session_control.get(session_id) or {}).get("versao"),
+)
+session_dataframes_cta_express.ao_expulsar(memo_filtros.remover_sessao)
+# Páginas leem só os frames; os parâmetros da sessão expiram junto com eles
+session_dataframes_cta_express.ao_acessar(session_control.tocar_sessao)
+
+# Template enxuto do projeto como padrão das figuras (ver utils/figuras.py)
+figuras.registrar_templates()
+
+# Tempo, CPU e bytes de cada callback, e caches em memória, em /metrics
+if static.Settings.Metricas:
+    metricas.instrumentar_callbacks(app)
+    metricas.registro.estatisticas(
+        "serverbi_store", session_control.estatisticas, store="controle"
+    )
+    metricas.registro.estatisticas(
+        "serverbi_store",
+        session_dataframes_cta_express.estatisticas,
+        store="cta_express",
+    )
+    metricas.registro.estatisticas(
+        "serverbi_store",
+        session_dataframes_cta_checkout.estatisticas,
+        store="cta_checkout",
+    )
+    metricas.registro.estatisticas("serverbi_memo", memo_filtros.estatisticas)
+    metricas.registro.estatisticas("serverbi_biexpress", cta_api.cliente.metricas)
+    metricas.publicar(server, static.Settings.MetricasToken)
@@ -1,5 +1,6 @@
+import os
 import dash_bootstrap_components as dbc
-from dash import html, dcc
+from dash import html, dcc, dash_table, Input, Output, State
 from urllib.parse import unquote
 
 
@@ -10,6 +11,53 @@ class Pictures:
 
 class Settings:
     StoreConfig = "memory"
+    # Orçamento de memória (MB) e inatividade máxima (s) das sessões em memória
+    SessionMaxMB = int(os.environ.get("SERVERBI_SESSION_MAX_MB", "2048"))
+    SessionTTL = int(os.environ.get("SERVERBI_SESSION_TTL", "3600"))
+    # "memoria" mantém as sessões só no processo; "diretorio" grava em
+    # SessionDir (Feather) para que todos os workers do gunicorn enxerguem
+    SessionBackend = os.environ.get("SERVERBI_SESSION_BACKEND", "memoria")
+    SessionDir = os.environ.get("SERVERBI_SESSION_DIR", "")
+    # "colunar" lê a resposta do GetBIExpress em streaming direto para colunas
+    IngestMode = os.environ.get("SERVERBI_INGESTAO", "padrao")
+    # Endereço do GetBIExpress (o id vai no fim); benchmarks/stub_biexpress.py
+    # sobe um substituto local para testes de carga
+    BIExpressURL = os.environ.get(
+        "SERVERBI_BIEXPRESS_URL", "http://159.112.183.102:9021/api/v3.0.0/GetBIExpress/"
+    )
+    # Timeouts (s) e tentativas em erro 5xx nas chamadas ao BIExpress
+    ApiConnectTimeout = float(os.environ.get("SERVERBI_API_CONNECT_TIMEOUT", "10"))
+    ApiReadTimeout = float(os.environ.get("SERVERBI_API_READ_TIMEOUT", "300"))
+    ApiRetries = int(os.environ.get("SERVERBI_API_RETRIES", "3"))
+    # Cargas do BIExpress em paralelo por worker (iniciadas no /set_biexpress)
+    IngestWorkers = int(os.environ.get("SERVERBI_INGEST_WORKERS", "4"))
+    # Cache do BIExpress por dia de emissão: "1" liga; os dias de hoje em
+    # diante são reaproveitados por CacheHojeTTL segundos
+    CacheDias = os.environ.get("SERVERBI_CACHE_DIAS", "0") == "1"
+    CacheDir = os.environ.get("SERVERBI_CACHE_DIR", "")
+    CacheHojeTTL = int(os.environ.get("SERVERBI_CACHE_HOJE_TTL", "300"))
+    # Arquivo .jsonl que recebe o relatório de cada carga (vazio desliga)
+    IngestRelatorio = os.environ.get("SERVERBI_INGEST_RELATORIO", "")
+    # Resultados guardados por estado de filtro: entradas por sessão (0
+    # desliga; cada gráfico é uma entrada) e orçamento total em MB
+    MemoEntradas = int(os.environ.get("SERVERBI_MEMO_ENTRADAS", "128"))
+    MemoMaxMB = int(os.environ.get("SERVERBI_MEMO_MAX_MB", "256"))
+    # Opções devolvidas por busca nos dropdowns sem lista completa (produto)
+    BuscaLimite = int(os.environ.get("SERVERBI_BUSCA_LIMITE", "50"))
+    # Linhas por página nas tabelas dos modais "Ver detalhes"
+    DetalhePagina = int(os.environ.get("SERVERBI_DETALHE_PAGINA", "20"))
+    # Casas decimais dos floats nas figuras enviadas (utils/figuras.py) e
+    # "1" para imprimir o tamanho de cada figura antes/depois da compactação
+    FiguraCasas = int(os.environ.get("SERVERBI_FIGURA_CASAS", "4"))
+    FiguraMedir = os.environ.get("SERVERBI_FIGURA_MEDIR", "0") == "1"
+    # Clientes desenhados um a um no mapa do resumo; acima disso o mapa usa
+    # a grade de células do zoom (utils/mapa.py)
+    MapaPontos = int(os.environ.get("SERVERBI_MAPA_PONTOS", "5000"))
+    # Histogramas por callback e rota /metrics (Prometheus, utils/metricas.py):
+    # "1" liga; a rota pede o MetricasToken como Bearer ou, sem token, só
+    # responde a requisições da própria máquina
+    Metricas = os.environ.get("SERVERBI_METRICAS", "0") == "1"
+    MetricasToken = os.environ.get("SERVERBI_METRICAS_TOKEN", "")
 
 
 class Colors:
@@ -111,6 +159,10 @@ class Graphcs:
 
     defaultColor = Colors.colorGraphcs
     _styleColors = styleConfig(Colors.themecolor)
+    # Números são formatados no navegador: as figuras levam só as colunas
+    # numéricas e o Plotly aplica o d3-format (",.2f") com os separadores
+    # pt-BR (vírgula decimal, ponto de milhar), sem coluna de texto por valor
+    separadores = ",."
     globalTemplate = {
         "paper_bgcolor": _styleColors.back_pri_color,
         "plot_bgcolor": _styleColors.back_pri_color,
@@ -129,9 +181,28 @@ class Graphcs:
         },
         "margin": {"l": 30, "r": 30, "t": 30, "b": 30},
         "colorway": [defaultColor],
+        "separators": separadores,
     }
     pxGraficos = 350
 
+    # Formatos d3 para o hover_data do plotly express ({coluna: formato})
+    hoverValor = ":,.2f"
+    hoverInteiro = ":,.0f"
+
+    def formato(campo: str = "y", casas: int = 2, prefixo: str = "") -> str:
+        """Trecho de hovertemplate/texttemplate: formato("x", 0, "R$ ") -> "R$ %{x:,.0f}"."""
+        return f"{prefixo}%{{{campo}:,.{casas}f}}"
+
+    def moeda(fig, *rotulos: str):
+        """Põe "R$ " antes dos valores de ``rotulos`` no hover do plotly express."""
+        for trace in fig.data:
+            if trace.hovertemplate:
+                for rotulo in rotulos:
+                    trace.hovertemplate = trace.hovertemplate.replace(
+                        f"{rotulo}=%{{", f"{rotulo}=R$ %{{"
+                    )
+        return fig
+
 
 class packCode:
     def HeaderDash(
@@ -544,19 +615,35 @@ class packCode:
             ),
         ]
 
-    def detailModal(title: str, fig, df, pageTag: str, figTag: str):
+    def detailModal(title: str, pageTag: str, figTag: str):
+        """
+        Modal vazio: gráfico e tabela chegam pelo callback da página quando
+        ele abre (ver utils/detalhes.py).
+        """
         return dbc.Modal(
             [
                 dbc.ModalHeader(title),
                 dbc.ModalBody(
                     [
-                        dcc.Graph(figure=fig),
+                        dcc.Loading(dcc.Graph(id=f"graph-{pageTag}-det-fig{figTag}")),
                         html.Hr(),
-                        dbc.Table.from_dataframe(
-                            df,
-                            striped=True,
-                            bordered=True,
-                            hover=True,
+                        dash_table.DataTable(
+                            id=f"tabela-{pageTag}-det-fig{figTag}",
+                            columns=[],
+                            data=[],
+                            page_action="custom",
+                            page_current=0,
+                            page_size=Settings.DetalhePagina,
+                            sort_action="custom",
+                            sort_mode="single",
+                            sort_by=[],
+                            locale_format={"decimal": ",", "group": "."},
+                            style_table={"overflowX": "auto"},
+                            style_cell={"textAlign": "left", "padding": "8px"},
+                            style_header={"backgroundColor": "#f8f9fa", "fontWeight": "bold"},
+                            style_data_conditional=[
+                                {"if": {"row_index": "odd"}, "backgroundColor": "rgba(0,0,0,0.05)"}
+                            ],
                         ),
                     ]
                 ),
@@ -575,7 +662,67 @@ class packCode:
         )
 
 
+class Interface:
+    """
+    Callbacks de estado só de interface (abrir/fechar modal, collapse e
+    offcanvas) registrados como clientside: o clique alterna ``is_open`` no
+    navegador, sem requisição ao servidor.
+    """
+
+    # Alterna is_open quando algum botão já foi clicado; o último argumento
+    # é o is_open atual
+    alternarJS = """
+    function () {
+        const cliques = Array.from(arguments);
+        const aberto = cliques.pop();
+        if (!cliques.some(Boolean)) {
+            return window.dash_clientside.no_update;
+        }
+        return !aberto;
+    }
+    """
+
+    def alternar(app, alvo: str, *botoes: str, prevent_initial_call: bool = False):
+        """Alterna o ``is_open`` de ``alvo`` a cada clique em um dos ``botoes``."""
+        app.clientside_callback(
+            Interface.alternarJS,
+            Output(alvo, "is_open"),
+            [Input(botao, "n_clicks") for botao in botoes],
+            State(alvo, "is_open"),
+            prevent_initial_call=prevent_initial_call,
+        )
+
+    def collapseFiltros(app, pageTag: str):
+        """Collapse de filtros do HeaderDash."""
+        Interface.alternar(
+            app, f"{pageTag}collapse-filters", f"{pageTag}collapse-button"
+        )
+
+    def modaisDetalhe(app, pageTag: str, figTags):
+        """Modais "Ver detalhes" (packCode.detailModal) de cada ``figTag``."""
+        for figTag in figTags:
+            Interface.alternar(
+                app,
+                f"modal-{pageTag}-det-fig{figTag}",
+                f"btn-{pageTag}-det-fig{figTag}",
+                f"close-modal-{pageTag}-det-fig{figTag}",
+            )
+
+
 class supportClass:
+    def idMetrica(pageTag: str, nome) -> str:
+        return f"{pageTag}_metric_{nome}"
+
+    def saidasMetricas(pageTag: str, nomes) -> list:
+        """
+        Outputs do valor de cada métrica do HeaderDash: a troca de filtro
+        atualiza só esses textos, sem reenviar os cards.
+        """
+        return [Output(supportClass.idMetrica(pageTag, nome), "children") for nome in nomes]
+
+    def valoresMetricas(lstMetric: dict, nomes) -> list:
+        return [lstMetric[nome]["valor"] for nome in nomes]
+
     def dictHeaderDash(pageTag: str, lstMetric: dict):
         retMetrics = []
         for key, value in lstMetric.items():
@@ -612,7 +759,7 @@ class supportClass:
                                         dbc.Col(
                                             html.H5(
                                                 value["valor"],
-                                                id=f"{pageTag}_metric_{key_str}",
+                                                id=supportClass.idMetrica(pageTag, key_str),
                                                 className="card-text p-0",
                                                 style={
                                                     "fontSize": "15px",
@@ -644,7 +791,14 @@ class supportClass:
             # Check if filter should be single-select
             is_multi = value.get("multi", True)  # Default to multi=True for backward compatibility
             
-            if is_multi:
+            # "busca": sem opções no layout; um callback de search_value
+            # responde com as correspondências (ver utils/busca.py)
+            is_busca = value.get("busca", False)
+
+            if is_busca:
+                dropdown_options = [value["valueDefault"]]
+                dropdown_value = [value["valueDefault"]] if is_multi else value["valueDefault"]
+            elif is_multi:
                 dropdown_options = ["Todos"] + sorted(value["distValue"])
                 dropdown_value = [value["valueDefault"]]
             else:
@@ -660,6 +814,7 @@ class supportClass:
                             options=dropdown_options,
                             value=dropdown_value,
                             id=key_str,
+                            **({"placeholder": "Digite para buscar..."} if is_busca else {}),
                         ),
                     ],
                     width=column_width,
@@ -0,0 +1,626 @@
+"""
+benchmarks/concorrencia.py
+Teste de carga com vários analistas simultâneos contra um servidor de verdade.
+
+Sobe o stub do BIExpress (benchmarks/stub_biexpress.py, latência e tamanho
+do retorno configuráveis), sobe o servidor (``--comando``, por padrão
+gunicorn com ``--workers`` e ``--threads``) apontado para o stub por
+SERVERBI_BIEXPRESS_URL e, para cada nível de ``--usuarios``, põe N usuários
+virtuais para fazer o caminho do navegador:
+
+POST /set_biexpress -> /loading?session_id= (carga e redirecionamento para
+o resumo) -> cada página de ``--paginas`` pelos links da barra -> troca do
+filtro de cidade, quando a página tem.
+
+Cada usuário reproduz o que o renderer do Dash faria: lê /_dash-layout e
+/_dash-dependencies, acompanha os componentes que cada resposta coloca ou
+tira da página (os dcc.Location assumem a URL ao montar e quando ela muda)
+e dispara em /_dash-update-component os callbacks do servidor cujas
+entradas mudaram ou acabaram de aparecer, até ``--paralelos`` por vez, como
+as conexões do navegador. Callbacks clientside não geram requisição.
+
+Por nível, o relatório traz vazão (requisições/s e sessões/min), p50, p95 e
+p99 das requisições, de cada etapa (tempo até a página ficar pronta) e de
+cada callback, erros e o pico de RSS do servidor (soma do processo e dos
+filhos, lida em /proc). Com ``--url`` usa um servidor já no ar (subido com
+SERVERBI_BIEXPRESS_URL apontando para o stub, ``--porta-stub``) e o RSS
+vem de ``--pid``.
+
+O gerador de carga roda em threads de um processo só; para centenas de
+usuários, vale rodar mais de uma instância.
+
+Uso: python -m benchmarks.concorrencia [--usuarios 1,5,10,20] [--itens 100000]
+     [--latencia 1.0] [--workers 1] [--threads 8] [--saida concorrencia.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+
+from benchmarks import dados
+from benchmarks.stub_biexpress import StubBIExpress
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROTA_CALLBACKS = "/_dash-update-component"
+PAGINAS = ("resumo", "cubagem", "entregas", "km")
+PERIODO = ("01/12/2024", "31/12/2024")
+COMANDO = (
+    "gunicorn -w {workers} --threads {threads} -b {host}:{porta} --timeout 600 "
+    "index:server"
+)
+# Rodadas de callbacks encadeados por ação antes de desistir (laço na página)
+RODADAS = 30
+
+
+def _callbacks(dependencias: list) -> list[dict]:
+    """Callbacks do servidor de /_dash-dependencies, com as saídas separadas."""
+    callbacks = []
+    for dependencia in dependencias:
+        saida = dependencia["output"]
+        if dependencia.get("clientside_function") or dependencia.get("no_output"):
+            continue
+        entradas = dependencia["inputs"] + dependencia["state"]
+        # Ids com padrão (dict) não são usados pelas páginas do CTA Express
+        if "{" in saida or not all(isinstance(e["id"], str) for e in entradas):
+            continue
+        multi = saida.startswith("..")
+        nomes = saida[2:-2].split("...") if multi else [saida]
+        callbacks.append(
+            {
+                "output": saida,
+                "multi": multi,
+                "outputs": [
+                    dict(zip(("id", "property"), nome.rsplit(".", 1))) for nome in nomes
+                ],
+                "inputs": dependencia["inputs"],
+                "state": dependencia["state"],
+                "prevent_initial_call": dependencia.get("prevent_initial_call", False),
+                # Saídas com allow_duplicate levam "@hash" na propriedade
+                "rotulo": nomes[0].split("@")[0],
+            }
+        )
+    return callbacks
+
+
+def _componentes(valor):
+    """Componentes (dicionários do layout) dentro de ``valor``, em profundidade."""
+    if isinstance(valor, list):
+        for item in valor:
+            yield from _componentes(item)
+    elif isinstance(valor, dict) and "type" in valor and "props" in valor:
+        yield valor
+        for prop in valor["props"].values():
+            yield from _componentes(prop)
+
+
+class UsuarioVirtual:
+    """Um analista: a sessão HTTP e o estado da página como o renderer vê."""
+
+    def __init__(self, base: str, medidas: list, etapas: list, paralelos: int = 6):
+        self.base = base.rstrip("/")
+        self.medidas = medidas
+        self.etapas = etapas
+        self.sessao = requests.Session()
+        self.executor = ThreadPoolExecutor(paralelos)
+        self.callbacks: list[dict] = []
+        self.props: dict[str, dict] = {}
+        self.tipos: dict[str, str] = {}
+        # (id, prop) -> ids que vieram no valor (para tirar ao substituir)
+        self.filhos: dict[tuple, set] = {}
+        self.url = ""
+        self.etapa = ""
+
+    def fechar(self):
+        self.executor.shutdown()
+        self.sessao.close()
+
+    def _requisitar(self, metodo: str, caminho: str, rotulo: str, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resposta = self.sessao.request(
+                metodo, self.base + caminho, timeout=900, **kwargs
+            )
+            status, tamanho = resposta.status_code, len(resposta.content)
+        except requests.RequestException as e:
+            resposta, status, tamanho = None, type(e).__name__, 0
+        self.medidas.append(
+            {
+                "etapa": self.etapa,
+                "rotulo": rotulo,
+                "segundos": time.perf_counter() - inicio,
+                "status": status,
+                "bytes": tamanho,
+            }
+        )
+        if resposta is None or not resposta.ok:
+            return None
+        return resposta
+
+    # Estado da página
+
+    def _montar(self, dono: tuple, valor) -> set:
+        ids = set()
+        for componente in _componentes(valor):
+            id_ = componente["props"].get("id")
+            if not isinstance(id_, str):
+                continue
+            # Só valores simples; subárvores são acompanhadas por self.filhos
+            self.props[id_] = {
+                prop: (None if list(_componentes(v)) else v)
+                for prop, v in componente["props"].items()
+            }
+            self.tipos[id_] = componente["type"]
+            ids.add(id_)
+        self.filhos[dono] = ids
+        return ids
+
+    def _remover(self, dono: tuple):
+        for id_ in self.filhos.pop(dono, ()):
+            for chave in [chave for chave in self.filhos if chave[0] == id_]:
+                self._remover(chave)
+            self.props.pop(id_, None)
+            self.tipos.pop(id_, None)
+
+    def _localizar(self, ids) -> set:
+        """dcc.Location assume a URL atual (ao montar ou após pushState)."""
+        partes = urlparse(self.url)
+        valores = {
+            "pathname": partes.path,
+            "search": f"?{partes.query}" if partes.query else "",
+            "hash": "",
+            "href": self.url,
+        }
+        mudou = set()
+        for id_ in ids:
+            if self.tipos.get(id_) != "Location":
+                continue
+            for prop, valor in valores.items():
+                if self.props[id_].get(prop) != valor:
+                    self.props[id_][prop] = valor
+                    mudou.add(f"{id_}.{prop}")
+        return mudou
+
+    def _ir(self, href: str) -> set:
+        self.url = href if href.startswith("http") else self.base + href
+        return self._localizar(list(self.props))
+
+    def _aplicar(self, resposta: dict) -> tuple[set, set]:
+        mudou, novos = set(), set()
+        for id_, props in (resposta or {}).get("response", {}).items():
+            if id_ not in self.props:
+                continue  # saiu da página enquanto o callback rodava
+            for prop, valor in props.items():
+                if prop == "href" and self.tipos.get(id_) == "Location":
+                    mudou |= self._ir(valor)
+                    continue
+                self._remover((id_, prop))
+                adicionados = self._montar((id_, prop), valor)
+                novos |= adicionados
+                mudou |= self._localizar(adicionados)
+                self.props[id_][prop] = None if adicionados else valor
+                mudou.add(f"{id_}.{prop}")
+        return mudou, novos
+
+    # Callbacks
+
+    def _item(self, dependencia: dict) -> dict:
+        item = {"id": dependencia["id"], "property": dependencia["property"]}
+        props = self.props.get(dependencia["id"], {})
+        if dependencia["property"] in props:
+            item["value"] = props[dependencia["property"]]
+        return item
+
+    def _chamar(self, callback: dict, gatilhos: list):
+        corpo = {
+            "output": callback["output"],
+            "outputs": (
+                callback["outputs"] if callback["multi"] else callback["outputs"][0]
+            ),
+            "inputs": [self._item(e) for e in callback["inputs"]],
+            "state": [self._item(e) for e in callback["state"]],
+            "changedPropIds": gatilhos,
+        }
+        resposta = self._requisitar(
+            "POST", ROTA_CALLBACKS, callback["rotulo"], json=corpo
+        )
+        if resposta is None or resposta.status_code != 200:
+            return None
+        return resposta.json()
+
+    def _prontos(self, mudou: set, novos: set) -> list:
+        prontos = []
+        for callback in self.callbacks:
+            if not self._presente(callback):
+                continue
+            gatilhos = [
+                f"{e['id']}.{e['property']}"
+                for e in callback["inputs"]
+                if f"{e['id']}.{e['property']}" in mudou
+            ]
+            inicial = not callback["prevent_initial_call"] and any(
+                e["id"] in novos for e in callback["inputs"] + callback["outputs"]
+            )
+            if gatilhos or inicial:
+                prontos.append((callback, gatilhos))
+        return prontos
+
+    def _presente(self, callback: dict) -> bool:
+        ids = [e["id"] for e in callback["inputs"]]
+        ids += [o["id"] for o in callback["outputs"]]
+        return all(i in self.props for i in ids)
+
+    def _propagar(self, mudou: set, novos: set):
+        adiados = []
+        for _ in range(RODADAS):
+            prontos = self._prontos(mudou, novos)
+            chamados = {id(callback) for callback, _ in prontos}
+            prontos += [
+                (callback, gatilhos)
+                for callback, gatilhos in adiados
+                if id(callback) not in chamados and self._presente(callback)
+            ]
+            if not prontos:
+                return
+            # Como o renderer: quem lê a saída de outro callback da rodada
+            # espera por ele e vai na seguinte
+            saidas = {
+                f"{o['id']}.{o['property'].split('@')[0]}": id(callback)
+                for callback, _ in prontos
+                for o in callback["outputs"]
+            }
+            agora, adiados = [], []
+            for callback, gatilhos in prontos:
+                espera = any(
+                    saidas.get(f"{e['id']}.{e['property']}", id(callback))
+                    != id(callback)
+                    for e in callback["inputs"]
+                )
+                (adiados if espera else agora).append((callback, gatilhos))
+            if not agora:
+                agora, adiados = prontos, []
+            mudou, novos = set(), set()
+            for resposta in self.executor.map(lambda p: self._chamar(*p), agora):
+                m, n = self._aplicar(resposta)
+                mudou |= m
+                novos |= n
+        print(f"[concorrencia] callbacks ainda disparando após {RODADAS} rodadas")
+
+    # Ações do analista
+
+    def _medir_etapa(self, etapa: str, acao):
+        self.etapa = etapa
+        inicio = time.perf_counter()
+        acao()
+        self.etapas.append({"etapa": etapa, "segundos": time.perf_counter() - inicio})
+
+    def abrir(self, caminho: str):
+        """Carrega a página do zero, como ao abrir a URL no navegador."""
+        self._requisitar("GET", caminho, "html")
+        layout = self._requisitar("GET", "/_dash-layout", "_dash-layout")
+        dependencias = self._requisitar(
+            "GET", "/_dash-dependencies", "_dash-dependencies"
+        )
+        if layout is None or dependencias is None:
+            raise RuntimeError("layout ou dependências indisponíveis")
+        self.callbacks = _callbacks(dependencias.json())
+        self.props, self.tipos, self.filhos = {}, {}, {}
+        self.url = self.base + caminho
+        novos = self._montar(("raiz", "layout"), layout.json())
+        self._propagar(self._localizar(novos), novos)
+
+    def navegar(self, caminho: str):
+        """Link da barra (dbc.NavLink): pushState, sem recarregar a página."""
+        self._propagar(self._ir(caminho), set())
+
+    def alterar(self, id_: str, prop: str, valor):
+        self.props[id_][prop] = valor
+        self._propagar({f"{id_}.{prop}"}, set())
+
+    def opcao(self, sufixo: str):
+        """(id, valor) da primeira opção diferente de "Todos" no dropdown."""
+        for id_, props in self.props.items():
+            if not id_.endswith(sufixo):
+                continue
+            for opcao in props.get("options") or []:
+                valor = opcao.get("value") if isinstance(opcao, dict) else opcao
+                if valor != "Todos":
+                    return id_, valor
+        return None
+
+    def sessao_completa(self, paginas):
+        self.etapa = "set_biexpress"
+        resposta = self._requisitar(
+            "POST",
+            "/set_biexpress",
+            "set_biexpress",
+            json={"token": "carga", "dtDe": PERIODO[0], "dtA": PERIODO[1], "id": 1},
+        )
+        if resposta is None:
+            raise RuntimeError("falha no /set_biexpress")
+        session_id = resposta.json()["session_id"]
+        self._medir_etapa(
+            "carregamento", lambda: self.abrir(f"/loading?session_id={session_id}")
+        )
+        for pagina in paginas:
+            self._medir_etapa(
+                f"{pagina}:abertura", lambda: self.navegar(f"/cta_express/{pagina}")
+            )
+            filtro = self.opcao("fil_cidade")
+            if filtro:
+                id_, cidade = filtro
+                self._medir_etapa(
+                    f"{pagina}:filtro", lambda: self.alterar(id_, "value", [cidade])
+                )
+
+
+class AmostradorMemoria:
+    """Pico da soma do RSS de um processo e dos seus descendentes (/proc)."""
+
+    PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def __init__(self, pid: int | None, intervalo: float = 0.25):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.pico = 0
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def disponivel(self) -> bool:
+        return self.pid is not None and os.path.exists(f"/proc/{self.pid}")
+
+    def _processos(self) -> set:
+        filhos = {}
+        for nome in os.listdir("/proc"):
+            if not nome.isdigit():
+                continue
+            try:
+                with open(f"/proc/{nome}/stat") as arquivo:
+                    ppid = int(arquivo.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            filhos.setdefault(ppid, []).append(int(nome))
+        processos, pendentes = set(), [self.pid]
+        while pendentes:
+            pid = pendentes.pop()
+            processos.add(pid)
+            pendentes += filhos.get(pid, [])
+        return processos
+
+    def rss(self) -> int:
+        total = 0
+        for pid in self._processos():
+            try:
+                with open(f"/proc/{pid}/statm") as arquivo:
+                    total += int(arquivo.read().split()[1]) * self.PAGINA
+            except (OSError, IndexError, ValueError):
+                continue
+        return total
+
+    def reiniciar(self):
+        if self.disponivel:
+            with self._lock:
+                self.pico = self.rss()
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            if self.disponivel:
+                atual = self.rss()
+                with self._lock:
+                    self.pico = max(self.pico, atual)
+
+    def iniciar(self):
+        threading.Thread(target=self._laco, name="rss", daemon=True).start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+
+def percentis(valores) -> dict:
+    if not valores:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {
+        "n": len(valores),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(max(valores)), 4),
+    }
+
+
+def _agrupar(registros: list, chave: str) -> dict:
+    grupos = {}
+    for registro in registros:
+        grupos.setdefault(registro[chave], []).append(registro["segundos"])
+    return {nome: percentis(valores) for nome, valores in sorted(grupos.items())}
+
+
+def executar_nivel(
+    base: str,
+    usuarios: int,
+    args,
+    amostrador: AmostradorMemoria,
+) -> dict:
+    medidas, etapas, falhas, concluidas = [], [], [], []
+    paginas = [p for p in args.paginas.split(",") if p]
+
+    def usuario(indice: int):
+        time.sleep(args.rampa * indice / usuarios)
+        virtual = UsuarioVirtual(base, medidas, etapas, args.paralelos)
+        try:
+            for _ in range(args.passagens):
+                try:
+                    virtual.sessao_completa(paginas)
+                    concluidas.append(indice)
+                except Exception as e:
+                    falhas.append(f"{type(e).__name__}: {e}")
+        finally:
+            virtual.fechar()
+
+    amostrador.reiniciar()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(usuarios, thread_name_prefix="usuario") as executor:
+        list(executor.map(usuario, range(usuarios)))
+    duracao = time.perf_counter() - inicio
+
+    erros = [
+        m for m in medidas if not isinstance(m["status"], int) or m["status"] >= 400
+    ]
+    callbacks = [m for m in medidas if m["rotulo"] not in ("html", "set_biexpress")]
+    return {
+        "usuarios": usuarios,
+        "duracao_s": round(duracao, 2),
+        "sessoes": len(concluidas),
+        "sessoes_por_minuto": round(len(concluidas) * 60 / duracao, 2),
+        "requisicoes": len(medidas),
+        "requisicoes_por_s": round(len(medidas) / duracao, 2),
+        "bytes_recebidos": sum(m["bytes"] for m in medidas),
+        "erros": len(erros),
+        "erros_por_rotulo": {
+            rotulo: sum(1 for e in erros if e["rotulo"] == rotulo)
+            for rotulo in sorted({e["rotulo"] for e in erros})
+        },
+        "falhas": falhas[:20],
+        "latencia": percentis([m["segundos"] for m in medidas]),
+        "latencia_callbacks": percentis([m["segundos"] for m in callbacks]),
+        "etapas": _agrupar(etapas, "etapa"),
+        "rotulos": _agrupar(medidas, "rotulo"),
+        "rss_pico_mb": (
+            round(amostrador.pico / 2**20, 1) if amostrador.disponivel else None
+        ),
+    }
+
+
+def subir_servidor(args, url_stub: str):
+    """Sobe o servidor com ``--comando`` e espera o layout responder."""
+    env = {**os.environ, "SERVERBI_BIEXPRESS_URL": url_stub}
+    if args.workers > 1 and "SERVERBI_SESSION_BACKEND" not in env:
+        # Com vários workers a sessão precisa ser vista por todos
+        env["SERVERBI_SESSION_BACKEND"] = "diretorio"
+    comando = shlex.split(
+        args.comando.format(
+            host=args.host, porta=args.porta, workers=args.workers, threads=args.threads
+        )
+    )
+    saida = open(args.log_servidor, "w") if args.log_servidor else subprocess.DEVNULL
+    processo = subprocess.Popen(
+        comando, cwd=RAIZ, env=env, stdout=saida, stderr=subprocess.STDOUT
+    )
+    base = f"http://{args.host}:{args.porta}"
+    limite = time.monotonic() + args.espera_servidor
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(
+                f"servidor encerrou ao subir (código {processo.returncode})"
+            )
+        try:
+            if requests.get(base + "/_dash-layout", timeout=5).ok:
+                return processo, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    processo.terminate()
+    raise RuntimeError("servidor não respondeu a tempo")
+
+
+def _linha(nivel: dict) -> str:
+    callbacks = nivel["latencia_callbacks"]
+    carga = nivel["etapas"].get("carregamento", {})
+    return (
+        f"{nivel['usuarios']:>4} usuários | {nivel['requisicoes_por_s']:>7} req/s | "
+        f"callbacks p50 {callbacks.get('p50', '-')}s p95 {callbacks.get('p95', '-')}s "
+        f"p99 {callbacks.get('p99', '-')}s | carregamento p95 {carga.get('p95', '-')}s | "
+        f"erros {nivel['erros']} | RSS pico {nivel['rss_pico_mb']} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--usuarios", default="1,5,10,20")
+    parser.add_argument("--passagens", type=int, default=1)
+    parser.add_argument("--paginas", default=",".join(PAGINAS))
+    parser.add_argument("--rampa", type=float, default=0.0, help="segundos")
+    parser.add_argument("--paralelos", type=int, default=6)
+    # Stub do BIExpress
+    parser.add_argument("--itens", type=int, default=dados.TAMANHOS["100k"])
+    parser.add_argument("--latencia", type=float, default=1.0)
+    parser.add_argument("--variacao", type=float, default=0.5)
+    parser.add_argument("--porta-stub", type=int, default=0)
+    # Servidor
+    parser.add_argument("--url", default="", help="servidor já no ar")
+    parser.add_argument("--pid", type=int, default=None, help="RSS com --url")
+    parser.add_argument("--comando", default=COMANDO)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8051)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--espera-servidor", type=float, default=120)
+    parser.add_argument("--log-servidor", default="")
+    parser.add_argument("--saida", default="benchmarks/concorrencia.json")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    stub = StubBIExpress(
+        args.itens, args.latencia, args.variacao, porta=args.porta_stub
+    ).iniciar()
+    print(
+        f"Stub do BIExpress em {stub.url}: {args.itens} itens, "
+        f"{len(stub.corpo_gzip)} bytes com gzip ({time.perf_counter() - inicio:.1f}s)"
+    )
+
+    processo = None
+    if args.url:
+        base, pid = args.url.rstrip("/"), args.pid
+    else:
+        processo, base = subir_servidor(args, stub.url)
+        pid = processo.pid
+        print(f"Servidor em {base} (pid {pid})")
+    amostrador = AmostradorMemoria(pid).iniciar()
+
+    resultados = {
+        "ambiente": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "configuracao": {
+            k: v for k, v in vars(args).items() if k not in ("saida", "log_servidor")
+        },
+        "niveis": [],
+    }
+    try:
+        for usuarios in (int(n) for n in args.usuarios.split(",")):
+            nivel = executar_nivel(base, usuarios, args, amostrador)
+            resultados["niveis"].append(nivel)
+            print(_linha(nivel))
+    finally:
+        amostrador.parar()
+        if processo is not None:
+            processo.terminate()
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+        resultados["stub"] = stub.estatisticas()
+        stub.parar()
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
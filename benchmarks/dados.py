@@ -0,0 +1,307 @@
+"""
+benchmarks/dados.py
+Respostas sintéticas do BIExpress (itensNFe e cargas) para benchmarks.
+
+``gerar`` monta os dois frames no formato cru da API (coordenadas em texto
+com vírgula decimal, datas ISO, tipo_Operacao em código) com cardinalidades
+configuráveis e distribuição concentrada, como em dados reais: poucos
+motoristas, clientes e produtos respondem pela maior parte dos itens. Cada
+cliente fica numa cidade e as cidades se espalham em volta de ``centro``.
+
+``gravar`` escreve o JSON no formato dos arquivos locais lidos por
+FonteArquivo (chaves com inicial maiúscula, como db/BITESTE.json), em
+blocos, para que 1M de itens não precise de uma lista de dicionários.
+``resposta_api`` monta o mesmo retorno com as chaves da API, para o
+benchmarks/stub_biexpress.py.
+
+Uso: python -m benchmarks.dados --itens 100000 --saida /tmp/bi_100k.json
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+
+# Tamanhos nomeados usados pelo benchmarks.paginas
+TAMANHOS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Itens por carga (média) e fração de itens com devolução / não venda
+ITENS_POR_CARGA = 60
+DEVOLUCAO = 0.08
+OUTRAS_OPERACOES = 0.15
+
+_BLOCO = 100_000
+
+# Prefixos dos nomes; os longos passam dos limites de conversores.abreviar
+# (15 e 20 caracteres) como os nomes reais, e vários ficam iguais depois de
+# abreviados ("MUNICIPIO DE..."), então cópias e frames da sessão divergem
+# se uma página gravar os rótulos no frame compartilhado
+NOMES = {
+    "motorista": "MOTORISTA COM NOME COMPLETO",
+    "cliente": "CLIENTE COM RAZAO SOCIAL LONGA LTDA",
+    "cidade": "MUNICIPIO DE NOME LONGO CIDADE",
+    "bairro": "BAIRRO JARDIM",
+    "grupo": "GRUPO DE PRODUTOS",
+    "produto": "PRODUTO DESCRICAO COMPLETA",
+}
+
+
+def _pesos(quantidade: int, rng) -> np.ndarray:
+    # Zipf embaralhado: o mais frequente não é sempre o de índice 0
+    pesos = 1 / np.arange(1, quantidade + 1)
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def _nomes(prefixo: str, quantidade: int) -> np.ndarray:
+    return np.array([f"{prefixo} {i}" for i in range(quantidade)], dtype=object)
+
+
+def _coordenada(valores: np.ndarray) -> np.ndarray:
+    # A API manda "-25,431234"
+    texto = np.char.mod("%.6f", valores)
+    return np.char.replace(texto, ".", ",").astype(object)
+
+
+def gerar(
+    itens: int,
+    motoristas: int = 25,
+    cidades: int = 40,
+    clientes: int | None = None,
+    produtos: int = 3000,
+    dias: int = 30,
+    inicio: date = date(2024, 12, 1),
+    centro: tuple[float, float] = (-25.43, -49.27),
+    raio: float = 2.0,
+    seed: int = 1,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """``(itensNFe, cargas)`` com ``itens`` linhas de itens."""
+    rng = np.random.default_rng(seed)
+    clientes = clientes or max(itens // 25, 50)
+    quantidade_cargas = max(itens // ITENS_POR_CARGA, 1)
+
+    # Cargas: motorista com placa própria (às vezes outra) e data no período
+    guids = np.array(
+        [
+            f"{a:08x}-{b:04x}-4{c:03x}-8{d:03x}-{e:012x}"
+            for a, b, c, d, e in zip(
+                rng.integers(0, 2**32, quantidade_cargas),
+                rng.integers(0, 2**16, quantidade_cargas),
+                rng.integers(0, 2**12, quantidade_cargas),
+                rng.integers(0, 2**12, quantidade_cargas),
+                rng.integers(0, 2**48, quantidade_cargas),
+            )
+        ],
+        dtype=object,
+    )
+    motorista = rng.choice(motoristas, quantidade_cargas, p=_pesos(motoristas, rng))
+    placa = np.where(
+        rng.random(quantidade_cargas) < 0.9,
+        motorista,
+        rng.integers(0, motoristas, quantidade_cargas),
+    )
+    datas = np.array(
+        [(inicio + timedelta(days=d)).isoformat() + "T00:00:00" for d in range(dias)],
+        dtype=object,
+    )
+    dia = rng.integers(0, dias, quantidade_cargas)
+    entregas = rng.integers(1, 30, quantidade_cargas)
+    cargas = pd.DataFrame(
+        {
+            variables_data.Guid_Carga: guids,
+            variables_data.Desc_Motorista: _nomes(NOMES["motorista"], motoristas)[
+                motorista
+            ],
+            variables_data.Desc_Placa: np.array(
+                [f"ABC{i:04d}" for i in range(motoristas)], dtype=object
+            )[placa],
+            variables_data.Valor_Cubagem: rng.random(quantidade_cargas) * 100,
+            variables_data.Num_Entregas: entregas,
+            variables_data.Valor_Venda: rng.random(quantidade_cargas) * 10000,
+            variables_data.Num_KM_Rodado: rng.random(quantidade_cargas) * 300,
+            variables_data.TEMPO_Translado: rng.integers(0, 600, quantidade_cargas),
+            variables_data.TEMPO_Atendimento: rng.integers(0, 600, quantidade_cargas),
+            variables_data.TEMPO_Ocioso: rng.integers(0, 100, quantidade_cargas),
+            variables_data.TEMPO_AteNegativado: rng.integers(0, 100, quantidade_cargas),
+            variables_data.Valor_Peso: rng.random(quantidade_cargas) * 1000,
+            "qtd_Volume": rng.integers(0, 500, quantidade_cargas),
+        }
+    )
+
+    # Clientes: cidade, rota, bairro, supervisor, vendedor e coordenada fixos
+    cidade_cliente = rng.choice(cidades, clientes, p=_pesos(cidades, rng))
+    centros = np.column_stack(
+        [
+            centro[0] + rng.uniform(-raio, raio, cidades),
+            centro[1] + rng.uniform(-raio, raio, cidades),
+        ]
+    )
+    lat_cliente = centros[cidade_cliente, 0] + rng.normal(0, 0.03, clientes)
+    lon_cliente = centros[cidade_cliente, 1] + rng.normal(0, 0.03, clientes)
+    # Parte dos clientes sem coordenada, como na API
+    sem_coordenada = rng.random(clientes) < 0.02
+    lat_cliente[sem_coordenada] = 0
+    lon_cliente[sem_coordenada] = 0
+    rotas = cidades * 3
+    bairros = cidades * 20
+    rota_cliente = cidade_cliente * 3 + rng.integers(0, 3, clientes)
+    bairro_cliente = cidade_cliente * 20 + rng.integers(0, 20, clientes)
+
+    # Itens: carga em ordem, cliente e produto concentrados
+    carga = np.sort(rng.integers(0, quantidade_cargas, itens))
+    cliente = rng.choice(clientes, itens, p=_pesos(clientes, rng))
+    produto = rng.choice(produtos, itens, p=_pesos(produtos, rng))
+    # Uma nota por cliente dentro de cada carga
+    _, nota = np.unique(
+        carga.astype(np.int64) * clientes + cliente, return_inverse=True
+    )
+    operacao = np.where(
+        rng.random(itens) < OUTRAS_OPERACOES, rng.integers(1, 3, itens), 0
+    )
+    devolvido = rng.random(itens) < DEVOLUCAO
+    cubagem = rng.random(itens)
+    motivos = np.array(["", "AVARIA", "FALTA"], dtype=object)
+    itens_nfe = pd.DataFrame(
+        {
+            variables_data.Guid_Carga: guids[carga],
+            variables_data.Cod_Cliente: cliente,
+            variables_data.Desc_Cliente: _nomes(NOMES["cliente"], clientes)[cliente],
+            variables_data.Desc_Cidade: _nomes(NOMES["cidade"], cidades)[
+                cidade_cliente[cliente]
+            ],
+            variables_data.Desc_Rota: _nomes("ROTA", rotas)[rota_cliente[cliente]],
+            variables_data.Desc_Bairro: _nomes(NOMES["bairro"], bairros)[
+                bairro_cliente[cliente]
+            ],
+            variables_data.Desc_Supervisor: _nomes("SUPERVISOR", 8)[cliente % 8],
+            variables_data.Desc_Vendedor: _nomes("VENDEDOR", 60)[cliente % 60],
+            variables_data.Desc_Grupo: _nomes(NOMES["grupo"], 30)[produto % 30],
+            variables_data.Cod_Produto: produto,
+            variables_data.Desc_Produto: _nomes(NOMES["produto"], produtos)[produto],
+            variables_data.Desc_Categoria: _nomes("CATEGORIA", 12)[produto % 12],
+            variables_data.Desc_Marca: _nomes("MARCA", 40)[produto % 40],
+            variables_data.Valor_Cubagem: cubagem,
+            variables_data.Valor_Cubagem_Devolvida: np.where(
+                devolvido, cubagem * rng.random(itens), 0.0
+            ),
+            variables_data.Valor_Venda: rng.gamma(2.0, 60.0, itens),
+            variables_data.Valor_Tabela: rng.gamma(2.0, 65.0, itens),
+            variables_data.Valor_Peso: rng.random(itens) * 10,
+            variables_data.Num_NFE: 100_000 + nota,
+            variables_data.DT_Emissao: datas[dia[carga]],
+            variables_data.TP_Desc_Operacao: np.array(
+                ["VENDA", "BONIFICACAO", "TROCA"], dtype=object
+            )[operacao],
+            variables_data.TP_TipoOperacao: operacao,
+            variables_data.Desc_Motivo_Devolucao: motivos[
+                np.where(devolvido, rng.integers(1, 3, itens), 0)
+            ],
+            variables_data.cliente_lat: _coordenada(lat_cliente)[cliente],
+            variables_data.cliente_log: _coordenada(lon_cliente)[cliente],
+        }
+    )
+    return itens_nfe, cargas
+
+
+def _maiuscula(nome: str) -> str:
+    return nome[0].upper() + nome[1:]
+
+
+def _registros(df: pd.DataFrame):
+    """Pedaços de texto da lista JSON de registros, de ``_BLOCO`` em ``_BLOCO``."""
+    yield "["
+    for posicao in range(0, len(df), _BLOCO):
+        texto = df.iloc[posicao : posicao + _BLOCO].to_json(
+            orient="records", force_ascii=False, double_precision=6
+        )
+        yield ("," if posicao else "") + texto[1:-1]
+    yield "]"
+
+
+def _documento(itens_nfe: pd.DataFrame, cargas: pd.DataFrame, maiuscula: bool):
+    """
+    Texto do retorno em pedaços: chaves como na API (``itensNFe``) ou, com
+    ``maiuscula``, como nos arquivos locais (``ItensNFe``).
+    """
+    if maiuscula:
+        itens_nfe = itens_nfe.rename(columns=_maiuscula)
+        cargas = cargas.rename(columns=_maiuscula)
+    nomes = ("itensNFe", "cargas", "status")
+    chave_itens, chave_cargas, chave_status = (
+        map(_maiuscula, nomes) if maiuscula else nomes
+    )
+    yield f'{{"{chave_itens}":'
+    yield from _registros(itens_nfe)
+    yield f',"{chave_cargas}":'
+    yield from _registros(cargas)
+    yield f',"{chave_status}":"ok"}}'
+
+
+def gravar(itens_nfe: pd.DataFrame, cargas: pd.DataFrame, caminho: str) -> int:
+    """Grava no formato de FonteArquivo e devolve o tamanho em bytes."""
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for pedaco in _documento(itens_nfe, cargas, maiuscula=True):
+            arquivo.write(pedaco)
+        return arquivo.tell()
+
+
+def resposta_api(itens_nfe: pd.DataFrame, cargas: pd.DataFrame) -> bytes:
+    """Corpo do GetBIExpress, como a API devolve (ver stub_biexpress)."""
+    return "".join(_documento(itens_nfe, cargas, maiuscula=False)).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--itens", type=int, default=TAMANHOS["100k"])
+    parser.add_argument("--motoristas", type=int, default=25)
+    parser.add_argument("--cidades", type=int, default=40)
+    parser.add_argument("--clientes", type=int, default=None)
+    parser.add_argument("--produtos", type=int, default=3000)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--inicio", type=date.fromisoformat, default=date(2024, 12, 1))
+    parser.add_argument(
+        "--centro",
+        type=float,
+        nargs=2,
+        default=(-25.43, -49.27),
+        metavar=("LAT", "LON"),
+    )
+    parser.add_argument("--raio", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--saida", required=True)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    itens_nfe, cargas = gerar(
+        args.itens,
+        motoristas=args.motoristas,
+        cidades=args.cidades,
+        clientes=args.clientes,
+        produtos=args.produtos,
+        dias=args.dias,
+        inicio=args.inicio,
+        centro=tuple(args.centro),
+        raio=args.raio,
+        seed=args.seed,
+    )
+    tamanho = gravar(itens_nfe, cargas, args.saida)
+    print(
+        json.dumps(
+            {
+                "itens": len(itens_nfe),
+                "cargas": len(cargas),
+                "bytes": tamanho,
+                "segundos": round(time.perf_counter() - inicio, 2),
+                "saida": args.saida,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+benchmarks/filtros.py
+Compara o encadeamento de FiltrarColuna com utils/filtros.py.
+
+Monta um detalhamento sintético (cardinalidades próximas das de produção),
+aplica a mesma preparação da carga (compactação e indexação) e mede cada
+combinação de filtros nas duas formas, conferindo que o resultado é igual.
+
+Uso: python -m benchmarks.filtros [--linhas 1000000] [--repeticoes 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+from utils import compactacao, conversores, filtros
+
+# Coluna: quantidade de valores distintos
+CARDINALIDADES = {
+    variables_data.Desc_Cidade: 40,
+    variables_data.Desc_Rota: 120,
+    variables_data.Desc_Bairro: 900,
+    variables_data.Desc_Motorista: 25,
+    variables_data.Desc_Supervisor: 8,
+    variables_data.Desc_Vendedor: 60,
+    variables_data.Desc_Grupo: 30,
+    variables_data.Desc_Produto: 3000,
+    variables_data.Desc_Placa: 25,
+}
+
+
+def gerar(linhas: int, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dados = {}
+    for coluna, quantidade in CARDINALIDADES.items():
+        nomes = np.array([f"{coluna.upper()} {i}" for i in range(quantidade)], dtype=object)
+        # Distribuição concentrada, como em dados reais
+        pesos = 1 / np.arange(1, quantidade + 1)
+        dados[coluna] = nomes[rng.choice(quantidade, linhas, p=pesos / pesos.sum())]
+    dados[variables_data.Valor_Cubagem] = rng.random(linhas)
+    dados[variables_data.Valor_Venda] = rng.random(linhas) * 100
+    return pd.DataFrame(dados)
+
+
+def encadeado(df: pd.DataFrame, selecao: dict) -> pd.DataFrame:
+    for coluna, valores in selecao.items():
+        df = conversores.FiltrarColuna(df=df, tabela=coluna, filtro=valores)
+    return df
+
+
+def cenarios(df: pd.DataFrame) -> dict[str, dict]:
+    def primeiros(coluna, n):
+        return list(df[coluna].value_counts().index[:n])
+
+    return {
+        "1 filtro (cidade)": {variables_data.Desc_Cidade: primeiros(variables_data.Desc_Cidade, 3)},
+        "3 filtros": {
+            variables_data.Desc_Cidade: primeiros(variables_data.Desc_Cidade, 10),
+            variables_data.Desc_Motorista: primeiros(variables_data.Desc_Motorista, 8),
+            variables_data.Desc_Grupo: primeiros(variables_data.Desc_Grupo, 10),
+        },
+        "9 filtros": {
+            coluna: primeiros(coluna, max(2, quantidade // 2))
+            for coluna, quantidade in CARDINALIDADES.items()
+        },
+        "produto (500 skus)": {variables_data.Desc_Produto: primeiros(variables_data.Desc_Produto, 500)},
+    }
+
+
+def medir(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    df = gerar(args.linhas)
+    compactacao.compactar_frame(df)
+    filtros.indexar(df)
+    print(f"{args.linhas} linhas, melhor de {args.repeticoes} execuções")
+    print(f"{'cenário':<22}{'linhas':>10}{'encadeado':>12}{'índice':>10}{'ganho':>8}")
+    for nome, selecao in cenarios(df).items():
+        esperado = encadeado(df, selecao)
+        obtido = filtros.filtrar(df, selecao)
+        pd.testing.assert_frame_equal(esperado, obtido)
+        antes = medir(lambda: encadeado(df, selecao), args.repeticoes)
+        depois = medir(lambda: filtros.filtrar(df, selecao), args.repeticoes)
+        print(
+            f"{nome:<22}{len(obtido):>10}{antes * 1000:>10.1f}ms"
+            f"{depois * 1000:>8.1f}ms{antes / depois:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
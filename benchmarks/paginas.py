@@ -0,0 +1,244 @@
+"""
+benchmarks/paginas.py
+Tempo da carga e das páginas do CTA Express sobre dados sintéticos.
+
+Para cada tamanho, gera o arquivo do BIExpress (benchmarks/dados.py), carrega
+a sessão pelo mesmo pipeline da API (ingestao.carregar_sessao, com a sessão
+apontando para o arquivo, como em FonteArquivo) e chama direto os callbacks
+de resumo, cubagem, entregas e km: showHeader, loadCharts, showBody sem
+filtro e com a cidade de maior venda e, em cubagem e entregas, o callback de
+cada card, um a um. Cada chamada é repetida ``--repeticoes`` vezes: a
+primeira mede o cálculo e as demais o app.memo_filtros.
+
+O resultado vai em JSON (``--saida``) com o ambiente, as etapas da carga e,
+por chamada, os tempos, os bytes da resposta em JSON e o erro, se houver;
+erros não interrompem as demais medições. ``frames_alterados`` lista as
+páginas que mudaram o detalhamento ou o resumo da sessão (tipos ou valores),
+que as outras páginas, o cubo e as coocorrências compartilham.
+
+Uso: python -m benchmarks.paginas [--tamanhos 10k,100k,1m] [--repeticoes 3]
+     [--saida benchmarks/paginas.json] [--dados /tmp]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+import dash
+import pandas as pd
+import plotly
+from plotly.utils import PlotlyJSONEncoder
+
+from app import session_control as sessions
+from app import session_dataframes_cta_express as sessionDF
+from benchmarks import dados
+from pages.cta_express.cta_express_globals import variables_data
+from pages.cta_express.cubagem import cubagem
+from pages.cta_express.entregas import entregas
+from pages.cta_express.km import km
+from pages.cta_express.resumo import resumo
+from pages.loading import ingestao
+from utils import figuras
+
+TODOS = ["Todos"]
+# Período da sessão; cobre os 30 dias gerados por padrão em benchmarks.dados
+PERIODO = ("01/12/2024", "31/12/2024")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _local(erro: Exception) -> str:
+    """Último ponto do projeto na pilha do erro."""
+    pilha = traceback.extract_tb(erro.__traceback__)
+    quadro = ([q for q in pilha if q.filename.startswith(RAIZ)] or pilha)[-1]
+    return f"{os.path.relpath(quadro.filename, RAIZ)}:{quadro.lineno}"
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    """Tempos de ``repeticoes`` chamadas e os bytes da resposta da primeira."""
+    tempos, resultado = [], {}
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        try:
+            saida = funcao()
+        except Exception as e:
+            resultado["erro"] = f"{type(e).__name__}: {e}"
+            resultado["local"] = _local(e)
+            break
+        tempos.append(time.perf_counter() - inicio)
+        if "bytes" not in resultado:
+            resultado["bytes"] = len(json.dumps(saida, cls=PlotlyJSONEncoder))
+    if tempos:
+        resultado["frio"] = round(tempos[0], 4)
+        if len(tempos) > 1:
+            resultado["quente"] = round(statistics.median(tempos[1:]), 4)
+    return resultado
+
+
+def _grafico(pagina, session_id: str, filtros: list, numero: int):
+    """O que o callback do card devolve (ver create_chart_callback)."""
+    resultado = pagina.grafico(session_id, pagina.montarFiltros(*filtros), numero)
+    figura = resultado[0] if isinstance(resultado, tuple) else resultado
+    return figuras.atualizacao(figura)
+
+
+def chamadas(session_id: str, cidade: str) -> dict:
+    """Chamadas por página, como o navegador faz ao abrir e ao filtrar."""
+    session_data = {"session_id": session_id}
+
+    def filtros(pagina, cidade_filtro=TODOS):
+        # Filtros do showBody na ordem dos Inputs; só a cidade varia
+        quantidade = pagina.showBody.__code__.co_argcount - 1
+        return [cidade_filtro] + [TODOS] * (quantidade - 1)
+
+    paginas = {
+        "resumo": {
+            "showHeader": lambda: resumo.showHeader(1, session_data),
+            "loadCharts": lambda: resumo.loadCharts(session_id),
+        }
+    }
+    for nome, pagina in (("cubagem", cubagem), ("entregas", entregas), ("km", km)):
+        todos, filtrado = filtros(pagina), filtros(pagina, [cidade])
+        etapas = {
+            "showHeader": lambda p=pagina: p.showHeader(1, session_data),
+            "loadCharts": pagina.loadCharts,
+            "showBody": lambda p=pagina, f=todos: p.showBody(*f, session_data),
+            "showBody_cidade": lambda p=pagina, f=filtrado: p.showBody(
+                *f, session_data
+            ),
+        }
+        # Um callback por card, cada um medido à parte (km manda tudo no showBody)
+        for numero in pagina.FIGURAS if hasattr(pagina, "grafico") else ():
+            for sufixo, f in (("", todos), ("_cidade", filtrado)):
+                etapas[f"fig{numero}{sufixo}"] = (
+                    lambda p=pagina, f=f, n=numero: _grafico(p, session_id, f, n)
+                )
+        paginas[nome] = etapas
+    return paginas
+
+
+def assinatura(session_id: str) -> dict:
+    """Tipos e hash do conteúdo dos frames compartilhados da sessão."""
+    resultado = {}
+    for nome in ("detalhamento", "resumo"):
+        df = sessionDF[f"{session_id}_{nome}"]
+        resultado[nome] = (
+            df.dtypes.astype(str).to_dict(),
+            int(pd.util.hash_pandas_object(df, index=False).sum()),
+        )
+    return resultado
+
+
+def cidade_principal(session_id: str) -> str:
+    """Cidade de maior venda: o filtro que mais pesa depois de "Todos"."""
+    df_detalhamento = sessionDF[f"{session_id}_detalhamento"]
+    return str(
+        df_detalhamento.groupby(variables_data.Desc_Cidade, observed=True)[
+            variables_data.Valor_Venda
+        ]
+        .sum()
+        .idxmax()
+    )
+
+
+def executar(nome: str, itens: int, pasta: str, repeticoes: int) -> dict:
+    caminho = os.path.join(pasta, f"biexpress_{nome}.json")
+    resultado = {"itens": itens, "arquivo": caminho}
+
+    if os.path.exists(caminho):
+        resultado["geracao"] = {
+            "reaproveitado": True,
+            "bytes": os.path.getsize(caminho),
+        }
+    else:
+        inicio = time.perf_counter()
+        itens_nfe, cargas = dados.gerar(itens)
+        tamanho = dados.gravar(itens_nfe, cargas, caminho)
+        resultado["geracao"] = {
+            "segundos": round(time.perf_counter() - inicio, 4),
+            "cargas": len(cargas),
+            "bytes": tamanho,
+        }
+        del itens_nfe, cargas
+
+    # Sessão como a do /set_biexpress, mas lendo o arquivo gerado
+    # uuid como o do /set_biexpress (o DiretorioBackend só aceita uuids)
+    session_id = str(uuid.uuid4())
+    sessions[session_id] = {
+        "arquivo": caminho,
+        "dtDe": PERIODO[0],
+        "dtA": PERIODO[1],
+        "status": "carregando",
+    }
+    inicio = time.perf_counter()
+    ingestao.carregar_sessao(session_id)
+    resultado["carga"] = {
+        "segundos": round(time.perf_counter() - inicio, 4),
+        "bytes_sessao": sessionDF.bytes_sessao(session_id),
+        "etapas": sessions[session_id]["ingestao"],
+    }
+
+    cidade = cidade_principal(session_id)
+    resultado["cidade"] = cidade
+    resultado["paginas"] = {}
+    resultado["frames_alterados"] = {}
+    for pagina, etapas in chamadas(session_id, cidade).items():
+        resultado["paginas"][pagina] = {}
+        antes = assinatura(session_id)
+        for etapa, funcao in etapas.items():
+            medida = medir(funcao, repeticoes)
+            resultado["paginas"][pagina][etapa] = medida
+            print(f"[{nome}] {pagina}.{etapa}: {medida}")
+        # As páginas só leem os frames da sessão; rótulos vão em cópias
+        depois = assinatura(session_id)
+        alterados = [frame for frame in antes if antes[frame] != depois[frame]]
+        if alterados:
+            resultado["frames_alterados"][pagina] = alterados
+            print(f"[{nome}] {pagina} alterou os frames da sessão: {alterados}")
+
+    sessionDF.remover_sessao(session_id)
+    sessions.pop(session_id, None)
+    return resultado
+
+
+def ambiente() -> dict:
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "dash": dash.__version__,
+        "plotly": plotly.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--tamanhos", default="10k,100k")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default="benchmarks/paginas.json")
+    parser.add_argument(
+        "--dados", default="/tmp", help="pasta dos arquivos gerados (reaproveitados)"
+    )
+    args = parser.parse_args()
+
+    resultados = {"ambiente": ambiente(), "repeticoes": args.repeticoes, "tamanhos": {}}
+    for nome in args.tamanhos.split(","):
+        itens = dados.TAMANHOS.get(nome) or int(nome)
+        resultados["tamanhos"][nome] = executar(
+            nome, itens, args.dados, args.repeticoes
+        )
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultados, arquivo, ensure_ascii=False, indent=2, default=str)
+    print(f"Resultados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
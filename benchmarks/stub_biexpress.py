@@ -0,0 +1,164 @@
+"""
+benchmarks/stub_biexpress.py
+Substituto local do GetBIExpress para testes de carga.
+
+Responde ``GET .../GetBIExpress/<id>`` com um retorno sintético de
+``--itens`` itens (benchmarks/dados.py) depois de ``--latencia`` segundos
+(mais até ``--variacao`` segundos aleatórios), com gzip quando o cliente
+aceita, como a API. O corpo é montado uma vez e servido a todas as sessões.
+Com ``--falhas``, os primeiros pedidos recebem 503, como a API reiniciando.
+
+O servidor do dashboard usa o stub com
+SERVERBI_BIEXPRESS_URL=http://127.0.0.1:<porta>/api/v3.0.0/GetBIExpress/
+
+Uso: python -m benchmarks.stub_biexpress [--porta 9021] [--itens 100000]
+     [--latencia 1.5] [--variacao 0.5] [--falhas 0]
+"""
+
+import argparse
+import gzip
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import dados
+
+ROTA = "/api/v3.0.0/GetBIExpress/"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        stub: StubBIExpress = self.server.stub
+        if not self.path.startswith(ROTA):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        time.sleep(stub.espera())
+        if stub.falhar():
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        compactado = "gzip" in self.headers.get("Accept-Encoding", "")
+        corpo = stub.corpo_gzip if compactado else stub.corpo
+        stub.registrar(len(corpo))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if compactado:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class StubBIExpress:
+    def __init__(
+        self,
+        itens: int,
+        latencia: float = 0.0,
+        variacao: float = 0.0,
+        host: str = "127.0.0.1",
+        porta: int = 0,
+        seed: int = 1,
+        falhas: int = 0,
+    ):
+        itens_nfe, cargas = dados.gerar(itens, seed=seed)
+        self.corpo = dados.resposta_api(itens_nfe, cargas)
+        self.corpo_gzip = gzip.compress(self.corpo, compresslevel=5)
+        self.latencia = latencia
+        self.variacao = variacao
+        self.falhas = falhas
+        self.chamadas = 0
+        self.respostas_503 = 0
+        self.bytes_enviados = 0
+        self._aleatorio = random.Random(seed)
+        self._lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer((host, porta), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.stub = self
+
+    @property
+    def url(self) -> str:
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}{ROTA}"
+
+    def espera(self) -> float:
+        with self._lock:
+            return self.latencia + self._aleatorio.uniform(0, self.variacao)
+
+    def falhar(self) -> bool:
+        """Consome uma das ``falhas`` pendentes (o pedido recebe 503)."""
+        with self._lock:
+            if self.respostas_503 < self.falhas:
+                self.respostas_503 += 1
+                return True
+            return False
+
+    def registrar(self, tamanho: int):
+        with self._lock:
+            self.chamadas += 1
+            self.bytes_enviados += tamanho
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "chamadas": self.chamadas,
+                "respostas_503": self.respostas_503,
+                "bytes_enviados": self.bytes_enviados,
+                "bytes_corpo": len(self.corpo),
+                "bytes_gzip": len(self.corpo_gzip),
+            }
+
+    def iniciar(self) -> "StubBIExpress":
+        threading.Thread(
+            target=self.servidor.serve_forever, name="stub-biexpress", daemon=True
+        ).start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=9021)
+    parser.add_argument("--itens", type=int, default=dados.TAMANHOS["100k"])
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--variacao", type=float, default=0.0)
+    parser.add_argument(
+        "--falhas", type=int, default=0, help="primeiros pedidos respondidos com 503"
+    )
+    args = parser.parse_args()
+
+    stub = StubBIExpress(
+        args.itens,
+        args.latencia,
+        args.variacao,
+        host=args.host,
+        porta=args.porta,
+        falhas=args.falhas,
+    )
+    print(
+        f"Stub do BIExpress em {stub.url} ({len(stub.corpo)} bytes, "
+        f"{len(stub.corpo_gzip)} com gzip)"
+    )
+    try:
+        stub.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import dash_bootstrap_components as dbc
 from utils import conversores, read_file
 import pandas as pd
 import plotly.graph_objects as go
-from assets.static import packCode, Colors, supportClass
+from assets.static import packCode, Colors, supportClass, Interface
 from stylesDocs.style import styleConfig
 
 Desc_Cidade = "C_CIDADE"
@@ -53,15 +53,7 @@ globalTemplate: dict = {
 }
 
 
-@app.callback(
-    Output(f"{pageTag}collapse-filters", "is_open"),
-    Input(f"{pageTag}collapse-button", "n_clicks"),
-    State(f"{pageTag}collapse-filters", "is_open"),
-)
-def toggle_collapse(n_clicks, is_open):
-    if n_clicks:
-        return not is_open
-    return is_open
+Interface.collapseFiltros(app, pageTag)
 
 
 @app.callback(
@@ -4,7 +4,9 @@ Roteamento principal do CTA Express com correção de bugs
 """
 
 from app import app
-from dash import Input, Output
+from app import session_dataframes_cta_express as sessionDF
+import dash
+from dash import Input, Output, State
 from pages.cta_express.cubagem import cubagem_comps
 from pages.cta_express.entregas import entregas_comps
 from pages.cta_express.temp_entregas import temp_entregas_comps
@@ -69,6 +71,24 @@ def urlRefresh(pathname):
             # Rota padrão
             return resumo_comps.layout
 
+@app.callback(
+    Output("url", "href", allow_duplicate=True),
+    Input(f"{pageTag}url", "pathname"),
+    State("session_data", "data"),
+    prevent_initial_call="initial_duplicate",
+)
+def sessaoExpirada(pathname, session_data):
+    """
+    Devolve o usuário para o carregamento quando os dados da sessão
+    foram removidos da memória (TTL ou orçamento do SessionStore): sessões
+    de arquivo são recarregadas e as da API, cujo token já foi descartado,
+    recebem a mensagem de sessão expirada (ingestao.SessaoExpirada).
+    """
+    session_id = (session_data or {}).get("session_id", "")
+    if pathname == "/cta_express/estoque" or sessionDF.contem_sessao(session_id):
+        return dash.no_update
+    return f"/loading?session_id={session_id}"
+
 def reset_callbacks():
     """
     Função para resetar o estado dos callbacks (útil para desenvolvimento).
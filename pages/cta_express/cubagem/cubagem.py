@@ -1,29 +1,34 @@
 import pandas as pd
 from app import app
 from app import session_dataframes_cta_express as sessionDF
+from app import memo_filtros
+from dash.exceptions import PreventUpdate
 from dash import Input, Output, State, dcc, dash, html, callback_context
-from assets.static import packCode, Colors, supportClass, Graphcs
+from assets.static import packCode, Colors, Settings, supportClass, Graphcs, Interface
 from pages.cta_express.cta_express_globals import variables_data
 import dash_bootstrap_components as dbc
-from utils import conversores
+from utils import busca, conversores, cubo as cubo_agregado, detalhes, figuras, filtros as indice_filtros, tempos
 import plotly.express as px
 import plotly.graph_objects as go
 from stylesDocs.style import styleConfig
-import locale
 
 pageTag: str = "CEcubagem_"
 styleColors = styleConfig(Colors.themecolor)
 globalTemplate = Graphcs.globalTemplate
 
-@app.callback(
-    Output(f"{pageTag}collapse-filters", "is_open"),
-    Input(f"{pageTag}collapse-button", "n_clicks"),
-    State(f"{pageTag}collapse-filters", "is_open"),
+# Nomes abreviados nos eixos, aplicados às dimensões do cubo antes de somar
+ROTULOS_MOTORISTA = {variables_data.Desc_Motorista: conversores.abreviar}
+ROTULOS_GRUPO = {variables_data.Desc_Grupo: conversores.abreviar}
+
+# Métricas do HeaderDash atualizadas pela troca de filtro (showBody)
+METRICAS = (
+    "Nº Entregas",
+    "Cubagem Total",
+    "Valor Total",
+    "Notas Fiscais",
 )
-def toggle_collapse(n_clicks, is_open):
-    if n_clicks:
-        return not is_open
-    return is_open
+
+Interface.collapseFiltros(app, pageTag)
 
 @app.callback(
     Output(f"{pageTag}header", "children"),
@@ -33,22 +38,17 @@ def toggle_collapse(n_clicks, is_open):
 def showHeader(initData, session_data):
     session_id = session_data.get("session_id", "")
 
-    if initData == 1 and session_id:
+    if initData == 1 and session_id and sessionDF.contem_sessao(session_id):
         df_resumo: pd.DataFrame = sessionDF[f"{session_id}_resumo"]
         df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
-        df_entregas_unicas = (
-            df_detalhamento.groupby(variables_data.Guid_Carga)[
-                variables_data.Cod_Cliente
-            ]
-            .nunique()
-            .reset_index()
-        )
-        df_entregas_unicas = df_entregas_unicas[variables_data.Cod_Cliente].sum()
+        cubo = cubo_agregado.consultar(sessionDF, session_id, {}, df_detalhamento)
 
         metricsDict: dict = {
             "Nº Entregas": {
                 "icone": "bi bi-truck",
-                "valor": conversores.MetricInteiroValores(df_entregas_unicas),
+                "valor": conversores.MetricInteiroValores(
+                    cubo.contar_distintos("entregas")
+                ),
             },
             "Cubagem Total": {
                 "icone": "bi bi-box",
@@ -59,14 +59,12 @@ def showHeader(initData, session_data):
             "Valor Total": {
                 "icone": "bi bi-cash-stack",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Valor_Venda].sum()
+                    cubo.total(variables_data.Valor_Venda)
                 ),
             },
             "Notas Fiscais": {
                 "icone": "bi bi-receipt-cutoff",
-                "valor": conversores.inteiroValores(
-                    df_detalhamento[variables_data.Num_NFE].unique().size
-                ),
+                "valor": conversores.inteiroValores(cubo.contar_distintos("notas")),
             },
         }
 
@@ -112,14 +110,14 @@ def showHeader(initData, session_data):
                 "valueDefault": "Todos",
             },
             f"{pageTag}fil_sku": {
-                "distValue": df_detalhamento[variables_data.Desc_Cod_Produto].unique(),
+                "busca": True,
                 "labelName": "Produto",
                 "valueDefault": "Todos",
             },
         }
         return packCode.HeaderDash(
             "Cubagem",
-            f"Período de análise: {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).min().strftime('%d/%m/%Y')} a {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).max().strftime('%d/%m/%Y')}",
+            f"Período de análise: {df_detalhamento[variables_data.DT_Emissao].min():%d/%m/%Y} a {df_detalhamento[variables_data.DT_Emissao].max():%d/%m/%Y}",
             pageTag,
             metricsDict,
             True,
@@ -129,7 +127,7 @@ def showHeader(initData, session_data):
         )
 
 @app.callback(
-    [Output(f"{pageTag}body", "children"), Output(f"{pageTag}metrics", "children")],
+    supportClass.saidasMetricas(pageTag, METRICAS),
     [
         Input(f"{pageTag}fil_cidade", "value"),
         Input(f"{pageTag}fil_rota", "value"),
@@ -156,84 +154,239 @@ def showBody(
     session_data,
 ):
     session_id = session_data.get("session_id", "")
+    if not sessionDF.contem_sessao(session_id):
+        raise PreventUpdate
+
+    filtros = montarFiltros(
+        fil_cidade,
+        fil_rota,
+        fil_bairro,
+        fil_motorista,
+        fil_supervisor,
+        fil_vendedor,
+        fil_grupo,
+        fil_sku,
+        fil_placa,
+    )
+    return memo_filtros.obter(
+        session_id, pageTag, filtros, lambda: montarMetricas(session_id, filtros)
+    )
 
-    df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
 
-    if "Todos" not in fil_cidade and len(fil_cidade) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Cidade, filtro=fil_cidade
-        )
-    if "Todos" not in fil_rota and len(fil_rota) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Rota, filtro=fil_rota
-        )
-    if "Todos" not in fil_bairro and len(fil_bairro) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Bairro, filtro=fil_bairro
-        )
-    if "Todos" not in fil_motorista and len(fil_motorista) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento,
-            tabela=variables_data.Desc_Motorista,
-            filtro=fil_motorista,
-        )
-    if "Todos" not in fil_supervisor and len(fil_supervisor) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento,
-            tabela=variables_data.Desc_Supervisor,
-            filtro=fil_supervisor,
-        )
-    if "Todos" not in fil_vendedor and len(fil_vendedor) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Vendedor, filtro=fil_vendedor
-        )
-    if "Todos" not in fil_grupo and len(fil_grupo) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Grupo, filtro=fil_grupo
-        )
-    if "Todos" not in fil_sku and len(fil_sku) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Cod_Produto, filtro=fil_sku
-        )
-    if "Todos" not in fil_placa and len(fil_placa) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Placa, filtro=fil_placa
-        )
+def montarFiltros(
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_sku,
+    fil_placa,
+) -> dict:
+    return indice_filtros.filtros_ativos(
+        {
+            variables_data.Desc_Cidade: fil_cidade,
+            variables_data.Desc_Rota: fil_rota,
+            variables_data.Desc_Bairro: fil_bairro,
+            variables_data.Desc_Motorista: fil_motorista,
+            variables_data.Desc_Supervisor: fil_supervisor,
+            variables_data.Desc_Vendedor: fil_vendedor,
+            variables_data.Desc_Grupo: fil_grupo,
+            variables_data.Desc_Cod_Produto: fil_sku,
+            variables_data.Desc_Placa: fil_placa,
+        }
+    )
 
-    df_entregas_unicas = (
-        df_detalhamento.groupby(variables_data.Guid_Carga)[variables_data.Cod_Cliente]
-        .nunique()
-        .reset_index()
+
+@app.callback(
+    [
+        Output(f"{pageTag}fil_cidade", "options"),
+        Output(f"{pageTag}fil_rota", "options"),
+        Output(f"{pageTag}fil_bairro", "options"),
+        Output(f"{pageTag}fil_motorista", "options"),
+        Output(f"{pageTag}fil_supervisor", "options"),
+        Output(f"{pageTag}fil_vendedor", "options"),
+        Output(f"{pageTag}fil_grupo", "options"),
+        Output(f"{pageTag}fil_placa", "options"),
+    ],
+    [
+        Input(f"{pageTag}fil_cidade", "value"),
+        Input(f"{pageTag}fil_rota", "value"),
+        Input(f"{pageTag}fil_bairro", "value"),
+        Input(f"{pageTag}fil_motorista", "value"),
+        Input(f"{pageTag}fil_supervisor", "value"),
+        Input(f"{pageTag}fil_vendedor", "value"),
+        Input(f"{pageTag}fil_grupo", "value"),
+        Input(f"{pageTag}fil_sku", "value"),
+        Input(f"{pageTag}fil_placa", "value"),
+    ],
+    State("session_data", "data"),
+)
+def showOpcoes(
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_sku,
+    fil_placa,
+    session_data,
+):
+    """
+    Opções em cascata: cada dropdown só mostra valores que ainda têm dados.
+    Produto não recebe a lista completa; as opções dele vêm de buscarProduto.
+    """
+    session_id = session_data.get("session_id", "")
+    tabela = sessionDF.get(f"{session_id}_coocorrencias")
+    if tabela is None:
+        raise PreventUpdate
+
+    selecao = {
+        variables_data.Desc_Cidade: fil_cidade,
+        variables_data.Desc_Rota: fil_rota,
+        variables_data.Desc_Bairro: fil_bairro,
+        variables_data.Desc_Motorista: fil_motorista,
+        variables_data.Desc_Supervisor: fil_supervisor,
+        variables_data.Desc_Vendedor: fil_vendedor,
+        variables_data.Desc_Grupo: fil_grupo,
+        variables_data.Desc_Cod_Produto: fil_sku,
+        variables_data.Desc_Placa: fil_placa,
+    }
+    filtros = indice_filtros.filtros_ativos(selecao)
+    permitidas = memo_filtros.obter(
+        session_id,
+        f"opcoes:{pageTag}",
+        filtros,
+        lambda: indice_filtros.opcoes(
+            tabela, filtros, [c for c in selecao if c != variables_data.Desc_Cod_Produto]
+        ),
+    )
+    return indice_filtros.opcoes_dropdown(permitidas, selecao)
+
+
+@app.callback(
+    Output(f"{pageTag}fil_sku", "options"),
+    Input(f"{pageTag}fil_sku", "search_value"),
+    [
+        State(f"{pageTag}fil_sku", "value"),
+        State(f"{pageTag}fil_cidade", "value"),
+        State(f"{pageTag}fil_rota", "value"),
+        State(f"{pageTag}fil_bairro", "value"),
+        State(f"{pageTag}fil_motorista", "value"),
+        State(f"{pageTag}fil_supervisor", "value"),
+        State(f"{pageTag}fil_vendedor", "value"),
+        State(f"{pageTag}fil_grupo", "value"),
+        State(f"{pageTag}fil_placa", "value"),
+    ],
+    State("session_data", "data"),
+)
+def buscarProduto(
+    search_value,
+    fil_sku,
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_placa,
+    session_data,
+):
+    if not search_value:
+        raise PreventUpdate
+    session_id = session_data.get("session_id", "")
+
+    filtros = indice_filtros.filtros_ativos(
+        {
+            variables_data.Desc_Cidade: fil_cidade,
+            variables_data.Desc_Rota: fil_rota,
+            variables_data.Desc_Bairro: fil_bairro,
+            variables_data.Desc_Motorista: fil_motorista,
+            variables_data.Desc_Supervisor: fil_supervisor,
+            variables_data.Desc_Vendedor: fil_vendedor,
+            variables_data.Desc_Grupo: fil_grupo,
+            variables_data.Desc_Placa: fil_placa,
+        }
+    )
+    opcoes = busca.buscar_sessao(
+        memo_filtros,
+        sessionDF,
+        session_id,
+        variables_data.Desc_Cod_Produto,
+        filtros,
+        search_value,
+        fil_sku,
+        Settings.BuscaLimite,
+    )
+    if opcoes is None:
+        raise PreventUpdate
+    return opcoes
+
+
+def dadosFiltrados(session_id: str, filtros: dict):
+    df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
+    df_detalhamento = memo_filtros.filtrar(
+        session_id, "detalhamento", df_detalhamento, filtros
+    )
+    # Um cubo por estado de filtro para todos os cards (e entre as páginas):
+    # com filtro fora das dimensões ele é montado das linhas filtradas
+    cubo = memo_filtros.obter(
+        session_id,
+        "cubo",
+        filtros,
+        lambda: cubo_agregado.consultar(sessionDF, session_id, filtros, df_detalhamento),
+    )
+    return df_detalhamento, cubo
+
+
+def grafico(session_id: str, filtros: dict, numero: int):
+    """
+    Figura ``numero`` do estado de filtro (com a tabela dos detalhes, quando
+    tem modal), guardada em memo_filtros para o card e o modal.
+    """
+    return memo_filtros.obter(
+        session_id,
+        f"{pageTag}fig{numero}",
+        filtros,
+        lambda: figuras.compactar(
+            calcularGrafico(session_id, filtros, numero), f"{pageTag}fig{numero}"
+        ),
     )
-    df_entregas_unicas = df_entregas_unicas[variables_data.Cod_Cliente].sum()
+
+
+def montarMetricas(session_id: str, filtros: dict):
+    _, cubo = dadosFiltrados(session_id, filtros)
+
     metricsDict: dict = {
         "Nº Entregas": {
             "icone": "bi bi-truck",
-            "valor": conversores.MetricInteiroValores(df_entregas_unicas),
+            "valor": conversores.MetricInteiroValores(
+                cubo.contar_distintos("entregas")
+            ),
         },
         "Cubagem Total": {
             "icone": "bi bi-box",
             "valor": conversores.MetricInteiroValores(
-                df_detalhamento[variables_data.Valor_Cubagem].sum()
+                cubo.total(variables_data.Valor_Cubagem)
             ),
         },
         "Valor Total": {
             "icone": "bi bi-cash-stack",
             "valor": conversores.MetricInteiroValores(
-                df_detalhamento[variables_data.Valor_Venda].sum()
+                cubo.total(variables_data.Valor_Venda)
             ),
         },
         "Notas Fiscais": {
             "icone": "bi bi-receipt-cutoff",
-            "valor": conversores.inteiroValores(
-                df_detalhamento[variables_data.Num_NFE].unique().size
-            ),
+            "valor": conversores.inteiroValores(cubo.contar_distintos("notas")),
         },
     }
 
-    return loadCharts(df_detalhamento), supportClass.dictHeaderDash(
-        pageTag, metricsDict
-    )
+    return supportClass.valoresMetricas(metricsDict, METRICAS)
 
 @app.callback(
     Output(f"{pageTag}update", "data"),
@@ -248,7 +401,7 @@ def fig1(df_detalhamento: pd.DataFrame):
         [variables_data.Valor_Cubagem, variables_data.Desc_Cod_Cliente]
     ]
     df_top20 = (
-        df_top20.groupby(variables_data.Desc_Cod_Cliente)[variables_data.Valor_Cubagem]
+        df_top20.groupby(variables_data.Desc_Cod_Cliente, observed=True)[variables_data.Valor_Cubagem]
         .sum()
         .reset_index()
     )
@@ -257,10 +410,6 @@ def fig1(df_detalhamento: pd.DataFrame):
     ).head(20)
     df_top20 = df_top20.sort_values(by=variables_data.Valor_Cubagem, ascending=True)
 
-    df_top20["Cubagem"] = df_top20[variables_data.Valor_Cubagem].apply(
-        conversores.outrosValores
-    )
-
     figDash1 = px.bar(
         df_top20,
         height=816,
@@ -271,18 +420,12 @@ def fig1(df_detalhamento: pd.DataFrame):
             variables_data.Desc_Cod_Cliente: "Cliente",
             variables_data.Valor_Cubagem: "Cubagem Total",
         },
-        text="Cubagem",
         orientation="h",
         color=variables_data.Valor_Cubagem,
         color_continuous_scale=Colors.ORANGE_COLORS,
-        hover_data={
-            variables_data.Valor_Cubagem: False,
-            "Cubagem": True,
-        },
+        hover_data={variables_data.Valor_Cubagem: Graphcs.hoverValor},
     )
 
-    figDash1.update_traces(text=None)
-
     figDash1.update_layout(globalTemplate)
     figDash1.update_layout(
         {
@@ -298,16 +441,11 @@ def fig1(df_detalhamento: pd.DataFrame):
     return figDash1, df_top20
 
 
-def fig2(df_detalhamento: pd.DataFrame):
-    cubagem_mot = (
-        df_detalhamento.groupby(variables_data.Desc_Motorista)
-        .agg(
-            {
-                variables_data.Valor_Cubagem: "sum",
-                variables_data.Valor_Cubagem_Devolvida: "sum",
-            }
-        )
-        .reset_index()
+def fig2(cubo: cubo_agregado.CuboAgregado):
+    cubagem_mot = cubo.somar(
+        variables_data.Desc_Motorista,
+        [variables_data.Valor_Cubagem, variables_data.Valor_Cubagem_Devolvida],
+        rotulos=ROTULOS_MOTORISTA,
     )
 
     cubagem_mot["CUBAGEM_EFETIVA"] = (
@@ -315,10 +453,6 @@ def fig2(df_detalhamento: pd.DataFrame):
         - cubagem_mot[variables_data.Valor_Cubagem_Devolvida]
     ).round()
 
-    cubagem_mot["Cubagem"] = cubagem_mot["CUBAGEM_EFETIVA"].apply(
-        conversores.outrosValores
-    )
-
     if len(cubagem_mot[variables_data.Desc_Motorista]) > 7:
         figDash2 = px.bar(
             cubagem_mot,
@@ -331,10 +465,7 @@ def fig2(df_detalhamento: pd.DataFrame):
                 "CUBAGEM_EFETIVA": "Cubagem Efetiva",
             },
             height=400,
-            hover_data={
-                "CUBAGEM_EFETIVA": False,
-                "Cubagem": True,
-            },
+            hover_data={"CUBAGEM_EFETIVA": Graphcs.hoverValor},
         )
 
         figDash2.update_layout(globalTemplate)
@@ -389,15 +520,11 @@ def fig2(df_detalhamento: pd.DataFrame):
     return figDash2, cubagem_mot
 
 
-def fig3(df_detalhamento: pd.DataFrame):
-    cub_devolvida = (
-        df_detalhamento.groupby(variables_data.Desc_Motorista)
-        .agg({variables_data.Valor_Cubagem_Devolvida: "sum"})
-        .reset_index()
-    )
-
-    cub_devolvida["Cubagem"] = cub_devolvida[variables_data.Valor_Cubagem_Devolvida].apply(
-        conversores.outrosValores
+def fig3(cubo: cubo_agregado.CuboAgregado):
+    cub_devolvida = cubo.somar(
+        variables_data.Desc_Motorista,
+        variables_data.Valor_Cubagem_Devolvida,
+        rotulos=ROTULOS_MOTORISTA,
     )
 
     if len(cub_devolvida[variables_data.Desc_Motorista]) > 7:
@@ -412,10 +539,7 @@ def fig3(df_detalhamento: pd.DataFrame):
                 variables_data.Valor_Cubagem_Devolvida: "Cubagem Devolvida",
             },
             height=400,
-            hover_data={
-                variables_data.Valor_Cubagem_Devolvida: False,
-                "Cubagem": True,
-            },
+            hover_data={variables_data.Valor_Cubagem_Devolvida: Graphcs.hoverValor},
         )
 
         figDash3.update_layout(globalTemplate)
@@ -470,12 +594,12 @@ def fig3(df_detalhamento: pd.DataFrame):
     return figDash3, cub_devolvida
 
 
-def fig4(df_detalhamento: pd.DataFrame):
+def fig4(cubo: cubo_agregado.CuboAgregado):
     cubagem_efetiva = (
-        df_detalhamento[variables_data.Valor_Cubagem].sum()
-        - df_detalhamento[variables_data.Valor_Cubagem_Devolvida].sum()
+        cubo.total(variables_data.Valor_Cubagem)
+        - cubo.total(variables_data.Valor_Cubagem_Devolvida)
     ).round()
-    cubagem_devolvida = df_detalhamento[variables_data.Valor_Cubagem_Devolvida].sum()
+    cubagem_devolvida = cubo.total(variables_data.Valor_Cubagem_Devolvida)
     labels = ["Cubagem Devolvida", "Cubagem Efetiva",]
     values = [cubagem_devolvida, cubagem_efetiva]
 
@@ -503,14 +627,9 @@ def fig4(df_detalhamento: pd.DataFrame):
     return figDash4
 
 
-def fig5(df_detalhamento: pd.DataFrame):
-    df_detalhamento[variables_data.TP_TipoOperacao] = df_detalhamento[
-        variables_data.TP_TipoOperacao
-    ].replace({0: "Venda", 1: "Bonificação", 2: "Troca"})
-    cubagem_por_tipo = (
-        df_detalhamento.groupby(variables_data.TP_TipoOperacao)
-        .agg({variables_data.Valor_Cubagem: "sum"})
-        .reset_index()
+def fig5(cubo: cubo_agregado.CuboAgregado):
+    cubagem_por_tipo = cubo.somar(
+        variables_data.TP_TipoOperacao, variables_data.Valor_Cubagem
     ).round()
     cubagem_por_tipo = cubagem_por_tipo.sort_values(
         by=variables_data.Valor_Cubagem, ascending=True
@@ -542,14 +661,13 @@ def fig5(df_detalhamento: pd.DataFrame):
     return figDash5
 
 
-def fig6(df_detalhamento: pd.DataFrame):
+def fig6(cubo: cubo_agregado.CuboAgregado):
 
-    dfdevol = df_detalhamento[
-        [variables_data.Desc_Motorista, variables_data.Valor_Cubagem_Devolvida]
-    ]
-    dfdevol = dfdevol.groupby([variables_data.Desc_Motorista]).sum().reset_index()
-    dfdevol["Cubagem"] = dfdevol[variables_data.Valor_Cubagem_Devolvida].apply(
-        conversores.outrosValores)
+    dfdevol = cubo.somar(
+        variables_data.Desc_Motorista,
+        variables_data.Valor_Cubagem_Devolvida,
+        rotulos=ROTULOS_MOTORISTA,
+    )
     figDash6 = px.bar(
         dfdevol,
         x=variables_data.Desc_Motorista,
@@ -560,10 +678,7 @@ def fig6(df_detalhamento: pd.DataFrame):
             variables_data.Valor_Cubagem_Devolvida: "Cubagem Devolvida",
             variables_data.Desc_Motorista: "Motorista",
         },
-        hover_data={
-                variables_data.Valor_Cubagem_Devolvida: False,
-                "Cubagem": True,
-            },
+        hover_data={variables_data.Valor_Cubagem_Devolvida: Graphcs.hoverValor},
     )
     figDash6.update_layout(globalTemplate)
 
@@ -597,14 +712,13 @@ def fig6(df_detalhamento: pd.DataFrame):
     return figDash6, dfdevol
 
 
-def fig7(df_detalhamento: pd.DataFrame):
-    dfdevol = df_detalhamento[
-        [variables_data.Desc_Grupo, variables_data.Valor_Cubagem_Devolvida]
-    ]
-    dfdevol = dfdevol.groupby([variables_data.Desc_Grupo]).sum().reset_index()
+def fig7(cubo: cubo_agregado.CuboAgregado):
+    dfdevol = cubo.somar(
+        variables_data.Desc_Grupo,
+        variables_data.Valor_Cubagem_Devolvida,
+        rotulos=ROTULOS_GRUPO,
+    )
     dfdevol = dfdevol[dfdevol[variables_data.Valor_Cubagem_Devolvida] > 1]
-    dfdevol["Cubagem"] = dfdevol[variables_data.Valor_Cubagem_Devolvida].apply(
-        conversores.outrosValores)
     figDash7 = px.bar(
         dfdevol,
         x=variables_data.Desc_Grupo,
@@ -614,10 +728,7 @@ def fig7(df_detalhamento: pd.DataFrame):
             variables_data.Valor_Cubagem_Devolvida: "Cubagem Devolvida",
             variables_data.Desc_Grupo: "Grupo",
         },
-        hover_data={
-                variables_data.Valor_Cubagem_Devolvida: False,
-                "Cubagem": True,
-        },
+        hover_data={variables_data.Valor_Cubagem_Devolvida: Graphcs.hoverValor},
         color_discrete_sequence=globalTemplate["colorway"],
     )
 
@@ -656,14 +767,12 @@ def fig7(df_detalhamento: pd.DataFrame):
 def fig8(df_detalhamento: pd.DataFrame):
 
     dfcubagem = df_detalhamento.groupby(
-        [variables_data.Cod_Cliente, variables_data.Desc_Motorista]
+        [variables_data.Cod_Cliente, variables_data.Desc_Motorista], observed=True
     ).agg({variables_data.Valor_Cubagem: "sum", variables_data.Num_NFE: "nunique"})
-    dfcubagem = dfcubagem.groupby([variables_data.Desc_Motorista]).sum().reset_index()
+    dfcubagem = dfcubagem.groupby([variables_data.Desc_Motorista], observed=True).sum().reset_index()
     dfcubagem["CUBAGEM_MEDIA"] = (
         dfcubagem[variables_data.Valor_Cubagem] / dfcubagem[variables_data.Num_NFE]
     )
-    dfcubagem["Cubagem Média"] = dfcubagem["CUBAGEM_MEDIA"].apply(
-        conversores.outrosValores)
 
     figDash8 = px.bar(
         dfcubagem,
@@ -677,8 +786,7 @@ def fig8(df_detalhamento: pd.DataFrame):
         hover_data={
                 variables_data.Desc_Motorista: True,
                 variables_data.Valor_Cubagem: False,
-                "CUBAGEM_MEDIA": True,
-                "Cubagem Média": False,
+                "CUBAGEM_MEDIA": Graphcs.hoverValor,
         },
         color_discrete_sequence=globalTemplate["colorway"],
     )
@@ -715,16 +823,12 @@ def fig8(df_detalhamento: pd.DataFrame):
     return figDash8, dfcubagem
 
 
-def fig9(df_detalhamento: pd.DataFrame):
-    dfcubdev = df_detalhamento[
-        [variables_data.Desc_Grupo, variables_data.Valor_Cubagem]
-    ]
-    dfcubdev = dfcubdev.groupby([variables_data.Desc_Grupo]).sum().reset_index()
+def fig9(cubo: cubo_agregado.CuboAgregado):
+    dfcubdev = cubo.somar(
+        variables_data.Desc_Grupo, variables_data.Valor_Cubagem, rotulos=ROTULOS_GRUPO
+    )
     dfcubdev = dfcubdev.sort_values(by=variables_data.Desc_Grupo)
     dfcubdev = dfcubdev[dfcubdev[variables_data.Valor_Cubagem] > 1]
-    dfcubdev["Cubagem"] = dfcubdev[
-        variables_data.Valor_Cubagem
-    ].apply(conversores.outrosValores)
 
     figDash9 = px.line(
         dfcubdev,
@@ -736,8 +840,7 @@ def fig9(df_detalhamento: pd.DataFrame):
             variables_data.Desc_Grupo: "Grupo",
         },
         hover_data={
-            variables_data.Valor_Cubagem: False,
-            "Cubagem": True,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
             variables_data.Desc_Grupo: True,
         },
         markers=True,
@@ -762,13 +865,9 @@ def fig9(df_detalhamento: pd.DataFrame):
     return figDash9, dfcubdev
 
 
-def fig10(df_detalhamento: pd.DataFrame):
+def fig10(cubo: cubo_agregado.CuboAgregado):
 
-    dfvlr = df_detalhamento[[variables_data.Desc_Cidade, variables_data.Valor_Cubagem]]
-    dfvlr = dfvlr.groupby([variables_data.Desc_Cidade]).sum().reset_index()
-    dfvlr["Cubagem Total"] = dfvlr[variables_data.Valor_Cubagem].apply(
-        conversores.outrosValores
-    )
+    dfvlr = cubo.somar(variables_data.Desc_Cidade, variables_data.Valor_Cubagem)
 
     figDash10 = px.line(
         dfvlr,
@@ -781,8 +880,7 @@ def fig10(df_detalhamento: pd.DataFrame):
         },
         hover_data={
             variables_data.Desc_Cidade: True,
-            "Cubagem Total": False,
-            variables_data.Valor_Cubagem: True,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
         },
         markers=True,
         log_y=False,
@@ -804,12 +902,8 @@ def fig10(df_detalhamento: pd.DataFrame):
     return figDash10, dfvlr
 
 
-def fig11(df_detalhamento: pd.DataFrame):
-    dfveic = df_detalhamento[[variables_data.Desc_Placa, variables_data.Valor_Cubagem]]
-    dfveic = dfveic.groupby([variables_data.Desc_Placa]).sum().reset_index()
-    dfveic["Cubagem Total"] = dfveic[variables_data.Valor_Cubagem].apply(
-        conversores.outrosValores
-    )
+def fig11(cubo: cubo_agregado.CuboAgregado):
+    dfveic = cubo.somar(variables_data.Desc_Placa, variables_data.Valor_Cubagem)
 
     figDash11 = px.line(
         dfveic,
@@ -822,8 +916,7 @@ def fig11(df_detalhamento: pd.DataFrame):
         },
         hover_data={
             variables_data.Desc_Placa: True,
-            variables_data.Valor_Cubagem: True,
-            "Cubagem Total": False,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
         },
         markers=True,
         log_y=True,
@@ -846,17 +939,13 @@ def fig11(df_detalhamento: pd.DataFrame):
     return figDash11, dfveic
 
 
-def fig12(df_detalhamento: pd.DataFrame):
-    Devol_Motivo = (
-        df_detalhamento.groupby(variables_data.Desc_Motivo_Devolucao)
-        .agg({variables_data.Valor_Cubagem_Devolvida: "sum"})
-        .reset_index()
+def fig12(cubo: cubo_agregado.CuboAgregado):
+    Devol_Motivo = cubo.somar(
+        variables_data.Desc_Motivo_Devolucao, variables_data.Valor_Cubagem_Devolvida
     )
     Devol_Motivo = Devol_Motivo[
         Devol_Motivo[variables_data.Valor_Cubagem_Devolvida] > 0
     ]
-    Devol_Motivo["Cubagem Devolvida"] = Devol_Motivo[variables_data.Valor_Cubagem_Devolvida].apply(
-        conversores.outrosValores)
 
     figDash12 = go.Figure(
         go.Pie(
@@ -864,9 +953,10 @@ def fig12(df_detalhamento: pd.DataFrame):
             values=Devol_Motivo[variables_data.Valor_Cubagem_Devolvida],
             hole=0.5,
             textinfo="label+percent",
-            customdata=Devol_Motivo["Cubagem Devolvida"],
             texttemplate="%{label}<br>%{percent}",
-            hovertemplate="<b>%{label}</b><br>Cubagem Devolvida: %{customdata}<br>%{percent}",
+            hovertemplate="<b>%{label}</b><br>Cubagem Devolvida: "
+            + Graphcs.formato("value")
+            + "<br>%{percent}",
             showlegend=False,
             marker=dict(colors=Colors.DISTINCT_GRAPH_COLORS),
             sort=False,
@@ -885,26 +975,11 @@ def fig12(df_detalhamento: pd.DataFrame):
 
     return figDash12, Devol_Motivo
 
-def fig13(df_detalhamento: pd.DataFrame) -> tuple[go.Figure, pd.DataFrame]:
-
-    locale.setlocale(locale.LC_TIME, "pt_BR.UTF-8")
-
-    cubagem_data = (
-        df_detalhamento.groupby(variables_data.DT_Emissao)
-        .agg({variables_data.Valor_Cubagem: "sum"})
-        .reset_index()
-    )
+def fig13(cubo: cubo_agregado.CuboAgregado) -> tuple[go.Figure, pd.DataFrame]:
 
-    cubagem_data[variables_data.DT_Emissao] = pd.to_datetime(
-        cubagem_data[variables_data.DT_Emissao]
-    )
-    cubagem_data["Data"] = cubagem_data[
-        variables_data.DT_Emissao
-    ].dt.strftime("%d %B")
+    cubagem_data = cubo.somar(variables_data.DT_Emissao, variables_data.Valor_Cubagem)
 
-    cubagem_data["Cubagem"] = cubagem_data[
-        variables_data.Valor_Cubagem
-    ].apply(conversores.outrosValores)
+    cubagem_data["Data"] = conversores.diaMes(cubagem_data[variables_data.DT_Emissao])
 
     figDash13 = px.bar(
         cubagem_data,
@@ -916,9 +991,8 @@ def fig13(df_detalhamento: pd.DataFrame) -> tuple[go.Figure, pd.DataFrame]:
             "Data": "Data",
         },
         hover_data={
-            "Cubagem": True,
             "Data": True,
-            variables_data.Valor_Cubagem: False,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
         },
         color_discrete_sequence=globalTemplate["colorway"],
     )
@@ -958,17 +1032,56 @@ def fig13(df_detalhamento: pd.DataFrame) -> tuple[go.Figure, pd.DataFrame]:
 
     return figDash13, cubagem_data
 
-def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
-    df_detalhamento[variables_data.Desc_Motorista] = df_detalhamento[
-        variables_data.Desc_Motorista
-    ].apply(conversores.abreviar)
-    df_detalhamento[variables_data.Desc_Grupo] = df_detalhamento[
-        variables_data.Desc_Grupo
-    ].apply(conversores.abreviar)
-    df_detalhamento[variables_data.Desc_Cod_Cliente] = df_detalhamento[
-        variables_data.Desc_Cod_Cliente
-    ].apply(lambda x: conversores.abreviar(x, 20))
+FIGURAS = {
+    1: fig1,
+    2: fig2,
+    3: fig3,
+    4: fig4,
+    5: fig5,
+    6: fig6,
+    7: fig7,
+    8: fig8,
+    9: fig9,
+    10: fig10,
+    11: fig11,
+    12: fig12,
+    13: fig13,
+}
+# Figuras que usam o detalhamento; as demais saem do cubo
+FIGURAS_DETALHAMENTO = (1, 8)
+
+
+def calcularGrafico(session_id: str, filtros: dict, numero: int):
+    with tempos.medir(f"[{pageTag}] fig{numero} {session_id}"):
+        df_detalhamento, cubo = dadosFiltrados(session_id, filtros)
+        funcao = FIGURAS[numero]
+        if numero not in FIGURAS_DETALHAMENTO:
+            return funcao(cubo)
+        # Cópia: sem filtro, df_detalhamento é o próprio frame da sessão
+        df_detalhamento = df_detalhamento.assign(
+            **{
+                variables_data.Desc_Motorista: df_detalhamento[
+                    variables_data.Desc_Motorista
+                ].apply(conversores.abreviar),
+                variables_data.Desc_Cod_Cliente: df_detalhamento[
+                    variables_data.Desc_Cod_Cliente
+                ].apply(lambda x: conversores.abreviar(x, 20)),
+            }
+        )
+        return funcao(df_detalhamento)
+
 
+def cardGrafico(numero: int, **kwargs):
+    """
+    Gráfico vazio do card (só com o template); os traces e o layout chegam
+    pelo callback dele como Patch (figuras.atualizacao).
+    """
+    return dcc.Loading(
+        dcc.Graph(id=f"{pageTag}graph{numero}", figure=figuras.vazia(), **kwargs)
+    )
+
+
+def loadCharts() -> html.Div:
     return html.Div(
         [
             dbc.Row(
@@ -977,7 +1090,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig1(df_detalhamento)[0]),
+                                    cardGrafico(1),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -989,8 +1102,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Top 20 Clientes por cubagem",
-                                        fig1(df_detalhamento)[0],
-                                        fig1(df_detalhamento)[1],
                                         pageTag,
                                         "1",
                                     ),
@@ -1007,9 +1118,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(
-                                                    figure=fig2(df_detalhamento)[0]
-                                                ),
+                                                cardGrafico(2),
                                                 dbc.Button(
                                                     "Ver detalhes",
                                                     color="primary",
@@ -1021,8 +1130,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                                 ),
                                                 packCode.detailModal(
                                                     "Cubagem Efetiva por Motorista",
-                                                    fig2(df_detalhamento)[0],
-                                                    fig2(df_detalhamento)[1],
                                                     pageTag,
                                                     "2",
                                                 ),
@@ -1038,9 +1145,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(
-                                                    figure=fig3(df_detalhamento)[0]
-                                                ),
+                                                cardGrafico(3),
                                                 dbc.Button(
                                                     "Ver detalhes",
                                                     color="primary",
@@ -1052,8 +1157,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                                 ),
                                                 packCode.detailModal(
                                                     "Cubagem Devolvida por Motorista",
-                                                    fig3(df_detalhamento)[0],
-                                                    fig3(df_detalhamento)[1],
                                                     pageTag,
                                                     "3",
                                                 ),
@@ -1073,7 +1176,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(figure=fig5(df_detalhamento)),
+                                                cardGrafico(5),
                                             ],
                                             class_name="shadow-sm p-1 card-com-hover",
                                         )
@@ -1086,7 +1189,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(figure=fig4(df_detalhamento)),
+                                                cardGrafico(4),
                                             ],
                                             class_name="shadow-sm p-1 card-com-hover",
                                         )
@@ -1105,7 +1208,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig6(df_detalhamento)[0]),
+                                    cardGrafico(6),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1117,8 +1220,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Devolução por Motorista",
-                                        fig6(df_detalhamento)[0],
-                                        fig6(df_detalhamento)[1],
                                         pageTag,
                                         "6",
                                     ),
@@ -1132,7 +1233,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig7(df_detalhamento)[0]),
+                                    cardGrafico(7),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1144,8 +1245,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Devolução por Grupo",
-                                        fig7(df_detalhamento)[0],
-                                        fig7(df_detalhamento)[1],
                                         pageTag,
                                         "7",
                                     ),
@@ -1159,7 +1258,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig8(df_detalhamento)[0]),
+                                    cardGrafico(8),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1171,8 +1270,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Cubagem Média por Entrega",
-                                        fig8(df_detalhamento)[0],
-                                        fig8(df_detalhamento)[1],
                                         pageTag,
                                         "8",
                                     ),
@@ -1191,7 +1288,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig9(df_detalhamento)[0]),
+                                    cardGrafico(9),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1203,8 +1300,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Cubagem por Grupo",
-                                        fig9(df_detalhamento)[0],
-                                        fig9(df_detalhamento)[1],
                                         pageTag,
                                         "9",
                                     ),
@@ -1218,7 +1313,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig10(df_detalhamento)[0]),
+                                    cardGrafico(10),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1230,8 +1325,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Cubagem por Cidade",
-                                        fig10(df_detalhamento)[0],
-                                        fig10(df_detalhamento)[1],
                                         pageTag,
                                         "10",
                                     ),
@@ -1250,7 +1343,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig11(df_detalhamento)[0]),
+                                    cardGrafico(11),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1262,8 +1355,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Cubagem por Veículo",
-                                        fig11(df_detalhamento)[0],
-                                        fig11(df_detalhamento)[1],
                                         pageTag,
                                         "11",
                                     ),
@@ -1277,7 +1368,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig12(df_detalhamento)[0]),
+                                    cardGrafico(12),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1289,8 +1380,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Cubagem Devolvida por Motivo",
-                                        fig12(df_detalhamento)[0],
-                                        fig12(df_detalhamento)[1],
                                         pageTag,
                                         "12",
                                     ),
@@ -1309,7 +1398,7 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig13(df_detalhamento)[0]),
+                                    cardGrafico(13),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -1321,8 +1410,6 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Quantidade Cubagem por Dia",
-                                        fig13(df_detalhamento)[0],
-                                        fig13(df_detalhamento)[1],
                                         pageTag,
                                         "13",
                                     ),
@@ -1338,20 +1425,85 @@ def loadCharts(df_detalhamento: pd.DataFrame) -> html.Div:
         ]
     )
 
-def create_modal_callback(modal_id):
+Interface.modaisDetalhe(app, pageTag, range(1, 14))
+
+
+def create_detail_callback(modal_id):
+    @app.callback(
+        [
+            Output(f"graph-{pageTag}-det-fig{modal_id}", "figure"),
+            Output(f"tabela-{pageTag}-det-fig{modal_id}", "columns"),
+            Output(f"tabela-{pageTag}-det-fig{modal_id}", "data"),
+            Output(f"tabela-{pageTag}-det-fig{modal_id}", "page_count"),
+        ],
+        [
+            Input(f"modal-{pageTag}-det-fig{modal_id}", "is_open"),
+            Input(f"tabela-{pageTag}-det-fig{modal_id}", "page_current"),
+            Input(f"tabela-{pageTag}-det-fig{modal_id}", "page_size"),
+            Input(f"tabela-{pageTag}-det-fig{modal_id}", "sort_by"),
+        ],
+        [
+            State(f"{pageTag}fil_cidade", "value"),
+            State(f"{pageTag}fil_rota", "value"),
+            State(f"{pageTag}fil_bairro", "value"),
+            State(f"{pageTag}fil_motorista", "value"),
+            State(f"{pageTag}fil_supervisor", "value"),
+            State(f"{pageTag}fil_vendedor", "value"),
+            State(f"{pageTag}fil_grupo", "value"),
+            State(f"{pageTag}fil_sku", "value"),
+            State(f"{pageTag}fil_placa", "value"),
+            State("session_data", "data"),
+        ],
+    )
+    def show_detail(is_open, page_current, page_size, sort_by, *args):
+        *filtros_pagina, session_data = args
+        session_id = session_data.get("session_id", "")
+        if not is_open or not sessionDF.contem_sessao(session_id):
+            raise PreventUpdate
+
+        fig, tabela = grafico(session_id, montarFiltros(*filtros_pagina), modal_id)
+        registros, paginas = detalhes.pagina(tabela, page_current, page_size, sort_by)
+        # O gráfico só vai quando o modal abre; paginar e ordenar mandam a tabela
+        abriu = callback_context.triggered_id == f"modal-{pageTag}-det-fig{modal_id}"
+        return (
+            fig if abriu else dash.no_update,
+            detalhes.colunas(tabela),
+            registros,
+            paginas,
+        )
+
+# Conteúdo dos modais só quando abertos
+for i in (1, 2, 3, 6, 7, 8, 9, 10, 11, 12, 13):
+    create_detail_callback(i)
+
+
+def create_chart_callback(numero):
     @app.callback(
-        Output(f"modal-{pageTag}-det-fig{modal_id}", "is_open"),
+        Output(f"{pageTag}graph{numero}", "figure"),
         [
-            Input(f"btn-{pageTag}-det-fig{modal_id}", "n_clicks"),
-            Input(f"close-modal-{pageTag}-det-fig{modal_id}", "n_clicks"),
+            Input(f"{pageTag}fil_cidade", "value"),
+            Input(f"{pageTag}fil_rota", "value"),
+            Input(f"{pageTag}fil_bairro", "value"),
+            Input(f"{pageTag}fil_motorista", "value"),
+            Input(f"{pageTag}fil_supervisor", "value"),
+            Input(f"{pageTag}fil_vendedor", "value"),
+            Input(f"{pageTag}fil_grupo", "value"),
+            Input(f"{pageTag}fil_sku", "value"),
+            Input(f"{pageTag}fil_placa", "value"),
         ],
-        [State(f"modal-{pageTag}-det-fig{modal_id}", "is_open")],
+        State("session_data", "data"),
     )
-    def toggle_modal(n1, n2, is_open):
-        if n1 or n2:
-            return not is_open
-        return is_open
-
-# Criar callbacks para cada modal
-for i in range(1, 14):
-    create_modal_callback(i)
+    def show_chart(*args):
+        *filtros_pagina, session_data = args
+        session_id = session_data.get("session_id", "")
+        if not sessionDF.contem_sessao(session_id):
+            raise PreventUpdate
+
+        resultado = grafico(session_id, montarFiltros(*filtros_pagina), numero)
+        figura = resultado[0] if isinstance(resultado, tuple) else resultado
+        return figuras.atualizacao(figura)
+
+# Um callback por card: cada gráfico vai para a página assim que fica pronto,
+# em requisições separadas (em paralelo entre os workers do gunicorn)
+for i in FIGURAS:
+    create_chart_callback(i)
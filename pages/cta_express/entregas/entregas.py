@@ -1,16 +1,18 @@
 from app import app
 import dash
 from app import session_dataframes_cta_express as sessionDF
+from app import memo_filtros
+from dash.exceptions import PreventUpdate
 from dash import Input, Output, State, dcc, html
 import plotly.express as px
 import dash_bootstrap_components as dbc
-from utils import conversores, read_file
+from utils import busca, conversores, read_file, cubo as cubo_agregado, figuras, filtros as indice_filtros, tempos
 import pandas as pd
 import plotly.graph_objects as go
-from assets.static import packCode, Colors, supportClass
+from assets.static import packCode, Colors, Settings, supportClass
 from stylesDocs.style import styleConfig
 from pages.cta_express.cta_express_globals import variables_data
-from assets.static import packCode, Colors, Graphcs
+from assets.static import packCode, Colors, Graphcs, Interface
 import locale
 
 
@@ -19,16 +21,19 @@ styleColors = styleConfig(Colors.themecolor)
 pxGraficos = Graphcs.pxGraficos
 globalTemplate = Graphcs.globalTemplate
 
+# Nomes abreviados nos eixos, aplicados às dimensões do cubo antes de somar
+ROTULOS_MOTORISTA = {variables_data.Desc_Motorista: conversores.abreviar}
 
-@app.callback(
-    Output(f"{pageTag}collapse-filters", "is_open"),
-    Input(f"{pageTag}collapse-button", "n_clicks"),
-    State(f"{pageTag}collapse-filters", "is_open"),
+
+# Métricas do HeaderDash atualizadas pela troca de filtro (showBody)
+METRICAS = (
+    "Nº Entregas",
+    "Nº NFe's Entregues",
+    "Cubagem Entregue",
+    "Valor Total",
 )
-def toggle_collapse(n_clicks, is_open):
-    if n_clicks:
-        return not is_open
-    return is_open
+
+Interface.collapseFiltros(app, pageTag)
 
 
 @app.callback(
@@ -39,32 +44,32 @@ def toggle_collapse(n_clicks, is_open):
 def showHeader(initData, session_data):
     session_id = session_data.get("session_id", "")
 
-    if initData == 1 and session_id:
+    if initData == 1 and session_id and sessionDF.contem_sessao(session_id):
         df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
-        df_entregas_unicas = df_detalhamento.drop_duplicates(
-            subset=[variables_data.Guid_Carga, variables_data.Cod_Cliente]
-        )
+        cubo = cubo_agregado.consultar(sessionDF, session_id, {}, df_detalhamento)
         metricsDict: dict = {
             "Nº Entregas": {
                 "icone": "bi bi-truck",
-                "valor": conversores.MetricInteiroValores(df_entregas_unicas.shape[0]),
+                "valor": conversores.MetricInteiroValores(
+                    cubo.contar_distintos("entregas")
+                ),
             },
             "Nº NFe's Entregues": {
                 "icone": "bi bi-receipt-cutoff",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Num_NFE].unique().size
+                    cubo.contar_distintos("notas")
                 ),
             },
             "Cubagem Entregue": {
                 "icone": "bi bi-box",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Valor_Cubagem].sum()
+                    cubo.total(variables_data.Valor_Cubagem)
                 ),
             },
             "Valor Total": {
                 "icone": "bi bi-cash-stack",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Valor_Venda].sum()
+                    cubo.total(variables_data.Valor_Venda)
                 ),
             },
         }
@@ -111,7 +116,7 @@ def showHeader(initData, session_data):
                 "valueDefault": "Todos",
             },
             f"{pageTag}fil_sku": {
-                "distValue": df_detalhamento[variables_data.Desc_Produto].unique(),
+                "busca": True,
                 "labelName": "Produto",
                 "valueDefault": "Todos",
             },
@@ -129,7 +134,7 @@ def showHeader(initData, session_data):
 
 
 @app.callback(
-    [Output(f"{pageTag}body", "children"), Output(f"{pageTag}metrics", "children")],
+    supportClass.saidasMetricas(pageTag, METRICAS),
     [
         Input(f"{pageTag}fil_cidade", "value"),
         Input(f"{pageTag}fil_rota", "value"),
@@ -156,82 +161,236 @@ def showBody(
     session_data,
 ):
     session_id = session_data.get("session_id", "")
+    if not sessionDF.contem_sessao(session_id):
+        raise PreventUpdate
 
-    df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
-    df_resumo: pd.DataFrame = sessionDF[f"{session_id}_resumo"]
-    if "Todos" not in fil_cidade and len(fil_cidade) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Cidade, filtro=fil_cidade
-        )
-    if "Todos" not in fil_rota and len(fil_rota) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Rota, filtro=fil_rota
-        )
-    if "Todos" not in fil_bairro and len(fil_bairro) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Bairro, filtro=fil_bairro
-        )
-    if "Todos" not in fil_motorista and len(fil_motorista) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento,
-            tabela=variables_data.Desc_Motorista,
-            filtro=fil_motorista,
-        )
-    if "Todos" not in fil_supervisor and len(fil_supervisor) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento,
-            tabela=variables_data.Desc_Supervisor,
-            filtro=fil_supervisor,
-        )
-    if "Todos" not in fil_vendedor and len(fil_vendedor) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Vendedor, filtro=fil_vendedor
-        )
-    if "Todos" not in fil_grupo and len(fil_grupo) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Grupo, filtro=fil_grupo
-        )
-    if "Todos" not in fil_sku and len(fil_sku) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Produto, filtro=fil_sku
-        )
-    if "Todos" not in fil_placa and len(fil_placa) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Placa, filtro=fil_placa
-        )
+    filtros = montarFiltros(
+        fil_cidade,
+        fil_rota,
+        fil_bairro,
+        fil_motorista,
+        fil_supervisor,
+        fil_vendedor,
+        fil_grupo,
+        fil_sku,
+        fil_placa,
+    )
+    return memo_filtros.obter(
+        session_id, pageTag, filtros, lambda: montarMetricas(session_id, filtros)
+    )
 
-    df_entregas_unicas = df_detalhamento.drop_duplicates(
-        subset=[variables_data.Guid_Carga, variables_data.Cod_Cliente]
+
+def montarFiltros(
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_sku,
+    fil_placa,
+) -> dict:
+    return indice_filtros.filtros_ativos(
+        {
+            variables_data.Desc_Cidade: fil_cidade,
+            variables_data.Desc_Rota: fil_rota,
+            variables_data.Desc_Bairro: fil_bairro,
+            variables_data.Desc_Motorista: fil_motorista,
+            variables_data.Desc_Supervisor: fil_supervisor,
+            variables_data.Desc_Vendedor: fil_vendedor,
+            variables_data.Desc_Grupo: fil_grupo,
+            variables_data.Desc_Produto: fil_sku,
+            variables_data.Desc_Placa: fil_placa,
+        }
     )
 
+
+@app.callback(
+    [
+        Output(f"{pageTag}fil_cidade", "options"),
+        Output(f"{pageTag}fil_rota", "options"),
+        Output(f"{pageTag}fil_bairro", "options"),
+        Output(f"{pageTag}fil_motorista", "options"),
+        Output(f"{pageTag}fil_supervisor", "options"),
+        Output(f"{pageTag}fil_vendedor", "options"),
+        Output(f"{pageTag}fil_grupo", "options"),
+        Output(f"{pageTag}fil_placa", "options"),
+    ],
+    [
+        Input(f"{pageTag}fil_cidade", "value"),
+        Input(f"{pageTag}fil_rota", "value"),
+        Input(f"{pageTag}fil_bairro", "value"),
+        Input(f"{pageTag}fil_motorista", "value"),
+        Input(f"{pageTag}fil_supervisor", "value"),
+        Input(f"{pageTag}fil_vendedor", "value"),
+        Input(f"{pageTag}fil_grupo", "value"),
+        Input(f"{pageTag}fil_sku", "value"),
+        Input(f"{pageTag}fil_placa", "value"),
+    ],
+    State("session_data", "data"),
+)
+def showOpcoes(
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_sku,
+    fil_placa,
+    session_data,
+):
+    """
+    Opções em cascata: cada dropdown só mostra valores que ainda têm dados.
+    Produto não recebe a lista completa; as opções dele vêm de buscarProduto.
+    """
+    session_id = session_data.get("session_id", "")
+    tabela = sessionDF.get(f"{session_id}_coocorrencias")
+    if tabela is None:
+        raise PreventUpdate
+
+    selecao = {
+        variables_data.Desc_Cidade: fil_cidade,
+        variables_data.Desc_Rota: fil_rota,
+        variables_data.Desc_Bairro: fil_bairro,
+        variables_data.Desc_Motorista: fil_motorista,
+        variables_data.Desc_Supervisor: fil_supervisor,
+        variables_data.Desc_Vendedor: fil_vendedor,
+        variables_data.Desc_Grupo: fil_grupo,
+        variables_data.Desc_Produto: fil_sku,
+        variables_data.Desc_Placa: fil_placa,
+    }
+    filtros = indice_filtros.filtros_ativos(selecao)
+    permitidas = memo_filtros.obter(
+        session_id,
+        f"opcoes:{pageTag}",
+        filtros,
+        lambda: indice_filtros.opcoes(
+            tabela, filtros, [c for c in selecao if c != variables_data.Desc_Produto]
+        ),
+    )
+    return indice_filtros.opcoes_dropdown(permitidas, selecao)
+
+
+@app.callback(
+    Output(f"{pageTag}fil_sku", "options"),
+    Input(f"{pageTag}fil_sku", "search_value"),
+    [
+        State(f"{pageTag}fil_sku", "value"),
+        State(f"{pageTag}fil_cidade", "value"),
+        State(f"{pageTag}fil_rota", "value"),
+        State(f"{pageTag}fil_bairro", "value"),
+        State(f"{pageTag}fil_motorista", "value"),
+        State(f"{pageTag}fil_supervisor", "value"),
+        State(f"{pageTag}fil_vendedor", "value"),
+        State(f"{pageTag}fil_grupo", "value"),
+        State(f"{pageTag}fil_placa", "value"),
+    ],
+    State("session_data", "data"),
+)
+def buscarProduto(
+    search_value,
+    fil_sku,
+    fil_cidade,
+    fil_rota,
+    fil_bairro,
+    fil_motorista,
+    fil_supervisor,
+    fil_vendedor,
+    fil_grupo,
+    fil_placa,
+    session_data,
+):
+    if not search_value:
+        raise PreventUpdate
+    session_id = session_data.get("session_id", "")
+
+    filtros = indice_filtros.filtros_ativos(
+        {
+            variables_data.Desc_Cidade: fil_cidade,
+            variables_data.Desc_Rota: fil_rota,
+            variables_data.Desc_Bairro: fil_bairro,
+            variables_data.Desc_Motorista: fil_motorista,
+            variables_data.Desc_Supervisor: fil_supervisor,
+            variables_data.Desc_Vendedor: fil_vendedor,
+            variables_data.Desc_Grupo: fil_grupo,
+            variables_data.Desc_Placa: fil_placa,
+        }
+    )
+    opcoes = busca.buscar_sessao(
+        memo_filtros,
+        sessionDF,
+        session_id,
+        variables_data.Desc_Produto,
+        filtros,
+        search_value,
+        fil_sku,
+        Settings.BuscaLimite,
+    )
+    if opcoes is None:
+        raise PreventUpdate
+    return opcoes
+
+
+def dadosFiltrados(session_id: str, filtros: dict):
+    df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
+    df_detalhamento = memo_filtros.filtrar(
+        session_id, "detalhamento", df_detalhamento, filtros
+    )
+    # Um cubo por estado de filtro para todos os cards (e entre as páginas):
+    # com filtro fora das dimensões ele é montado das linhas filtradas
+    cubo = memo_filtros.obter(
+        session_id,
+        "cubo",
+        filtros,
+        lambda: cubo_agregado.consultar(sessionDF, session_id, filtros, df_detalhamento),
+    )
+    return df_detalhamento, cubo
+
+
+def grafico(session_id: str, filtros: dict, numero: int):
+    """Figura ``numero`` do estado de filtro, guardada em memo_filtros."""
+    return memo_filtros.obter(
+        session_id,
+        f"{pageTag}fig{numero}",
+        filtros,
+        lambda: figuras.compactar(
+            calcularGrafico(session_id, filtros, numero), f"{pageTag}fig{numero}"
+        ),
+    )
+
+
+def montarMetricas(session_id: str, filtros: dict):
+    _, cubo = dadosFiltrados(session_id, filtros)
+
     metricsDict: dict = {
         "Nº Entregas": {
             "icone": "bi bi-truck",
-            "valor": conversores.MetricInteiroValores(df_entregas_unicas.shape[0]),
+            "valor": conversores.MetricInteiroValores(
+                cubo.contar_distintos("entregas")
+            ),
         },
         "Nº NFe's Entregues": {
             "icone": "bi bi-receipt-cutoff",
-            "valor": conversores.MetricInteiroValores(
-                df_detalhamento[variables_data.Num_NFE].unique().size
-            ),
+            "valor": conversores.MetricInteiroValores(cubo.contar_distintos("notas")),
         },
         "Cubagem Entregue": {
             "icone": "bi bi-box",
             "valor": conversores.MetricInteiroValores(
-                df_detalhamento[variables_data.Valor_Cubagem].sum()
+                cubo.total(variables_data.Valor_Cubagem)
             ),
         },
         "Valor Total": {
             "icone": "bi bi-cash-stack",
             "valor": conversores.MetricInteiroValores(
-                df_detalhamento[variables_data.Valor_Venda].sum()
+                cubo.total(variables_data.Valor_Venda)
             ),
         },
     }
 
-    return loadCharts(df_detalhamento, df_resumo), supportClass.dictHeaderDash(
-        pageTag, metricsDict
-    )
+    return supportClass.valoresMetricas(metricsDict, METRICAS)
 
 
 @app.callback(
@@ -257,7 +416,7 @@ def fig1(df_detalhamento: pd.DataFrame):
 
     top20_entregas = (
         entregas_unicas.groupby(
-            [variables_data.Cod_Cliente, variables_data.Desc_Cod_Cliente]
+            [variables_data.Cod_Cliente, variables_data.Desc_Cod_Cliente], observed=True
         )[variables_data.Guid_Carga]
         .count()
         .reset_index()
@@ -268,9 +427,6 @@ def fig1(df_detalhamento: pd.DataFrame):
         .head(20)
         .sort_values(by=variables_data.Guid_Carga, ascending=True)
     )
-    top20_entregas["Entregas Totais"] = top20_entregas[variables_data.Guid_Carga].apply(
-        conversores.outrosValores
-    )
 
     figDash1 = px.bar(
         top20_entregas,
@@ -286,13 +442,13 @@ def fig1(df_detalhamento: pd.DataFrame):
         },
         hover_data={
             variables_data.Cod_Cliente: False,
-            variables_data.Guid_Carga: True,
+            variables_data.Guid_Carga: Graphcs.hoverInteiro,
         },
         height=816,
     )
 
     figDash1.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         bargap=0.2,
         xaxis=dict(
@@ -310,19 +466,12 @@ def fig1(df_detalhamento: pd.DataFrame):
     return figDash1
 
 
-def fig2(df_detalhamento: pd.DataFrame):
-    entregas_mot = df_detalhamento.drop_duplicates(
-        subset=[variables_data.Guid_Carga, variables_data.Cod_Cliente]
-    )
-
-    entregas_mot = (
-        entregas_mot.groupby([variables_data.Desc_Motorista])[variables_data.Guid_Carga]
-        .count()
-        .reset_index()
-    )
-
-    entregas_mot["Entregas Totais"] = entregas_mot[variables_data.Guid_Carga].apply(
-        conversores.outrosValores
+def fig2(cubo: cubo_agregado.CuboAgregado):
+    entregas_mot = cubo.contar_distintos(
+        "entregas",
+        variables_data.Desc_Motorista,
+        variables_data.Guid_Carga,
+        rotulos=ROTULOS_MOTORISTA,
     )
 
     figDash2 = px.bar(
@@ -331,11 +480,11 @@ def fig2(df_detalhamento: pd.DataFrame):
         y=variables_data.Guid_Carga,
         labels={
             variables_data.Desc_Motorista: "Motorista",
+            variables_data.Guid_Carga: "Entregas Totais",
         },
         hover_data={
-            "Entregas Totais": True,
             variables_data.Desc_Motorista: True,
-            variables_data.Guid_Carga: False,
+            variables_data.Guid_Carga: Graphcs.hoverInteiro,
         },
         title="Entregas por Motorista",
     )
@@ -346,7 +495,7 @@ def fig2(df_detalhamento: pd.DataFrame):
     )
 
     figDash2.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         height=400,
         title_font=dict(size=18),
         margin=dict(l=50, r=20, t=70, b=50),
@@ -358,21 +507,14 @@ def fig2(df_detalhamento: pd.DataFrame):
     return figDash2
 
 
-def fig3(df_detalhamento: pd.DataFrame):
-    entregas_cid = df_detalhamento.drop_duplicates(
-        subset=[variables_data.Guid_Carga, variables_data.Cod_Cliente]
-    )
-
+def fig3(cubo: cubo_agregado.CuboAgregado):
     entregas_cid = (
-        entregas_cid.groupby([variables_data.Desc_Cidade])[variables_data.Guid_Carga]
-        .count()
-        .reset_index()
+        cubo.contar_distintos(
+            "entregas", variables_data.Desc_Cidade, variables_data.Guid_Carga
+        )
         .sort_values(by=variables_data.Guid_Carga, ascending=True)
         .reset_index(drop=True)
     )
-    entregas_cid["Entregas"] = entregas_cid[
-        variables_data.Guid_Carga
-    ].apply(conversores.outrosValores)
 
     figDash3 = px.bar(
         entregas_cid,
@@ -385,15 +527,17 @@ def fig3(df_detalhamento: pd.DataFrame):
             variables_data.Guid_Carga: "Entregas",
         },
         hover_data={
-            "Cidade": True,
-            "Entregas": True,
+            variables_data.Desc_Cidade: True,
+            variables_data.Guid_Carga: Graphcs.hoverInteiro,
         },
         color_discrete_sequence=globalTemplate["colorway"],
         height=400,
     )
 
     figDash3.update_traces(
-        texttemplate="%{x}", textposition="outside", marker_line_width=0
+        texttemplate=Graphcs.formato("x", 0),
+        textposition="outside",
+        marker_line_width=0,
     )
 
     figDash3.update_layout(
@@ -420,7 +564,7 @@ def fig4(df_detalhamento: pd.DataFrame):
 
     entregas_prod = (
         entregas_prod.groupby(
-            [variables_data.Cod_Produto, variables_data.Desc_Cod_Produto]
+            [variables_data.Cod_Produto, variables_data.Desc_Cod_Produto], observed=True
         )[variables_data.Guid_Carga]
         .count()
         .reset_index()
@@ -455,7 +599,7 @@ def fig4(df_detalhamento: pd.DataFrame):
     )
 
     figDash4.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         bargap=0.2,
         xaxis=dict(
@@ -479,16 +623,16 @@ def fig4(df_detalhamento: pd.DataFrame):
 def fig5(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     entregas_peso = (
         df_detalhamento.groupby(
-            [variables_data.Cod_Cliente, variables_data.Desc_Motorista]
+            [variables_data.Cod_Cliente, variables_data.Desc_Motorista], observed=True
         )[variables_data.Guid_Carga]
         .nunique()
         .reset_index()
-        .groupby(variables_data.Desc_Motorista)[variables_data.Guid_Carga]
+        .groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Guid_Carga]
         .sum()
         .reset_index()
     )
     peso_por_mot = (
-        df_resumo.groupby(variables_data.Desc_Motorista)[variables_data.Valor_Peso]
+        df_resumo.groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Valor_Peso]
         .sum()
         .reset_index()
     )
@@ -500,17 +644,12 @@ def fig5(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         / entregas_peso[variables_data.Guid_Carga]
     )
     entregas_peso["PESO_POR_ENTREGA"] = entregas_peso["PESO_POR_ENTREGA"].fillna(0)
-
-    entregas_peso["PESO_POR_ENTREGA"] = entregas_peso["PESO_POR_ENTREGA"].apply(
-        conversores.outrosValores
-    )
     entregas_peso = entregas_peso.sort_values(by="PESO_POR_ENTREGA", ascending=True)
 
     figDash5 = px.bar(
         entregas_peso,
         x=variables_data.Desc_Motorista,
         y="PESO_POR_ENTREGA",
-        text="PESO_POR_ENTREGA",
         color=variables_data.Desc_Motorista,
         color_discrete_sequence=["#BB1818"],
         title="Peso por entrega",
@@ -520,15 +659,19 @@ def fig5(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         },
         hover_data={
             variables_data.Guid_Carga: True,
-            variables_data.Valor_Peso: True,
-            "PESO_POR_ENTREGA": True,
+            variables_data.Valor_Peso: Graphcs.hoverValor,
+            "PESO_POR_ENTREGA": Graphcs.hoverValor,
         },
     )
 
-    figDash5.update_traces(textposition="outside", textfont=dict(size=12))
+    figDash5.update_traces(
+        texttemplate=Graphcs.formato("y"),
+        textposition="outside",
+        textfont=dict(size=12),
+    )
 
     figDash5.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         showlegend=False,
         title_font=dict(size=18),
         xaxis=dict(
@@ -548,16 +691,16 @@ def fig5(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
 def fig6(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     entregas_volume = (
         df_detalhamento.groupby(
-            [variables_data.Cod_Cliente, variables_data.Desc_Motorista]
+            [variables_data.Cod_Cliente, variables_data.Desc_Motorista], observed=True
         )[variables_data.Guid_Carga]
         .nunique()
         .reset_index()
-        .groupby(variables_data.Desc_Motorista)[variables_data.Guid_Carga]
+        .groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Guid_Carga]
         .sum()
         .reset_index()
     )
     volume_por_mot = (
-        df_resumo.groupby(variables_data.Desc_Motorista)["qtd_Volume"]
+        df_resumo.groupby(variables_data.Desc_Motorista, observed=True)["qtd_Volume"]
         .sum()
         .reset_index()
     )
@@ -599,7 +742,7 @@ def fig6(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     figDash6.update_traces(textposition="outside", textfont=dict(size=12))
 
     figDash6.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         showlegend=False,
         title_font=dict(size=18),
         xaxis=dict(
@@ -619,16 +762,16 @@ def fig6(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
 def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     entregas_tpatend = (
         df_detalhamento.groupby(
-            [variables_data.Cod_Cliente, variables_data.Desc_Motorista]
+            [variables_data.Cod_Cliente, variables_data.Desc_Motorista], observed=True
         )[variables_data.Guid_Carga]
         .nunique()
         .reset_index()
-        .groupby(variables_data.Desc_Motorista)[variables_data.Guid_Carga]
+        .groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Guid_Carga]
         .sum()
         .reset_index()
     )
     tpatend_por_mot = (
-        df_resumo.groupby(variables_data.Desc_Motorista)[
+        df_resumo.groupby(variables_data.Desc_Motorista, observed=True)[
             variables_data.TEMPO_Atendimento
         ]
         .sum()
@@ -644,9 +787,6 @@ def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     entregas_tpatend["TPATEND_POR_ENTREGA"] = entregas_tpatend[
         "TPATEND_POR_ENTREGA"
     ].fillna(0)
-    entregas_tpatend["TPATEND_POR_ENTREGA"] = entregas_tpatend[
-        "TPATEND_POR_ENTREGA"
-    ].apply(conversores.outrosValores)
     entregas_tpatend = entregas_tpatend.sort_values(
         by=variables_data.Desc_Motorista, ascending=True
     )
@@ -655,7 +795,6 @@ def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         entregas_tpatend,
         x=variables_data.Desc_Motorista,
         y="TPATEND_POR_ENTREGA",
-        text="TPATEND_POR_ENTREGA",
         markers=True,
         line_shape="spline",
         title="Tempo em Atendimento (Minutos)",
@@ -666,11 +805,13 @@ def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         hover_data={
             variables_data.Guid_Carga: True,
             variables_data.TEMPO_Atendimento: True,
-            "TPATEND_POR_ENTREGA": True,
+            "TPATEND_POR_ENTREGA": Graphcs.hoverValor,
         },
     )
 
     figDash7.update_traces(
+        mode="lines+markers+text",
+        texttemplate=Graphcs.formato("y"),
         line_color="black",
         line=dict(width=2),
         marker=dict(size=8, symbol="circle", color="blue"),
@@ -679,7 +820,7 @@ def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     )
 
     figDash7.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         xaxis=dict(title="Motorista", showgrid=False),
         yaxis=dict(title="Tempo Atendimento", showgrid=True),
@@ -693,16 +834,16 @@ def fig7(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
 def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     entregas_km = (
         df_detalhamento.groupby(
-            [variables_data.Cod_Cliente, variables_data.Desc_Motorista]
+            [variables_data.Cod_Cliente, variables_data.Desc_Motorista], observed=True
         )[variables_data.Guid_Carga]
         .nunique()
         .reset_index()
-        .groupby(variables_data.Desc_Motorista)[variables_data.Guid_Carga]
+        .groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Guid_Carga]
         .sum()
         .reset_index()
     )
     km_por_mot = (
-        df_resumo.groupby(variables_data.Desc_Motorista)[variables_data.Num_KM_Rodado]
+        df_resumo.groupby(variables_data.Desc_Motorista, observed=True)[variables_data.Num_KM_Rodado]
         .sum()
         .reset_index()
     )
@@ -714,9 +855,6 @@ def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         / entregas_km[variables_data.Guid_Carga]
     )
     entregas_km["KM_POR_ENTREGA"] = entregas_km["KM_POR_ENTREGA"].fillna(0)
-    entregas_km["KM_POR_ENTREGA"] = entregas_km["KM_POR_ENTREGA"].apply(
-        conversores.outrosValores
-    )
     entregas_km = entregas_km.sort_values(
         by=variables_data.Desc_Motorista, ascending=True
     )
@@ -725,7 +863,6 @@ def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         entregas_km,
         x=variables_data.Desc_Motorista,
         y="KM_POR_ENTREGA",
-        text="KM_POR_ENTREGA",
         markers=True,
         line_shape="spline",
         title="KM Rodado por entrega",
@@ -735,12 +872,14 @@ def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
         },
         hover_data={
             variables_data.Guid_Carga: True,
-            variables_data.Num_KM_Rodado: True,
-            "KM_POR_ENTREGA": True,
+            variables_data.Num_KM_Rodado: Graphcs.hoverValor,
+            "KM_POR_ENTREGA": Graphcs.hoverValor,
         },
     )
 
     figDash8.update_traces(
+        mode="lines+markers+text",
+        texttemplate=Graphcs.formato("y"),
         line_color="black",
         line=dict(width=2),
         marker=dict(size=8, symbol="circle", color="blue"),
@@ -749,7 +888,7 @@ def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     )
 
     figDash8.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         xaxis=dict(title="Motorista", showgrid=False),
         yaxis=dict(title="KM Rodado", showgrid=True),
@@ -760,27 +899,17 @@ def fig8(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
     return figDash8
 
 
-def fig9(df_detalhamento: pd.DataFrame):
-    entregas_vlr = (
-        df_detalhamento.groupby(variables_data.Desc_Motorista)[
-            variables_data.Valor_Venda
-        ]
-        .sum()
-        .reset_index()
-    )
-
-    entregas_vlr["VALOR_TEXTO"] = entregas_vlr[variables_data.Valor_Venda].apply(
-        conversores.MetricMoedaInteiroValores
+def fig9(cubo: cubo_agregado.CuboAgregado):
+    entregas_vlr = cubo.somar(
+        variables_data.Desc_Motorista,
+        variables_data.Valor_Venda,
+        rotulos=ROTULOS_MOTORISTA,
     )
-    entregas_vlr[variables_data.Valor_Venda] = entregas_vlr[
-        variables_data.Valor_Venda
-    ].apply(conversores.inteiroValores)
 
     figDash9 = px.line(
         entregas_vlr,
         x=variables_data.Desc_Motorista,
         y=variables_data.Valor_Venda,
-        text="VALOR_TEXTO",
         markers=True,
         line_shape="spline",
         title="Valor Entregue",
@@ -788,12 +917,15 @@ def fig9(df_detalhamento: pd.DataFrame):
             variables_data.Valor_Venda: "Valor Entregue",
             variables_data.Desc_Motorista: "Motorista",
         },
-        hover_data={variables_data.Valor_Venda: True, "VALOR_TEXTO": True},
+        hover_data={variables_data.Valor_Venda: Graphcs.hoverInteiro},
     )
+    Graphcs.moeda(figDash9, "Valor Entregue")
 
     text_positions = ["top right"] + ["top left"] * (len(entregas_vlr) - 1)
 
     figDash9.update_traces(
+        mode="lines+markers+text",
+        texttemplate=Graphcs.formato("y", 0, "R$ "),
         textposition=text_positions,
         textfont=dict(size=9, color="black"),
         fill="tozeroy",
@@ -803,7 +935,7 @@ def fig9(df_detalhamento: pd.DataFrame):
     )
 
     figDash9.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         xaxis=dict(title="Motorista", showgrid=False),
         yaxis=dict(title="Valor Entregue", showgrid=True),
@@ -815,14 +947,9 @@ def fig9(df_detalhamento: pd.DataFrame):
     return figDash9
 
 
-def fig10(df_detalhamento: pd.DataFrame):
-    entregas_data = (
-        df_detalhamento.groupby(variables_data.DT_Emissao)[variables_data.Guid_Carga]
-        .count()
-        .reset_index()
-    )
-    entregas_data[variables_data.DT_Emissao] = pd.to_datetime(
-        entregas_data[variables_data.DT_Emissao]
+def fig10(cubo: cubo_agregado.CuboAgregado):
+    entregas_data = cubo.somar(variables_data.DT_Emissao, cubo_agregado.ITENS).rename(
+        columns={cubo_agregado.ITENS: variables_data.Guid_Carga}
     )
     entregas_data["DATA_FORMATADA"] = entregas_data[
         variables_data.DT_Emissao
@@ -852,7 +979,7 @@ def fig10(df_detalhamento: pd.DataFrame):
     )
 
     figDash10.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         xaxis=dict(title="Data", showgrid=False),
         yaxis=dict(title="Quantidade de Entregas", showgrid=True),
@@ -863,17 +990,11 @@ def fig10(df_detalhamento: pd.DataFrame):
     return figDash10
 
 
-def fig11(df_detalhamento: pd.DataFrame):
-    entregas_data = (
-        df_detalhamento.groupby(variables_data.DT_Emissao)[variables_data.Guid_Carga]
-        .count()
-        .reset_index()
-        .rename(columns={variables_data.Guid_Carga: "Quantidade de Entregas"})
+def fig11(cubo: cubo_agregado.CuboAgregado):
+    entregas_data = cubo.somar(variables_data.DT_Emissao, cubo_agregado.ITENS).rename(
+        columns={cubo_agregado.ITENS: "Quantidade de Entregas"}
     )
 
-    entregas_data[variables_data.DT_Emissao] = pd.to_datetime(
-        entregas_data[variables_data.DT_Emissao]
-    )
     entregas_data["Data Formatada"] = entregas_data[
         variables_data.DT_Emissao
     ].dt.strftime("%d/%m")
@@ -898,7 +1019,7 @@ def fig11(df_detalhamento: pd.DataFrame):
     )
 
     fig.update_layout(
-        template=globalTemplate,
+        globalTemplate,
         title_font=dict(size=18),
         xaxis=dict(title="Data", showgrid=False),
         yaxis=dict(title="Quantidade de Entregas", showgrid=True),
@@ -909,19 +1030,57 @@ def fig11(df_detalhamento: pd.DataFrame):
     return fig
 
 
-def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.Div:
-    df_detalhamento[variables_data.Desc_Motorista] = df_detalhamento[
-        variables_data.Desc_Motorista
-    ].apply(conversores.abreviar)
+FIGURAS = {
+    1: fig1,
+    2: fig2,
+    3: fig3,
+    4: fig4,
+    5: fig5,
+    6: fig6,
+    7: fig7,
+    8: fig8,
+    9: fig9,
+    10: fig10,
+    11: fig11,
+}
+# Figuras que saem do cubo; fig5 a fig8 também recebem o resumo
+FIGURAS_CUBO = (2, 3, 9, 10, 11)
+FIGURAS_RESUMO = (5, 6, 7, 8)
+
+
+def calcularGrafico(session_id: str, filtros: dict, numero: int):
+    with tempos.medir(f"[{pageTag}] fig{numero} {session_id}"):
+        df_detalhamento, cubo = dadosFiltrados(session_id, filtros)
+        funcao = FIGURAS[numero]
+        if numero in FIGURAS_CUBO:
+            return funcao(cubo)
+        # Cópia: sem filtro, df_detalhamento é o próprio frame da sessão
+        df_detalhamento = df_detalhamento.assign(
+            **{
+                variables_data.Desc_Motorista: df_detalhamento[
+                    variables_data.Desc_Motorista
+                ].apply(conversores.abreviar),
+                variables_data.Desc_Cod_Cliente: df_detalhamento[
+                    variables_data.Desc_Cod_Cliente
+                ].apply(lambda x: conversores.abreviar(x, 20)),
+            }
+        )
+        if numero in FIGURAS_RESUMO:
+            return funcao(df_detalhamento, sessionDF[f"{session_id}_resumo"])
+        return funcao(df_detalhamento)
+
 
-    df_detalhamento[variables_data.Desc_Grupo] = df_detalhamento[
-        variables_data.Desc_Grupo
-    ].apply(conversores.abreviar)
+def cardGrafico(numero: int, **kwargs):
+    """
+    Gráfico vazio do card (só com o template); os traces e o layout chegam
+    pelo callback dele como Patch (figuras.atualizacao).
+    """
+    return dcc.Loading(
+        dcc.Graph(id=f"{pageTag}graph{numero}", figure=figuras.vazia(), **kwargs)
+    )
 
-    df_detalhamento[variables_data.Desc_Cod_Cliente] = df_detalhamento[
-        variables_data.Desc_Cod_Cliente
-    ].apply(lambda x: conversores.abreviar(x, 20))
 
+def loadCharts() -> html.Div:
     return html.Div(
         [
             dbc.Row(
@@ -930,7 +1089,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig1(df_detalhamento)),
+                                    cardGrafico(1),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -944,7 +1103,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(figure=fig2(df_detalhamento)),
+                                                cardGrafico(2),
                                             ],
                                             class_name="shadow-sm p-1 rounded",
                                         )
@@ -957,7 +1116,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(figure=fig3(df_detalhamento)),
+                                                cardGrafico(3),
                                             ],
                                             class_name="shadow-sm p-1 rounded",
                                         )
@@ -974,7 +1133,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                                     dbc.Card(
                                         dbc.CardHeader(
                                             [
-                                                dcc.Graph(figure=fig4(df_detalhamento)),
+                                                cardGrafico(4),
                                             ],
                                             class_name="shadow-sm p-1 rounded",
                                         )
@@ -994,7 +1153,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig5(df_detalhamento, df_resumo)),
+                                    cardGrafico(5),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1005,7 +1164,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig6(df_detalhamento, df_resumo)),
+                                    cardGrafico(6),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1016,7 +1175,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig7(df_detalhamento, df_resumo)),
+                                    cardGrafico(7),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1032,7 +1191,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig8(df_detalhamento, df_resumo)),
+                                    cardGrafico(8),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1043,7 +1202,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig9(df_detalhamento)),
+                                    cardGrafico(9),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1059,7 +1218,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig10(df_detalhamento)),
+                                    cardGrafico(10),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1075,7 +1234,7 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig11(df_detalhamento)),
+                                    cardGrafico(11),
                                 ],
                                 class_name="shadow-sm p-1 rounded",
                             )
@@ -1087,3 +1246,35 @@ def loadCharts(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame) -> html.D
             ),
         ]
     )
+
+
+def create_chart_callback(numero):
+    @app.callback(
+        Output(f"{pageTag}graph{numero}", "figure"),
+        [
+            Input(f"{pageTag}fil_cidade", "value"),
+            Input(f"{pageTag}fil_rota", "value"),
+            Input(f"{pageTag}fil_bairro", "value"),
+            Input(f"{pageTag}fil_motorista", "value"),
+            Input(f"{pageTag}fil_supervisor", "value"),
+            Input(f"{pageTag}fil_vendedor", "value"),
+            Input(f"{pageTag}fil_grupo", "value"),
+            Input(f"{pageTag}fil_sku", "value"),
+            Input(f"{pageTag}fil_placa", "value"),
+        ],
+        State("session_data", "data"),
+    )
+    def show_chart(*args):
+        *filtros_pagina, session_data = args
+        session_id = session_data.get("session_id", "")
+        if not sessionDF.contem_sessao(session_id):
+            raise PreventUpdate
+
+        return figuras.atualizacao(
+            grafico(session_id, montarFiltros(*filtros_pagina), numero)
+        )
+
+
+# Um callback por card: cada gráfico vai para a página assim que fica pronto
+for i in FIGURAS:
+    create_chart_callback(i)
@@ -7,6 +7,6 @@ layout = html.Div(
     [
         dcc.Store(id=f"{pageTag}update", data=-99, storage_type=Settings.StoreConfig),
         html.Div(id=f"{pageTag}header"),
-        html.Div(id=f"{pageTag}body"),
+        html.Div(entregas.loadCharts(), id=f"{pageTag}body"),
     ]
 )
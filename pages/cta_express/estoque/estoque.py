@@ -5,6 +5,7 @@ import dash_bootstrap_components as dbc
 from dash import Input, Output, State, html, dcc, no_update, callback_context
 from app import app, session_dataframes_cta_express as sessionDF
 from dash import dash_table
+from assets.static import Interface
 from utils import conversores
 from .estoque_data import aplicar_filtros_exclusao_header
 from .estoque_graficos import criar_figura_vazia
@@ -448,16 +449,7 @@ def register_callbacks(app):
         return header, body
     
 
-     # CORREÇÃO: Adicionar callback do collapse seguindo padrão dos outros componentes
-    @app.callback(
-        Output(f"{pageTag}collapse-filters", "is_open"),
-        Input(f"{pageTag}collapse-button", "n_clicks"),
-        State(f"{pageTag}collapse-filters", "is_open"),
-    )
-    def toggle_collapse(n_clicks, is_open):
-        if n_clicks:
-            return not is_open
-        return is_open
+    Interface.collapseFiltros(app, pageTag)
     
 
     @app.callback(
@@ -655,30 +647,20 @@ def register_callbacks(app):
             return None, None, ''
         return no_update, no_update, no_update
     
-    @app.callback(
-        Output(f"{pageTag}offcanvas-filtros", "is_open"),
-        Input("CEestoque_btn-toggle-painel-esquerdo", "n_clicks"),
-        State(f"{pageTag}offcanvas-filtros", "is_open"),
-        prevent_initial_call=True
+    Interface.alternar(
+        app,
+        f"{pageTag}offcanvas-filtros",
+        "CEestoque_btn-toggle-painel-esquerdo",
+        prevent_initial_call=True,
     )
-    def toggle_filtros_offcanvas(n_clicks, is_open):
-        """Toggle do offcanvas de filtros seguindo padrão do projeto."""
-        if n_clicks:
-            return not is_open
-        return is_open
 
-    @app.callback(
-        Output(f"{pageTag}modal-configuracoes", "is_open"),
-        [Input("CEestoque_btn-abrir-modal-config", "n_clicks"), 
-         Input(f"{pageTag}btn-fechar-modal-config", "n_clicks")],
-        [State(f"{pageTag}modal-configuracoes", "is_open")],
-        prevent_initial_call=True
+    Interface.alternar(
+        app,
+        f"{pageTag}modal-configuracoes",
+        "CEestoque_btn-abrir-modal-config",
+        f"{pageTag}btn-fechar-modal-config",
+        prevent_initial_call=True,
     )
-    def toggle_modal_configuracoes(n_abrir, n_fechar, is_open):
-        """Toggle do modal de configurações seguindo padrão do projeto."""
-        if n_abrir or n_fechar:
-            return not is_open
-        return is_open
 
         # Callbacks de configurações
     @app.callback(
@@ -747,24 +729,8 @@ def register_callbacks(app):
 
    
 
-    # Criar callbacks para cada modal
-    def create_modal_callback(modal_id):
-        @app.callback(
-            Output(f"modal-{pageTag}-det-fig{modal_id}", "is_open"),
-            [
-                Input(f"btn-{pageTag}-det-fig{modal_id}", "n_clicks"),
-                Input(f"close-modal-{pageTag}-det-fig{modal_id}", "n_clicks"),
-            ],
-            [State(f"modal-{pageTag}-det-fig{modal_id}", "is_open")],
-        )
-        def toggle_modal(n1, n2, is_open):
-            if n1 or n2:
-                return not is_open
-            return is_open
-
-    # Criar callbacks para cada modal
-    for i in range(1, 8):
-        create_modal_callback(i)
+    # Modais "Ver detalhes"
+    Interface.modaisDetalhe(app, pageTag, range(1, 8))
     
 
     # Callbacks para conteúdo dos modais
@@ -366,8 +366,8 @@ def criar_tabela_produtos_criticos(df_produtos, id_tabela, titulo_alerta, page_s
     # Formatar valores seguindo padrão do projeto
     df_produtos_formatado = df_produtos.copy()
     if EstoqueColumns.ESTOQUE in df_produtos_formatado.columns:
-        df_produtos_formatado[EstoqueColumns.ESTOQUE] = df_produtos_formatado[EstoqueColumns.ESTOQUE].apply(
-            conversores.MetricInteiroValores
+        df_produtos_formatado[EstoqueColumns.ESTOQUE] = conversores.MetricInteiroValoresSerie(
+            df_produtos_formatado[EstoqueColumns.ESTOQUE]
         )
     
     # Aplicar abreviação seguindo padrão do projeto
@@ -447,12 +447,12 @@ def criar_tabela_sugestao_compras(df_sugestao):
     # Formatar valores seguindo padrão do projeto
     df_formatado = df_sugestao.copy()
     if EstoqueColumns.ESTOQUE in df_formatado.columns:
-        df_formatado[EstoqueColumns.ESTOQUE] = df_formatado[EstoqueColumns.ESTOQUE].apply(
-            conversores.MetricInteiroValores
+        df_formatado[EstoqueColumns.ESTOQUE] = conversores.MetricInteiroValoresSerie(
+            df_formatado[EstoqueColumns.ESTOQUE]
         )
     if EstoqueColumns.VENDA_MENSAL in df_formatado.columns:
-        df_formatado[EstoqueColumns.VENDA_MENSAL] = df_formatado[EstoqueColumns.VENDA_MENSAL].apply(
-            conversores.MetricInteiroValores
+        df_formatado[EstoqueColumns.VENDA_MENSAL] = conversores.MetricInteiroValoresSerie(
+            df_formatado[EstoqueColumns.VENDA_MENSAL]
         )
     if EstoqueColumns.DIAS_ESTOQUE in df_formatado.columns:
         df_formatado[EstoqueColumns.DIAS_ESTOQUE] = df_formatado[EstoqueColumns.DIAS_ESTOQUE].apply(
@@ -568,8 +568,8 @@ def criar_tabela_previsao_estoque_compacta(df, dias_maximos=60):
     
     # Formatar colunas seguindo padrão do projeto
     df_filtrado[EstoqueColumns.DIAS_ESTOQUE] = df_filtrado[EstoqueColumns.DIAS_ESTOQUE].round(1)
-    df_filtrado[EstoqueColumns.ESTOQUE] = df_filtrado[EstoqueColumns.ESTOQUE].apply(
-        conversores.MetricInteiroValores
+    df_filtrado[EstoqueColumns.ESTOQUE] = conversores.MetricInteiroValoresSerie(
+        df_filtrado[EstoqueColumns.ESTOQUE]
     )
     df_filtrado[EstoqueColumns.PRODUTO] = df_filtrado[EstoqueColumns.PRODUTO].apply(
         lambda x: conversores.abreviar(x, 40)
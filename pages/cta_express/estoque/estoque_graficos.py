@@ -69,8 +69,8 @@ def criar_grafico_estoque_por_grupo(df):
     )
     
     # Formatar valores para hover
-    df_agrupado["Estoque_Formatado"] = df_agrupado[EstoqueColumns.ESTOQUE].apply(
-        conversores.MetricInteiroValores
+    df_agrupado["Estoque_Formatado"] = conversores.MetricInteiroValoresSerie(
+        df_agrupado[EstoqueColumns.ESTOQUE]
     )
     
     figDash1 = px.line(
@@ -252,8 +252,8 @@ def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=N
         return criar_figura_vazia("Níveis de Estoque (Sem Produtos para Classificar)", height=height)
 
     # Formatar valores seguindo padrão do projeto
-    contagem_niveis["Contagem_Formatada"] = contagem_niveis['Contagem'].apply(
-        conversores.MetricInteiroValores
+    contagem_niveis["Contagem_Formatada"] = conversores.MetricInteiroValoresSerie(
+        contagem_niveis['Contagem']
     )
 
     # CORREÇÃO 1: Cores diferenciadas em tons de laranja para cada nível com valores dinâmicos
@@ -332,7 +332,9 @@ def criar_grafico_categorias_estoque_baixo(df_estoque_baixo, top_n=10):
         contagem_categorias_top_n[EstoqueColumns.CATEGORIA].apply(conversores.abreviar)
     )
     contagem_categorias_top_n["Produtos_Formatado"] = (
-        contagem_categorias_top_n['NumeroDeProdutosBaixos'].apply(conversores.MetricInteiroValores)
+        conversores.MetricInteiroValoresSerie(
+            contagem_categorias_top_n['NumeroDeProdutosBaixos']
+        )
     )
 
     figDash4 = px.bar(
@@ -428,11 +430,11 @@ def criar_grafico_estoque_produtos_populares(df, n=7, abreviar_nomes=False):
     x_axis_values = valores_unicos
 
     # Formatar valores para hover
-    produtos_populares_df["Estoque_Formatado"] = produtos_populares_df['EstoqueNum'].apply(
-        conversores.MetricInteiroValores
+    produtos_populares_df["Estoque_Formatado"] = conversores.MetricInteiroValoresSerie(
+        produtos_populares_df['EstoqueNum']
     )
-    produtos_populares_df["Vendas_Formatado"] = produtos_populares_df['VendaMensalNum'].apply(
-        conversores.MetricInteiroValores
+    produtos_populares_df["Vendas_Formatado"] = conversores.MetricInteiroValoresSerie(
+        produtos_populares_df['VendaMensalNum']
     )
 
     figDash5 = go.Figure()
@@ -511,8 +513,8 @@ def criar_grafico_treemap_estoque_grupo(df_filtrado):
     )
     
     # Formatar valores para hover seguindo padrão do projeto
-    df_para_treemap['Estoque_Formatado'] = df_para_treemap[EstoqueColumns.ESTOQUE].apply(
-        conversores.MetricInteiroValores
+    df_para_treemap['Estoque_Formatado'] = conversores.MetricInteiroValoresSerie(
+        df_para_treemap[EstoqueColumns.ESTOQUE]
     )
 
     # Ordenar por estoque para garantir consistência
@@ -586,11 +588,11 @@ def criar_grafico_produtos_sem_venda_grupo(df):
     )
     
     # Formatar valores para hover seguindo padrão do projeto
-    df_agrupado['Produtos_Formatado'] = df_agrupado['QtdProdutosSemVenda'].apply(
-        conversores.MetricInteiroValores
+    df_agrupado['Produtos_Formatado'] = conversores.MetricInteiroValoresSerie(
+        df_agrupado['QtdProdutosSemVenda']
     )
-    df_agrupado['EstoqueParado_Formatado'] = df_agrupado['EstoqueParado'].apply(
-        conversores.MetricInteiroValores
+    df_agrupado['EstoqueParado_Formatado'] = conversores.MetricInteiroValoresSerie(
+        df_agrupado['EstoqueParado']
     )
 
     figDash7 = px.treemap(
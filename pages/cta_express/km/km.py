@@ -1,11 +1,13 @@
 from app import app
 from app import session_dataframes_cta_express as sessionDF
+from app import memo_filtros
+from dash.exceptions import PreventUpdate
 from dash import Input, Output, State, dcc, html
 import plotly.express as px
 import dash_bootstrap_components as dbc
-from utils import conversores
+from utils import conversores, figuras, filtros as indice_filtros
 import pandas as pd
-from assets.static import packCode, Colors, supportClass
+from assets.static import packCode, Colors, Graphcs, supportClass, Interface
 from stylesDocs.style import styleConfig
 from pages.cta_express.cta_express_globals import variables_data
 
@@ -29,18 +31,21 @@ testTemplate = {
         "tickfont": {"size": 10},
     },
     "margin": {"l": 30, "r": 30, "t": 30, "b": 30},
+    "separators": Graphcs.separadores,
 }
 
-
-@app.callback(
-    Output(f"{pageTag}collapse-filters", "is_open"),
-    Input(f"{pageTag}collapse-button", "n_clicks"),
-    State(f"{pageTag}collapse-filters", "is_open"),
+# Métricas do HeaderDash atualizadas pela troca de filtro (showBody)
+METRICAS = (
+    "Nº Entregas",
+    "KM Rodado",
+    "Média KM Entrega",
+    "Horas em Trânsito",
+    "Horas em Atendimento",
 )
-def toggle_collapse(n_clicks, is_open):
-    if n_clicks:
-        return not is_open
-    return is_open
+FIGURAS = range(1, 7)
+
+
+Interface.collapseFiltros(app, pageTag)
 
 
 @app.callback(
@@ -51,7 +56,7 @@ def toggle_collapse(n_clicks, is_open):
 def showHeader(initData, session_data):
     session_id = session_data.get("session_id", "")
 
-    if initData == 1 and session_id:
+    if initData == 1 and session_id and sessionDF.contem_sessao(session_id):
         df_resumo = sessionDF[f"{session_id}_resumo"]
         df_detalhamento = sessionDF[f"{session_id}_detalhamento"]
         print(df_resumo.columns)
@@ -122,7 +127,7 @@ def showHeader(initData, session_data):
         }
         return packCode.HeaderDash(
             "Quilometragem",
-            f"Período de análise: {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).min().strftime('%d/%m/%Y')} a {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).max().strftime('%d/%m/%Y')}",
+            f"Período de análise: {df_detalhamento[variables_data.DT_Emissao].min():%d/%m/%Y} a {df_detalhamento[variables_data.DT_Emissao].max():%d/%m/%Y}",
             pageTag,
             metricsDict,
             True,
@@ -133,10 +138,8 @@ def showHeader(initData, session_data):
 
 
 @app.callback(
-    [
-        Output(f"{pageTag}body", "children"),
-        Output(f"{pageTag}metrics", "children"),
-    ],
+    [Output(f"{pageTag}graph{numero}", "figure") for numero in FIGURAS]
+    + supportClass.saidasMetricas(pageTag, METRICAS),
     [
         Input(f"{pageTag}fil_cidade", "value"),
         Input(f"{pageTag}fil_rota", "value"),
@@ -155,31 +158,86 @@ def showBody(
     session_data,
 ):
     session_id = session_data.get("session_id", "")
-    df_detalhamento = sessionDF[f"{session_id}_detalhamento"]
-    df_resumo = sessionDF[f"{session_id}_resumo"]
+    if not sessionDF.contem_sessao(session_id):
+        raise PreventUpdate
+
+    filtros = indice_filtros.filtros_ativos(
+        {
+            variables_data.Desc_Cidade: fil_cidade,
+            variables_data.Desc_Rota: fil_rota,
+            variables_data.Desc_Bairro: fil_bairro,
+            variables_data.Desc_Motorista: fil_motorista,
+            variables_data.Desc_Placa: fil_placa,
+        }
+    )
+    graficos, metricas = memo_filtros.obter(
+        session_id, pageTag, filtros, lambda: montarBody(session_id, filtros)
+    )
+    return [figuras.atualizacao(figura) for figura in graficos] + metricas
 
-    if "Todos" not in fil_cidade and len(fil_cidade) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Cidade, filtro=fil_cidade
-        )
-    if "Todos" not in fil_rota and len(fil_rota) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Rota, filtro=fil_rota
-        )
-    if "Todos" not in fil_bairro and len(fil_bairro) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento, tabela=variables_data.Desc_Bairro, filtro=fil_bairro
-        )
-    if "Todos" not in fil_motorista and len(fil_motorista) > 0:
-        df_detalhamento = conversores.FiltrarColuna(
-            df=df_detalhamento,
-            tabela=variables_data.Desc_Motorista,
-            filtro=fil_motorista,
-        )
-    if "Todos" not in fil_placa and len(fil_placa) > 0:
-        df_resumo = conversores.FiltrarColuna(
-            df=df_resumo, tabela=variables_data.Desc_Placa, filtro=fil_placa
-        )
+
+@app.callback(
+    [
+        Output(f"{pageTag}fil_cidade", "options"),
+        Output(f"{pageTag}fil_rota", "options"),
+        Output(f"{pageTag}fil_bairro", "options"),
+        Output(f"{pageTag}fil_motorista", "options"),
+    ],
+    [
+        Input(f"{pageTag}fil_cidade", "value"),
+        Input(f"{pageTag}fil_rota", "value"),
+        Input(f"{pageTag}fil_bairro", "value"),
+        Input(f"{pageTag}fil_motorista", "value"),
+    ],
+    State("session_data", "data"),
+)
+def showOpcoes(fil_cidade, fil_rota, fil_bairro, fil_motorista, session_data):
+    """
+    Opções em cascata dos filtros do detalhamento. Placa filtra o resumo e
+    mantém todas as opções.
+    """
+    session_id = session_data.get("session_id", "")
+    tabela = sessionDF.get(f"{session_id}_coocorrencias")
+    if tabela is None:
+        raise PreventUpdate
+
+    selecao = {
+        variables_data.Desc_Cidade: fil_cidade,
+        variables_data.Desc_Rota: fil_rota,
+        variables_data.Desc_Bairro: fil_bairro,
+        variables_data.Desc_Motorista: fil_motorista,
+    }
+    filtros = indice_filtros.filtros_ativos(selecao)
+    permitidas = memo_filtros.obter(
+        session_id,
+        f"opcoes:{pageTag}",
+        filtros,
+        lambda: indice_filtros.opcoes(tabela, filtros, selecao.keys()),
+    )
+    return indice_filtros.opcoes_dropdown(permitidas, selecao)
+
+
+def montarBody(session_id: str, filtros: dict):
+    # Placa filtra o resumo; os demais, o detalhamento
+    filtros_resumo = {
+        coluna: valores
+        for coluna, valores in filtros.items()
+        if coluna == variables_data.Desc_Placa
+    }
+    filtros_detalhamento = {
+        coluna: valores
+        for coluna, valores in filtros.items()
+        if coluna != variables_data.Desc_Placa
+    }
+    df_detalhamento = memo_filtros.filtrar(
+        session_id,
+        "detalhamento",
+        sessionDF[f"{session_id}_detalhamento"],
+        filtros_detalhamento,
+    )
+    df_resumo = memo_filtros.filtrar(
+        session_id, "resumo", sessionDF[f"{session_id}_resumo"], filtros_resumo
+    )
 
     metricsDict: dict = {
         "Nº Entregas": {
@@ -219,9 +277,11 @@ def showBody(
         },
     }
 
-    return loadCharts(df_resumo, df_detalhamento), supportClass.dictHeaderDash(
-        pageTag, metricsDict
-    )
+    graficos = [
+        figuras.compactar(figura, f"{pageTag}fig{numero}")
+        for numero, figura in zip(FIGURAS, montarFiguras(df_resumo, df_detalhamento))
+    ]
+    return graficos, supportClass.valoresMetricas(metricsDict, METRICAS)
 
 
 @app.callback(
@@ -233,13 +293,13 @@ def initOperacoes(upData, session_data):
     return 1
 
 
-def loadCharts(df_resumo, df_detalhamento) -> html.Div:
+def montarFiguras(df_resumo, df_detalhamento) -> list:
     pxGraficos = 380
 
     dfvlro = df_resumo[[variables_data.Desc_Motorista, variables_data.Num_KM_Rodado]]
 
     dfvlro = dfvlro[dfvlro[variables_data.Num_KM_Rodado] != 0]
-    dfvlro = dfvlro.groupby(variables_data.Desc_Motorista).sum().reset_index()
+    dfvlro = dfvlro.groupby(variables_data.Desc_Motorista, observed=True).sum().reset_index()
 
     if len(dfvlro[variables_data.Desc_Motorista]) < 7:
         figDash1 = px.pie(
@@ -255,9 +315,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
             xaxis_title="KM Rodado",
             yaxis_title="Motorista",
         )
-        conversores.format_hover(
-            figDash1, dfvlro, "Motorista", "KM Rodado", variables_data.Num_KM_Rodado
-        )
+        conversores.format_hover(figDash1, "Motorista", "KM Rodado")
         figDash1.update_traces(
             pull=0.01,
         )
@@ -283,13 +341,10 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                 variables_data.Desc_Motorista,
             ]
         ]
-        .groupby([variables_data.Desc_Motorista, variables_data.DT_Carga])
+        .groupby([variables_data.Desc_Motorista, variables_data.DT_Carga], observed=True)
         .sum()
         .reset_index()
     )
-    dfvlro_dt[variables_data.DT_Carga] = pd.to_datetime(
-        dfvlro_dt[variables_data.DT_Carga]
-    )
     dfvlro_dt = dfvlro_dt[dfvlro_dt[variables_data.Num_KM_Rodado] != 0]
 
     figDash2 = px.line(
@@ -311,7 +366,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
     )
 
     kmrodado = df_resumo[[variables_data.Desc_Placa, variables_data.Num_KM_Rodado]]  #
-    kmrodado = kmrodado.groupby(variables_data.Desc_Placa).sum().reset_index()
+    kmrodado = kmrodado.groupby(variables_data.Desc_Placa, observed=True).sum().reset_index()
     kmrodado = kmrodado[kmrodado[variables_data.Num_KM_Rodado] != 0]  #
 
     if len(kmrodado[variables_data.Desc_Placa]) < 7:
@@ -328,9 +383,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
             xaxis_title="KM Rodado",
             yaxis_title="Veículo",
         )
-        conversores.format_hover(
-            figDash3, kmrodado, "Veículo", "KM Rodado", variables_data.Num_KM_Rodado
-        )
+        conversores.format_hover(figDash3, "Veículo", "KM Rodado")
         figDash3.update_traces(
             pull=0.01,
         )
@@ -356,7 +409,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
         ]
     ]
     placa_km_entregas = (
-        placa_km_entregas.groupby(variables_data.Desc_Placa)
+        placa_km_entregas.groupby(variables_data.Desc_Placa, observed=True)
         .agg({variables_data.Num_KM_Rodado: "sum", variables_data.Num_Entregas: "sum"})
         .reset_index()
     )
@@ -405,7 +458,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
     )
 
     km_por_cidade = (
-        df_merged.groupby(variables_data.Desc_Cidade)[variables_data.Num_KM_Rodado]  #
+        df_merged.groupby(variables_data.Desc_Cidade, observed=True)[variables_data.Num_KM_Rodado]  #
         .sum()
         .reset_index()
     )
@@ -432,7 +485,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
 
     figDash5.update_layout(testTemplate)
     entrega = df_resumo[[variables_data.Desc_Placa, variables_data.Num_Entregas]]
-    entrega = entrega.groupby(variables_data.Desc_Placa).sum().reset_index()
+    entrega = entrega.groupby(variables_data.Desc_Placa, observed=True).sum().reset_index()
     entrega = entrega[entrega[variables_data.Num_Entregas] != 0]
 
     figDash6 = px.bar(
@@ -462,6 +515,20 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
         showlegend=True,
     )
 
+    return [figDash1, figDash2, figDash3, figDash4, figDash5, figDash6]
+
+
+def cardGrafico(numero: int, **kwargs):
+    """
+    Gráfico vazio do card (só com o template); os traces e o layout chegam
+    pelo showBody como Patch (figuras.atualizacao).
+    """
+    return dcc.Loading(
+        dcc.Graph(id=f"{pageTag}graph{numero}", figure=figuras.vazia(), **kwargs)
+    )
+
+
+def loadCharts() -> html.Div:
     return html.Div(
         [
             dbc.Row(
@@ -470,7 +537,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash1),
+                                    cardGrafico(1),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -488,7 +555,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash2),
+                                    cardGrafico(2),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -511,7 +578,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash3),
+                                    cardGrafico(3),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -529,7 +596,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash4),
+                                    cardGrafico(4),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -552,7 +619,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash5),
+                                    cardGrafico(5),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -570,7 +637,7 @@ def loadCharts(df_resumo, df_detalhamento) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=figDash6),
+                                    cardGrafico(6),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
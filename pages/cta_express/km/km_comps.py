@@ -15,6 +15,6 @@ layout = html.Div(
                 "zIndex": "1000",
             },
         ),
-        html.Div(id=f"{pageTag}body"),
+        html.Div(km.loadCharts(), id=f"{pageTag}body"),
     ]
 )
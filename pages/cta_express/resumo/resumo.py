@@ -1,15 +1,17 @@
 from app import app
 from app import session_dataframes_cta_express as sessionDF
-from dash import Input, Output, State, dcc, html
+from app import memo_filtros
+from dash import Input, Output, State, dcc, html, callback_context, no_update
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import dash_bootstrap_components as dbc
 import pandas as pd
-from assets.static import packCode, Colors, Graphcs
+from assets.static import packCode, Colors, Graphcs, Interface
 from stylesDocs.style import styleConfig
 import plotly.graph_objects as go
 from pages.cta_express.cta_express_globals import variables_data
 from pages.cta_express.resumo import utils
-from utils import conversores
+from utils import conversores, cubo as cubo_agregado, detalhes, figuras, mapa
 
 
 pageTag: str = "CEresumo_"
@@ -27,38 +29,38 @@ globalTemplate = Graphcs.globalTemplate
 def showHeader(initData, session_data):
     session_id = session_data.get("session_id", "")
 
-    if initData == 1 and session_id:
+    if initData == 1 and session_id and sessionDF.contem_sessao(session_id):
         df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
-        df_entregas_unicas = df_detalhamento.drop_duplicates(
-            subset=[variables_data.Guid_Carga, variables_data.Cod_Cliente]
-        )
+        cubo = cubo_agregado.consultar(sessionDF, session_id, {}, df_detalhamento)
         metricsDict: dict = {
             "Nº Entregas": {
                 "icone": "bi bi-truck",
-                "valor": conversores.MetricInteiroValores(df_entregas_unicas.shape[0]),
+                "valor": conversores.MetricInteiroValores(
+                    cubo.contar_distintos("entregas")
+                ),
             },
             "Nº NFe's Entregues": {
                 "icone": "bi bi-receipt-cutoff",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Num_NFE].unique().size
+                    cubo.contar_distintos("notas")
                 ),
             },
             "Cubagem Entregue": {
                 "icone": "bi bi-box",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Valor_Cubagem].sum()
+                    cubo.total(variables_data.Valor_Cubagem)
                 ),
             },
             "Valor Total": {
                 "icone": "bi bi-cash-stack",
                 "valor": conversores.MetricInteiroValores(
-                    df_detalhamento[variables_data.Valor_Venda].sum()
+                    cubo.total(variables_data.Valor_Venda)
                 ),
             },
         }
         return packCode.HeaderDash(
             "CTA Express",
-            f"Período de análise: {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).min().strftime('%d/%m/%Y')} a {pd.to_datetime(df_detalhamento[variables_data.DT_Emissao]).max().strftime('%d/%m/%Y')}",
+            f"Período de análise: {df_detalhamento[variables_data.DT_Emissao].min():%d/%m/%Y} a {df_detalhamento[variables_data.DT_Emissao].max():%d/%m/%Y}",
             pageTag=pageTag,
             lstMetric=metricsDict,
             MetricsWidth=8,
@@ -76,13 +78,10 @@ def initOperacoes(upData, session_data):
 
 def fig1(df_resumo):
     dfentregas = (
-        df_resumo.groupby([variables_data.Desc_Motorista])
+        df_resumo.groupby([variables_data.Desc_Motorista], observed=True)
         .agg({variables_data.Valor_Cubagem: "sum", variables_data.Num_Entregas: "sum"})
         .reset_index()
     )
-    dfentregas["Entregas"] = dfentregas[variables_data.Num_Entregas].apply(
-        conversores.moedaCorrente
-    )
     if len(dfentregas[variables_data.Desc_Motorista]) > 7:
         figDash1 = px.bar(
             dfentregas,
@@ -146,14 +145,11 @@ def fig1(df_resumo):
 def fig2(df_resumo):
     dfcubagem = df_resumo[[variables_data.Valor_Cubagem, variables_data.Desc_Placa]]
     dfcubagem = (
-        dfcubagem.groupby(variables_data.Desc_Placa)[variables_data.Valor_Cubagem]
+        dfcubagem.groupby(variables_data.Desc_Placa, observed=True)[variables_data.Valor_Cubagem]
         .sum()
         .reset_index()
     )
     dfcubagem = dfcubagem[dfcubagem[variables_data.Valor_Cubagem] > 0]
-    dfcubagem["Cubos"] = dfcubagem[variables_data.Valor_Cubagem].apply(
-        conversores.outrosValores
-    )
 
     figDash2 = px.bar(
         dfcubagem,
@@ -167,8 +163,7 @@ def fig2(df_resumo):
             variables_data.Valor_Cubagem: "Cubagem",
         },
         hover_data={
-            "Cubos": True,
-            variables_data.Valor_Cubagem: False,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
             variables_data.Desc_Placa: True,
         },
     )
@@ -203,11 +198,9 @@ def fig3(df_resumo):
         [variables_data.Desc_Motorista, variables_data.Valor_Venda]
     ].copy()
 
-    dfvlr = dfvlr.groupby([variables_data.Desc_Motorista]).sum().reset_index()
+    dfvlr = dfvlr.groupby([variables_data.Desc_Motorista], observed=True).sum().reset_index()
     # dfvlr = dfvlr.sort_values(by=variables_data.Valor_Venda, ascending=True)
 
-    dfvlr["Valor"] = dfvlr[variables_data.Valor_Venda].apply(conversores.moedaCorrente)
-
     figDash3 = px.bar(
         dfvlr,
         color_discrete_sequence=globalTemplate["colorway"],
@@ -220,8 +213,7 @@ def fig3(df_resumo):
             variables_data.Valor_Venda: "Valor (R$)",
         },
         hover_data={
-            "Valor": True,
-            variables_data.Valor_Venda: False,
+            variables_data.Valor_Venda: Graphcs.hoverValor,
             variables_data.Desc_Motorista: True,
         },
     )
@@ -265,15 +257,12 @@ def fig4(df_resumo):
         ]
     ]
     dfkm = (
-        dfkm.groupby([variables_data.Desc_Placa])[variables_data.Num_KM_Rodado]
+        dfkm.groupby([variables_data.Desc_Placa], observed=True)[variables_data.Num_KM_Rodado]
         .sum()
         .reset_index()
     )
     dfkm = dfkm[dfkm[variables_data.Num_KM_Rodado] > 0]
     dfkm = dfkm.sort_values(by=variables_data.Num_KM_Rodado, ascending=True)
-    dfkm["Quilometros"] = dfkm[variables_data.Num_KM_Rodado].apply(
-        conversores.outrosValores
-    )
 
     figDash4 = px.bar(
         dfkm,
@@ -287,9 +276,8 @@ def fig4(df_resumo):
             variables_data.Num_KM_Rodado: "Km",
         },
         hover_data={
-            "Quilometros": True,
             variables_data.Desc_Placa: True,
-            variables_data.Num_KM_Rodado: False,
+            variables_data.Num_KM_Rodado: Graphcs.hoverValor,
         },
     )
 
@@ -318,7 +306,7 @@ def fig5(df_resumo):
         variables_data.TEMPO_AteNegativado: "Negativado",
     }
 
-    dftempo = dftempo.groupby([variables_data.Desc_Motorista]).sum().reset_index()
+    dftempo = dftempo.groupby([variables_data.Desc_Motorista], observed=True).sum().reset_index()
     colunas_tempo = [
         variables_data.TEMPO_Translado,
         variables_data.TEMPO_Atendimento,
@@ -370,23 +358,24 @@ def fig5(df_resumo):
 
 
 def fig6(df_detalhamento):
-    dfto = df_detalhamento[
-        [
-            variables_data.Desc_Cidade,
-            variables_data.TP_Desc_Operacao,
-            variables_data.Valor_Venda,
-        ]
-    ].copy()
-
+    chaves = [variables_data.Desc_Cidade, variables_data.TP_Desc_Operacao]
+    # Soma pelos nomes completos direto no frame da sessão e só abrevia o
+    # resultado; cidades que viram o mesmo texto abreviado somam juntas
     dfto = (
-        dfto.groupby([variables_data.Desc_Cidade, variables_data.TP_Desc_Operacao])[
-            variables_data.Valor_Venda
-        ]
+        df_detalhamento.groupby(chaves, observed=True)[variables_data.Valor_Venda]
+        .sum()
+        .reset_index()
+    )
+    dfto[variables_data.Desc_Cidade] = (
+        dfto[variables_data.Desc_Cidade].astype(str).map(conversores.abreviar)
+    )
+    dfto = (
+        dfto.groupby(chaves, observed=True)[variables_data.Valor_Venda]
         .sum()
         .reset_index()
     )
 
-    total_venda = dfto.groupby(variables_data.Desc_Cidade)[
+    total_venda = dfto.groupby(variables_data.Desc_Cidade, observed=True)[
         variables_data.Valor_Venda
     ].transform("sum")
     dfto["percent"] = (dfto[variables_data.Valor_Venda] / total_venda) * 100
@@ -397,8 +386,7 @@ def fig6(df_detalhamento):
         ordered=True,
     )
 
-    dfto["Valor"] = dfto[variables_data.Valor_Venda].apply(conversores.moedaCorrente)
-    dfto = dfto.groupby(variables_data.TP_Desc_Operacao, group_keys=False).apply(
+    dfto = dfto.groupby(variables_data.TP_Desc_Operacao, group_keys=False, observed=True).apply(
         lambda df: df.sort_values(by=variables_data.Desc_Cidade)
     )
 
@@ -424,8 +412,7 @@ def fig6(df_detalhamento):
             "VENDA": "#06D001",
         },
         hover_data={
-            "Valor": True,
-            variables_data.Valor_Venda: False,
+            variables_data.Valor_Venda: Graphcs.hoverValor,
             variables_data.TP_Desc_Operacao: False,
             variables_data.Desc_Cidade: True,
         },
@@ -434,6 +421,8 @@ def fig6(df_detalhamento):
         category_orders={variables_data.Desc_Cidade: ordered_cities},
     )
 
+    Graphcs.moeda(figDash6, "Valor da Venda")
+
     figDash6.update_traces(
         mode="markers+lines",
         text=dfto["percent_text"],
@@ -449,64 +438,84 @@ def fig6(df_detalhamento):
     return figDash6
 
 
-def fig7(df_detalhamento: pd.DataFrame):
+def fig7(session_id: str, df_detalhamento: pd.DataFrame):
+    """Mapa e o nível da grade inicial (``None`` quando mostra os clientes)."""
     try:
-        dfmapa = df_detalhamento[
-            [
-                variables_data.Desc_Cidade,
-                variables_data.cliente_lat,
-                variables_data.cliente_log,
-                variables_data.Valor_Venda,
-                variables_data.Desc_Cliente,
-                variables_data.Valor_Cubagem,
-            ]
-        ].copy()
-
-        dfmapa = dfmapa[
-            (dfmapa[variables_data.cliente_lat] != 0)
-            & (dfmapa[variables_data.cliente_log] != 0)
-        ]
-        dfmapa[variables_data.cliente_lat] = pd.to_numeric(
-            dfmapa[variables_data.cliente_lat], errors="coerce"
-        )
-        dfmapa[variables_data.cliente_log] = pd.to_numeric(
-            dfmapa[variables_data.cliente_log], errors="coerce"
-        )
-        dfmapa[variables_data.Valor_Venda] = pd.to_numeric(
-            dfmapa[variables_data.Valor_Venda], errors="coerce"
+        # Pontos por cliente e grades por zoom vêm prontos da carga (utils/mapa.py)
+        pontos, celulas = mapa.da_sessao(sessionDF, session_id, df_detalhamento)
+        pontos = pontos.assign(
+            **{
+                variables_data.Desc_Cidade: pontos[variables_data.Desc_Cidade]
+                .astype(str)
+                .apply(conversores.abreviar)
+            }
         )
+        nivel = utils.nivel_grade(pontos)
+        figDash7 = utils.create_choropleth_map(pontos, celulas, nivel)
 
-        dfmapa = dfmapa.dropna(
-            subset=[
-                variables_data.cliente_lat,
-                variables_data.cliente_log,
-                variables_data.Valor_Venda,
-            ]
-        )
+    except Exception as e:
+        print(f"Erro ao processar os dados: {e}")
+        figDash7, nivel = None, None
+    return figDash7, nivel
 
-        dfmapa["Valor"] = dfmapa[variables_data.Valor_Venda].apply(
-            conversores.moedaCorrente
-        )
-        dfmapa["Cubagem"] = dfmapa[variables_data.Valor_Cubagem].apply(
-            conversores.outrosValores
-        )
 
-        figDash7 = utils.create_choropleth_map(dfmapa)
+@app.callback(
+    Output(f"{pageTag}fig7", "figure"),
+    Output(f"{pageTag}fig7-nivel", "data"),
+    Input(f"{pageTag}fig7", "relayoutData"),
+    State(f"{pageTag}fig7-nivel", "data"),
+    State("session_data", "data"),
+)
+def trocarGradeMapa(relayoutData, nivel_atual, session_data):
+    """Troca as células agrupadas do mapa quando o zoom muda de grade."""
+    zoom = (relayoutData or {}).get("mapbox.zoom")
+    # Sem grade (clientes individuais) ou arrastando no mesmo nível: nada muda
+    if nivel_atual is None or zoom is None or mapa.nivel(zoom) == nivel_atual:
+        raise PreventUpdate
+    session_id = session_data.get("session_id", "")
+    if not sessionDF.contem_sessao(session_id):
+        raise PreventUpdate
+
+    nivel = mapa.nivel(zoom)
+    pontos, celulas = mapa.da_sessao(
+        sessionDF, session_id, sessionDF[f"{session_id}_detalhamento"]
+    )
+    return utils.atualizacao_grade(pontos, celulas, nivel), nivel
+
+
+def abreviados(df: pd.DataFrame, coluna: str) -> pd.DataFrame:
+    """
+    Cópia de ``df`` com ``coluna`` abreviada para os eixos. Os frames da
+    sessão ficam com os nomes completos, que o cubo, as coocorrências, o mapa
+    e os filtros das outras páginas usam.
+    """
+    return df.assign(**{coluna: df[coluna].map(conversores.abreviar)})
+
+
+def graficoMotoristas(session_id: str, df_resumo: pd.DataFrame | None = None) -> dict:
+    """fig1 calculada uma vez por carga; o card e o modal usam a mesma."""
+
+    def calcular():
+        if df_resumo is None:
+            df = abreviados(
+                sessionDF[f"{session_id}_resumo"], variables_data.Desc_Motorista
+            )
+        else:
+            df = df_resumo
+        grafico = fig1(df)
+        return {**grafico, "fig": figuras.compactar(grafico["fig"], f"{pageTag}fig1")}
+
+    return memo_filtros.obter(session_id, f"{pageTag}fig1", {}, calcular)
 
-    except Exception as e:
-        print(f"Erro ao processar os dados: {e}")
-        figDash7 = None
-    return figDash7
 
 def loadCharts(session_id: str) -> html.Div:
-    df_resumo: pd.DataFrame = sessionDF[f"{session_id}_resumo"]
-    df_detalhamento: pd.DataFrame = sessionDF[f"{session_id}_detalhamento"]
-    df_resumo[variables_data.Desc_Motorista] = df_resumo[
-        variables_data.Desc_Motorista
-    ].apply(conversores.abreviar)
-    df_detalhamento[variables_data.Desc_Cidade] = df_detalhamento[
-        variables_data.Desc_Cidade
-    ].apply(conversores.abreviar)
+    df_resumo = abreviados(
+        sessionDF[f"{session_id}_resumo"], variables_data.Desc_Motorista
+    )
+    # fig6 e fig7 abreviam a cidade só no que desenham
+    df_detalhamento = sessionDF[f"{session_id}_detalhamento"]
+    grafico1 = graficoMotoristas(session_id, df_resumo)
+    figura7, nivel7 = fig7(session_id, df_detalhamento)
 
     return html.Div(
         [
@@ -516,7 +525,7 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig1(df_resumo)["fig"]),
+                                    dcc.Graph(figure=grafico1["fig"]),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -526,8 +535,6 @@ def loadCharts(session_id: str) -> html.Div:
                                     ),
                                     packCode.detailModal(
                                         "Detalhes:",
-                                        fig1(df_resumo)["fig"],
-                                        fig1(df_resumo)["dataframe"],
                                         pageTag,
                                         "1",
                                     ),
@@ -541,7 +548,11 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig3(df_resumo)),
+                                    dcc.Graph(
+                                        figure=figuras.compactar(
+                                            fig3(df_resumo), f"{pageTag}fig3"
+                                        )
+                                    ),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -565,7 +576,10 @@ def loadCharts(session_id: str) -> html.Div:
                             dbc.CardHeader(
                                 [
                                     dcc.Graph(
-                                        figure=fig7(df_detalhamento),
+                                        id=f"{pageTag}fig7",
+                                        figure=figuras.compactar(
+                                            figura7, f"{pageTag}fig7"
+                                        ),
                                         config={"responsive": True},
                                         style={
                                             "height": "100%",
@@ -573,6 +587,9 @@ def loadCharts(session_id: str) -> html.Div:
                                             "minHeight": "500",
                                         },
                                     ),
+                                    dcc.Store(
+                                        id=f"{pageTag}fig7-nivel", data=nivel7
+                                    ),
                                 ],
                                 class_name="shadow-sm p-1 card-com-hover",
                                 style={"minHeight": "508px"},
@@ -584,7 +601,11 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig5(df_resumo)),
+                                    dcc.Graph(
+                                        figure=figuras.compactar(
+                                            fig5(df_resumo), f"{pageTag}fig5"
+                                        )
+                                    ),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -607,7 +628,11 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig6(df_detalhamento)),
+                                    dcc.Graph(
+                                        figure=figuras.compactar(
+                                            fig6(df_detalhamento), f"{pageTag}fig6"
+                                        )
+                                    ),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -630,7 +655,11 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig4(df_resumo)),
+                                    dcc.Graph(
+                                        figure=figuras.compactar(
+                                            fig4(df_resumo), f"{pageTag}fig4"
+                                        )
+                                    ),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -648,7 +677,11 @@ def loadCharts(session_id: str) -> html.Div:
                         dbc.Card(
                             dbc.CardHeader(
                                 [
-                                    dcc.Graph(figure=fig2(df_resumo)),
+                                    dcc.Graph(
+                                        figure=figuras.compactar(
+                                            fig2(df_resumo), f"{pageTag}fig2"
+                                        )
+                                    ),
                                     dbc.Button(
                                         "Ver detalhes",
                                         color="primary",
@@ -668,21 +701,36 @@ def loadCharts(session_id: str) -> html.Div:
         ]
     )
 
-def create_modal_callback(modal_id):
-    @app.callback(
-        Output(f"modal-{pageTag}-det-fig{modal_id}", "is_open"),
-        [
-            Input(f"btn-{pageTag}-det-fig{modal_id}", "n_clicks"),
-            Input(f"close-modal-{pageTag}-det-fig{modal_id}", "n_clicks"),
-        ],
-        [State(f"modal-{pageTag}-det-fig{modal_id}", "is_open")],
-    )
-    def toggle_modal(n1, n2, is_open):
-        if n1 or n2:
-            return not is_open
-        return is_open
+Interface.modaisDetalhe(app, pageTag, range(1, 7))
 
 
-# Criar callbacks para cada modal
-for i in range(1, 7):
-    create_modal_callback(i)
+@app.callback(
+    [
+        Output(f"graph-{pageTag}-det-fig1", "figure"),
+        Output(f"tabela-{pageTag}-det-fig1", "columns"),
+        Output(f"tabela-{pageTag}-det-fig1", "data"),
+        Output(f"tabela-{pageTag}-det-fig1", "page_count"),
+    ],
+    [
+        Input(f"modal-{pageTag}-det-fig1", "is_open"),
+        Input(f"tabela-{pageTag}-det-fig1", "page_current"),
+        Input(f"tabela-{pageTag}-det-fig1", "page_size"),
+        Input(f"tabela-{pageTag}-det-fig1", "sort_by"),
+    ],
+    State("session_data", "data"),
+)
+def showDetalhe1(is_open, page_current, page_size, sort_by, session_data):
+    session_id = session_data.get("session_id", "")
+    if not is_open or not sessionDF.contem_sessao(session_id):
+        raise PreventUpdate
+
+    grafico1 = graficoMotoristas(session_id)
+    tabela = grafico1["dataframe"]
+    registros, paginas = detalhes.pagina(tabela, page_current, page_size, sort_by)
+    abriu = callback_context.triggered_id == f"modal-{pageTag}-det-fig1"
+    return (
+        grafico1["fig"] if abriu else no_update,
+        detalhes.colunas(tabela),
+        registros,
+        paginas,
+    )
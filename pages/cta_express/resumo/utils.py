@@ -1,59 +1,61 @@
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
 import pandas as pd
+from dash import Patch
 from pages.cta_express.cta_express_globals import variables_data
-from utils import conversores
+from assets.static import Graphcs, Settings
+from utils import figuras, mapa
 
 
-def create_choropleth_map(dfmapa: pd.DataFrame):
-    df_agg = dfmapa.copy()
+def nivel_grade(pontos: pd.DataFrame) -> int | None:
+    """
+    Grade de ``celulas`` do zoom inicial, ou ``None`` quando o mapa mostra os
+    clientes (até Settings.MapaPontos).
+    """
+    if len(pontos) <= Settings.MapaPontos:
+        return None
+    return mapa.nivel(mapa.enquadrar(pontos)[0])
 
-    center_lat = df_agg[variables_data.cliente_lat].mean()
-    center_lon = df_agg[variables_data.cliente_log].mean()
 
-    if not df_agg.empty:
-        lat_range = np.ptp(df_agg[variables_data.cliente_lat])
-        lon_range = np.ptp(df_agg[variables_data.cliente_log])
-        range_sum = lat_range + lon_range
+def create_choropleth_map(
+    pontos: pd.DataFrame, celulas: pd.DataFrame, nivel: int | None = None
+):
+    """
+    Mapa de vendas sobre os clientes (``pontos``) ou, quando eles passam de
+    Settings.MapaPontos, sobre a grade de ``celulas`` do ``nivel`` (por
+    padrão o do zoom inicial; ver atualizacao_grade).
+    """
+    zoom_level, center_lat, center_lon = mapa.enquadrar(pontos)
+    if nivel is None:
+        nivel = nivel_grade(pontos)
+    agrupado = nivel is not None
 
-        if range_sum < 0.5:
-            zoom_level = 11
-        elif range_sum < 1:
-            zoom_level = 10
-        elif range_sum < 2:
-            zoom_level = 9
-        elif range_sum < 4:
-            zoom_level = 8
-        elif range_sum < 8:
-            zoom_level = 7
-        elif range_sum < 15:
-            zoom_level = 6
-        else:
-            zoom_level = 5
+    if agrupado:
+        df_agg = mapa.grade(celulas, nivel)
+        hover_data = {
+            "clientes": Graphcs.hoverInteiro,
+            "itens": Graphcs.hoverInteiro,
+        }
+        rotulo_pontos = "Pontos Agrupados"
+        customdata = df_agg[["clientes", "itens", variables_data.Valor_Venda]]
+        hovertemplate = (
+            "<b>%{customdata[0]:,.0f} clientes</b><br>Itens: %{customdata[1]:,.0f}"
+        )
     else:
-        zoom_level = 6.5
-
-    df_agg = (
-        df_agg.groupby(
+        df_agg = pontos.assign(Cliente=pontos[variables_data.Desc_Cliente])
+        hover_data = {"Cliente": True}
+        rotulo_pontos = "Pontos Individuais"
+        customdata = df_agg[
             [
-                variables_data.cliente_lat,
-                variables_data.cliente_log,
-                variables_data.Desc_Cidade,
                 variables_data.Desc_Cliente,
+                variables_data.Desc_Cidade,
+                variables_data.Valor_Venda,
             ]
-        )
-        .agg({variables_data.Valor_Venda: "sum", variables_data.Valor_Cubagem: "sum"})
-        .reset_index()
-    )
-
-    df_agg["Valor"] = df_agg[variables_data.Valor_Venda].apply(
-        conversores.moedaCorrente
-    )
-    df_agg["Cliente"] = df_agg[variables_data.Desc_Cliente]
-    df_agg["Cubagem"] = df_agg[variables_data.Valor_Cubagem].apply(
-        conversores.MetricOutrosValores
-    )
+        ]
+        hovertemplate = "<b>%{customdata[0]}</b><br>Cidade: %{customdata[1]}"
+    # O hover mostra duas casas; o resto das casas só aumentaria o JSON
+    df_agg = df_agg.round({variables_data.Valor_Venda: 2, variables_data.Valor_Cubagem: 2})
+    customdata = customdata.round({variables_data.Valor_Venda: 2})
 
     heatmap = px.density_mapbox(
         df_agg,
@@ -66,34 +68,52 @@ def create_choropleth_map(dfmapa: pd.DataFrame):
         center={"lat": center_lat, "lon": center_lon},
         height=500,
         color_continuous_scale="Inferno",
+        labels={
+            variables_data.Valor_Venda: "Valor",
+            variables_data.Valor_Cubagem: "Cubagem",
+            "clientes": "Clientes",
+            "itens": "Itens",
+        },
         hover_data={
-            "Cliente": True,
-            "Valor": True,
-            "Cubagem": True,
-            variables_data.Valor_Venda: False,
+            **hover_data,
+            variables_data.Valor_Venda: Graphcs.hoverValor,
+            variables_data.Valor_Cubagem: Graphcs.hoverValor,
             variables_data.cliente_lat: False,
             variables_data.cliente_log: False,
         },
     )
 
+    Graphcs.moeda(heatmap, "Valor")
     heatmap.update_traces(opacity=0.7)
 
-    df_city_labels = dfmapa.groupby(variables_data.Desc_Cidade, as_index=False).agg(
-        {variables_data.cliente_lat: "mean", variables_data.cliente_log: "mean"}
+    # Rótulo de cada cidade na média das coordenadas dos seus itens
+    pesos = pontos.assign(
+        lat_itens=pontos[variables_data.cliente_lat] * pontos["itens"],
+        lon_itens=pontos[variables_data.cliente_log] * pontos["itens"],
+    )
+    df_city_labels = pesos.groupby(
+        variables_data.Desc_Cidade, as_index=False, observed=True
+    ).agg({"lat_itens": "sum", "lon_itens": "sum", "itens": "sum"})
+    df_city_labels[variables_data.cliente_lat] = (
+        df_city_labels["lat_itens"] / df_city_labels["itens"]
+    )
+    df_city_labels[variables_data.cliente_log] = (
+        df_city_labels["lon_itens"] / df_city_labels["itens"]
     )
 
     scatter = go.Scattermapbox(
-        lat=dfmapa[variables_data.cliente_lat],
-        lon=dfmapa[variables_data.cliente_log],
+        lat=df_agg[variables_data.cliente_lat],
+        lon=df_agg[variables_data.cliente_log],
         mode="markers",
         marker=go.scattermapbox.Marker(size=10, symbol="circle", color="Orange"),
-        name="Pontos Individuais",
+        name=rotulo_pontos,
         visible=False,
         showlegend=False,
-        customdata=dfmapa[
-            ["Valor", variables_data.Desc_Cidade, variables_data.Desc_Cliente]
-        ],
-        hovertemplate="<b>%{customdata[2]}</b><br>Cidade: %{customdata[1]}<br>Venda: %{customdata[0]}<extra></extra>",
+        customdata=customdata,
+        hovertemplate=hovertemplate
+        + "<br>Venda: "
+        + Graphcs.formato("customdata[2]", 2, "R$ ")
+        + "<extra></extra>",
     )
 
     city_labels = go.Scattermapbox(
@@ -115,6 +135,8 @@ def create_choropleth_map(dfmapa: pd.DataFrame):
             center={"lat": center_lat, "lon": center_lon},
         ),
         margin={"l": 0, "r": 0, "t": 0, "b": 0},
+        # Mantém zoom e centro do usuário quando atualizacao_grade troca as células
+        uirevision="mapa",
         title=dict(
             text="Concentração das Vendas",
             font=dict(size=16, color="black"),
@@ -123,6 +145,7 @@ def create_choropleth_map(dfmapa: pd.DataFrame):
             y=0.97,
         ),
         paper_bgcolor="white",
+        separators=Graphcs.separadores,
         updatemenus=[
             dict(
                 buttons=[
@@ -133,7 +156,7 @@ def create_choropleth_map(dfmapa: pd.DataFrame):
                     ),
                     dict(
                         args=[{"visible": [False, True, True]}],
-                        label="Pontos Individuais",
+                        label=rotulo_pontos,
                         method="update",
                     ),
                 ],
@@ -146,3 +169,20 @@ def create_choropleth_map(dfmapa: pd.DataFrame):
     )
 
     return fig
+
+
+def atualizacao_grade(
+    pontos: pd.DataFrame, celulas: pd.DataFrame, nivel: int
+) -> Patch:
+    """
+    ``Patch`` que troca as células do heatmap e dos pontos agrupados pelas da
+    grade ``nivel``; o resto da figura (camada escolhida, rótulos) não muda.
+    """
+    figura = figuras.compactar(create_choropleth_map(pontos, celulas, nivel))
+    patch = Patch()
+    for indice in (0, 1):
+        trace = figura["data"][indice]
+        for chave in ("lat", "lon", "z", "customdata"):
+            if chave in trace:
+                patch["data"][indice][chave] = trace[chave]
+    return patch
@@ -0,0 +1,258 @@
+"""
+pages/loading/ingestao.py
+Pipeline de carga da sessão, executado em segundo plano.
+
+O POST em /set_biexpress chama ``iniciar`` e a busca começa enquanto o
+navegador ainda está sendo redirecionado; o callback da página de
+carregamento só espera o resultado com ``aguardar``.
+
+O token do BIExpress não vai para o session_control (que o backend
+"diretorio" grava em disco): fica só na memória deste processo até o job da
+sessão começar, e depois só na fonte daquela busca.
+
+Etapas (cada uma medida no RelatorioIngestao da sessão):
+busca, decodificação e frames (na fonte, ver utils/fontes_biexpress.py),
+normalização, merge, compactação, índice (colunas de filtro como category,
+cubo de agregados, coocorrências dos filtros e grades do mapa) e gravação.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+import pandas as pd
+
+from app import session_control as sessions
+from app import session_dataframes_cta_express as sessionDF
+from assets.static import Settings
+from pages.cta_express.cta_express_globals import variables_data
+from utils.cache_biexpress import CacheDiario
+from utils import compactacao, filtros, mapa, normalizacao
+from utils.cubo import CuboAgregado
+from utils.fontes_biexpress import FonteAPI, FonteArquivo, FonteCache
+from utils.relatorio_ingestao import RelatorioIngestao, tamanho
+
+_executor = ThreadPoolExecutor(
+    max_workers=Settings.IngestWorkers, thread_name_prefix="ingestao"
+)
+_jobs: dict[str, Future] = {}
+# Token de cada sessão até o job dela começar (ver iniciar e _executar)
+_tokens: dict[str, str] = {}
+_cache = (
+    CacheDiario(Settings.CacheDir or None, ttl_hoje=Settings.CacheHojeTTL)
+    if Settings.CacheDias
+    else None
+)
+_lock = threading.Lock()
+
+# Intervalo (s) de consulta quando a carga está rodando em outro worker
+_INTERVALO_ESPERA = 0.5
+# Status de uma carga ainda em andamento: "na_fila" vem do /set_biexpress
+# (job esperando um dos IngestWorkers) e "carregando" do próprio job
+_EM_ANDAMENTO = ("na_fila", "carregando")
+EXPIRADA = "Sessão expirada, abra o painel novamente"
+
+
+class SessaoExpirada(Exception):
+    """Dados da sessão da API removidos; sem o token não há como buscar de novo."""
+
+
+def _atualizar_status(session_id: str, status: str, mensagem: str = ""):
+    # Regrava os parâmetros para que o status chegue aos outros workers
+    session_data = sessions.get(session_id)
+    if session_data is not None:
+        sessions[session_id] = {**session_data, "status": status, "mensagem": mensagem}
+
+
+def relacionar(df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame):
+    """Leva motorista/placa da carga para os itens e a data de emissão para as cargas."""
+    df_detalhamento = df_detalhamento.merge(
+        df_resumo[
+            [
+                variables_data.Desc_Motorista,
+                variables_data.Desc_Placa,
+                variables_data.Guid_Carga,
+            ]
+        ],
+        on=variables_data.Guid_Carga,
+        how="left",
+    )
+
+    dt_emissao_df = df_detalhamento[
+        [variables_data.Guid_Carga, variables_data.DT_Emissao]
+    ].drop_duplicates(subset=variables_data.Guid_Carga, keep='first').reset_index(drop=True)
+
+    df_resumo = df_resumo.merge(
+        dt_emissao_df,
+        on=variables_data.Guid_Carga,
+        how="left"
+    )
+
+    return df_detalhamento, df_resumo
+
+
+def fonte_da_sessao(session_data: dict, token: str | None = None):
+    """Arquivo local quando a sessão indica um, senão a API (com cache diário se ligado)."""
+    if session_data.get("arquivo"):
+        return FonteArquivo(session_data["arquivo"])
+    if token is None:
+        raise SessaoExpirada(EXPIRADA)
+    fonte = FonteAPI(
+        id=session_data.get("id"),
+        token=token,
+        guid=session_data.get("guid"),
+    )
+    if _cache is not None:
+        # Partições separadas por token: dias do cache não passam pela API
+        fonte = FonteCache(fonte, _cache, _cache.chave(session_data.get("id"), token))
+    return fonte
+
+
+def executar_pipeline(
+    session_id: str, fonte, dtDe: str, dtA: str
+) -> RelatorioIngestao:
+    """Roda todas as etapas para a sessão e grava os frames no sessionDF."""
+    relatorio = RelatorioIngestao(session_id, fonte.nome)
+    df_detalhamento, df_resumo = fonte.buscar(relatorio, dtDe, dtA)
+
+    with relatorio.etapa("normalizacao") as medida:
+        df_detalhamento, df_resumo = normalizacao.normalizar(df_detalhamento, df_resumo)
+        medida["linhas"] = len(df_detalhamento) + len(df_resumo)
+
+    with relatorio.etapa("merge") as medida:
+        df_detalhamento, df_resumo = relacionar(df_detalhamento, df_resumo)
+        medida["linhas"] = len(df_detalhamento) + len(df_resumo)
+
+    with relatorio.etapa("compactacao") as medida:
+        memoria = compactacao.compactar(
+            {"detalhamento": df_detalhamento, "resumo": df_resumo}
+        )
+        medida["linhas"] = len(df_detalhamento) + len(df_resumo)
+        medida["bytes"] = memoria["total"]["bytes_depois"]
+
+    with relatorio.etapa("indice") as medida:
+        filtros.indexar(df_detalhamento)
+        filtros.indexar(df_resumo)
+        cubo = CuboAgregado.construir(df_detalhamento)
+        coocorrencias = filtros.coocorrencias(df_detalhamento)
+        mapa_pontos, mapa_celulas = mapa.construir(df_detalhamento)
+        medida["linhas"] = (
+            len(cubo.celulas) + len(coocorrencias) + len(mapa_pontos) + len(mapa_celulas)
+        )
+        medida["bytes"] = (
+            cubo.memoria()
+            + tamanho(coocorrencias)
+            + tamanho(mapa_pontos)
+            + tamanho(mapa_celulas)
+        )
+    memoria["cubo"] = {"bytes_antes": 0, "bytes_depois": medida["bytes"]}
+    compactacao.imprimir_relatorio(memoria, session_id)
+
+    with relatorio.etapa("gravacao") as medida:
+        frames = {
+            f"{session_id}_detalhamento": df_detalhamento,
+            f"{session_id}_resumo": df_resumo,
+            **cubo.para_sessao(session_id),
+            f"{session_id}_coocorrencias": coocorrencias,
+            **mapa.para_sessao(session_id, mapa_pontos, mapa_celulas),
+        }
+        for chave, frame in frames.items():
+            sessionDF[chave] = frame
+        medida["linhas"] = len(df_detalhamento) + len(df_resumo)
+        medida["bytes"] = memoria["total"]["bytes_depois"] + memoria["cubo"]["bytes_depois"]
+
+    relatorio.extras["memoria"] = memoria
+    relatorio.imprimir()
+    if Settings.IngestRelatorio:
+        try:
+            relatorio.exportar(Settings.IngestRelatorio)
+        except OSError as e:
+            print(f"Erro ao exportar o relatório de ingestão: {e}")
+
+    session_data = sessions.get(session_id)
+    if session_data is not None:
+        sessions[session_id] = {
+            **session_data,
+            "memoria": memoria,
+            "ingestao": relatorio.para_dict(),
+            # Muda a cada carga; invalida os resultados em app.memo_filtros
+            "versao": uuid.uuid4().hex,
+        }
+    return relatorio
+
+
+def carregar_sessao(session_id: str, token: str | None = None) -> str:
+    """Busca os dados da sessão (arquivo, cache diário ou API) e grava no sessionDF."""
+    session_data = sessions[session_id]
+    dtDe = session_data.get("dtDe")
+    dtA = session_data.get("dtA")
+    executar_pipeline(session_id, fonte_da_sessao(session_data, token), dtDe, dtA)
+    return f"Carregamento finalizado, dados de {dtDe} a {dtA}"
+
+
+def _executar(session_id: str) -> str:
+    # O token sai do processo junto com a fonte desta busca
+    with _lock:
+        token = _tokens.pop(session_id, None)
+    _atualizar_status(session_id, "carregando")
+    try:
+        mensagem = carregar_sessao(session_id, token)
+    except Exception as e:
+        _atualizar_status(session_id, "erro", str(e))
+        raise
+    _atualizar_status(session_id, "pronto", mensagem)
+    return mensagem
+
+
+def iniciar(session_id: str, token: str | None = None) -> Future:
+    """
+    Agenda a carga da sessão; chamadas repetidas reaproveitam o mesmo job.
+
+    ``token`` é o do BIExpress, usado só por este job (não fica na sessão).
+    """
+    with _lock:
+        futuro = _jobs.get(session_id)
+        if futuro is None:
+            if token is not None:
+                _tokens[session_id] = token
+            futuro = _executor.submit(_executar, session_id)
+            _jobs[session_id] = futuro
+            futuro.add_done_callback(lambda _: _jobs.pop(session_id, None))
+        return futuro
+
+
+def aguardar(session_id: str, timeout: float | None = None) -> str:
+    """
+    Espera a carga da sessão terminar e devolve a mensagem de conclusão.
+
+    Se o job foi iniciado em outro worker (ou ainda está na fila), acompanha
+    o status gravado em session_control; um erro da carga é levantado de
+    novo com a mensagem gravada. Se não há job nem dados (ex.: sessão
+    removida da memória), inicia a carga aqui para sessões de arquivo; nas
+    da API o token já foi descartado e levanta SessaoExpirada.
+    """
+    timeout = timeout or Settings.ApiReadTimeout + 60
+    futuro = _jobs.get(session_id)
+    if futuro is None:
+        limite = time.monotonic() + timeout
+        while True:
+            session_data = sessions.get(session_id) or {}
+            status = session_data.get("status")
+            if status == "pronto" and sessionDF.contem_sessao(session_id):
+                return session_data.get("mensagem", "Carregamento finalizado!")
+            if status == "erro":
+                # Outra carga, sem o token, só esconderia a causa
+                raise RuntimeError(
+                    session_data.get("mensagem") or "Erro ao carregar a sessão"
+                )
+            if status not in _EM_ANDAMENTO:
+                break
+            if time.monotonic() > limite:
+                raise TimeoutError(
+                    f"Carga da sessão {session_id} não terminou em {timeout:.0f}s"
+                )
+            time.sleep(_INTERVALO_ESPERA)
+        if not session_data.get("arquivo"):
+            raise SessaoExpirada(EXPIRADA)
+        futuro = iniciar(session_id)
+    return futuro.result(timeout=timeout)
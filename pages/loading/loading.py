@@ -7,27 +7,15 @@ import pandas as pd
 import dash
 import time
 import json
-from utils import cta_api
 from datetime import datetime
 from pages.cta_express.cta_express_globals import variables_data
-from utils.conversores import getFloat
 import random
 from utils import read_file
+from utils import relatorio_ingestao
+from pages.loading import ingestao
 
 pageTag = "loading_"
 
-def lowercase_initial_keys(obj):
-    if isinstance(obj, dict):
-        return {
-            k[0].lower() + k[1:] if k else k: lowercase_initial_keys(v)
-            for k, v in obj.items()
-        }
-    elif isinstance(obj, list):
-        return [lowercase_initial_keys(item) for item in obj]
-    else:
-        return obj
-
-
 @app.callback(
     Output("ret_loading", "children"),
     Output("url", "href"),
@@ -42,104 +30,38 @@ def load_session(
 
     session_id = search.split("=")[1]
 
-    if  "testebi" in search:
+    if "testebi" in search:
         sessions[session_id] = {
-        "token": "",
-        "dtDe": "01/12/2024",
-        "dtA": "12/12/2024",
-        "guid": session_id,
-        "id": "3238",
+            "dtDe": "01/12/2024",
+            "dtA": "12/12/2024",
+            "guid": session_id,
+            "id": "3238",
+            "arquivo": "db/BITESTE.json",
         }
-        session_data = sessions[session_id]
-        with open('db/BITESTE.json', 'r', encoding='utf-8') as f:
-            retornoLocalRaw = json.load(f)
-            retornoLocal = lowercase_initial_keys(retornoLocalRaw)
-        print(f"Fim as { datetime.now().time()} lendo detalhamento")
-        sessionDF[f"{session_id}_detalhamento"] = pd.DataFrame(retornoLocal["itensNFe"])
-        print(f"Lendo cargas { datetime.now().time()}")
-        sessionDF[f"{session_id}_resumo"] = pd.DataFrame(retornoLocal["cargas"])
-        print(f"Fim as { datetime.now().time()}")
-        sessionDF[f"{session_id}_detalhamento"] = sessionDF[
-            f"{session_id}_detalhamento"
-        ].merge(
-            sessionDF[f"{session_id}_resumo"][
-                [
-                    variables_data.Desc_Motorista,
-                    variables_data.Desc_Placa,
-                    variables_data.Guid_Carga,
-                ]
-            ],
-            on=variables_data.Guid_Carga,
-            how="left",
-        )
-
-        dt_emissao_df = sessionDF[f"{session_id}_detalhamento"][
-        [variables_data.Guid_Carga, variables_data.DT_Emissao]
-        ].drop_duplicates(subset=variables_data.Guid_Carga, keep='first').reset_index(drop=True)
-
-
-        sessionDF[f"{session_id}_resumo"] = sessionDF[f"{session_id}_resumo"].merge(
-        dt_emissao_df,
-        on=variables_data.Guid_Carga,
-        how="left"
-        )
-
-        sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_lat]= sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_lat].apply(getFloat)
-        sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_log]= sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_log].apply(getFloat)
-
-        return (
-            html.Span(f"Carregamento finalizado!"),
-            f"/cta_express?session_id={session_id}",
-        )
-
 
     if session_id not in sessions:
         return "Não há informações para essa sessão. Tente novamente!", dash.no_update
 
-    session_data = sessions[session_id]
-    print(session_data)
-    sessions.pop(session_id)
-    id = session_data.get("id")
-    token = session_data.get("token")
-    dtDe = session_data.get("dtDe")
-    dtA = session_data.get("dtA")
-    guid = session_data.get("guid")
-    print(f"inicio as { datetime.now().time()}")
-    retorno = cta_api.GetBIExpress(id=id, token=token, dtDe=dtDe, dtA=dtA, guid=guid)
-    print(f"Fim as { datetime.now().time()} lendo detalhamento")
-    sessionDF[f"{session_id}_detalhamento"] = pd.DataFrame(retorno["itensNFe"])
-    print(f"Lendo cargas { datetime.now().time()}")
-    sessionDF[f"{session_id}_resumo"] = pd.DataFrame(retorno["cargas"])
-    print(f"Fim as { datetime.now().time()}")
-    sessionDF[f"{session_id}_detalhamento"] = sessionDF[
-        f"{session_id}_detalhamento"
-    ].merge(
-        sessionDF[f"{session_id}_resumo"][
+    # A carga foi iniciada no POST de /set_biexpress; aqui só esperamos o
+    # resultado (ou recarregamos o arquivo, se a sessão saiu da memória)
+    try:
+        mensagem = ingestao.aguardar(session_id)
+    except ingestao.SessaoExpirada as e:
+        return str(e), dash.no_update
+    except Exception as e:
+        print(f"Erro ao carregar a sessão {session_id}: {e}")
+        return "Erro ao carregar os dados. Tente novamente!", dash.no_update
+
+    relatorio = (sessions.get(session_id) or {}).get("ingestao")
+    return (
+        html.Div(
             [
-                variables_data.Desc_Motorista,
-                variables_data.Desc_Placa,
-                variables_data.Guid_Carga,
+                html.Span(mensagem),
+                html.Div(
+                    relatorio_ingestao.texto_resumo(relatorio) if relatorio else "",
+                    className="text-muted small",
+                ),
             ]
-        ],
-        on=variables_data.Guid_Carga,
-        how="left",
-    )
-
-    dt_emissao_df = sessionDF[f"{session_id}_detalhamento"][
-    [variables_data.Guid_Carga, variables_data.DT_Emissao]
-    ].drop_duplicates(subset=variables_data.Guid_Carga, keep='first').reset_index(drop=True)
-
-
-    sessionDF[f"{session_id}_resumo"] = sessionDF[f"{session_id}_resumo"].merge(
-    dt_emissao_df,
-    on=variables_data.Guid_Carga,
-    how="left"
-    )
-
-    sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_lat]= sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_lat].apply(getFloat)
-    sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_log]= sessionDF[f"{session_id}_detalhamento"][variables_data.cliente_log].apply(getFloat)
-
-    return (
-        html.Span(f"Carregamento finalizado, dados de {dtDe} a {dtA}"),
-        f"/cta_express?session_id={guid}",
+        ),
+        f"/cta_express?session_id={session_id}",
     )
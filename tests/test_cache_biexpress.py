@@ -0,0 +1,138 @@
+"""
+tests/test_cache_biexpress.py
+CacheDiario montando faixas a partir de partições de consultas diferentes.
+
+Uso: python -m pytest tests/test_cache_biexpress.py
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import dados
+from pages.cta_express.cta_express_globals import variables_data
+from utils.cache_biexpress import CacheDiario
+
+CHAVE = CacheDiario.chave(1, "token")
+
+
+@pytest.fixture(scope="module")
+def retorno():
+    itens, cargas = dados.gerar(3000, dias=30, inicio=date(2024, 12, 1), seed=7)
+    # Itens da mesma carga emitidos em até três dias seguidos, como nas cargas
+    # que atravessam a meia-noite ou o limite entre duas consultas
+    emissao = pd.to_datetime(itens[variables_data.DT_Emissao]) + pd.to_timedelta(
+        np.arange(len(itens)) % 3, unit="D"
+    )
+    itens[variables_data.DT_Emissao] = emissao.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return itens, cargas
+
+
+class ApiFalsa:
+    """Filtra pela emissão, como o GetBIExpress, e conta as chamadas."""
+
+    def __init__(self, itens: pd.DataFrame, cargas: pd.DataFrame):
+        self.itens, self.cargas = itens, cargas
+        self.chamadas = []
+
+    def __call__(self, dtDe: str, dtA: str):
+        self.chamadas.append((dtDe, dtA))
+        inicio = pd.Timestamp(datetime.strptime(dtDe, "%d/%m/%Y"))
+        fim = pd.Timestamp(datetime.strptime(dtA, "%d/%m/%Y"))
+        dia = pd.to_datetime(self.itens[variables_data.DT_Emissao]).dt.normalize()
+        itens = self.itens[dia.between(inicio, fim)].reset_index(drop=True)
+        guids = set(itens[variables_data.Guid_Carga])
+        cargas = self.cargas[self.cargas[variables_data.Guid_Carga].isin(guids)]
+        return itens, cargas.reset_index(drop=True)
+
+
+def _ordenado(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _relacionado(itens: pd.DataFrame, cargas: pd.DataFrame) -> pd.DataFrame:
+    colunas = [
+        variables_data.Guid_Carga,
+        variables_data.Desc_Motorista,
+        variables_data.Desc_Placa,
+    ]
+    return itens.merge(cargas[colunas], on=variables_data.Guid_Carga, how="left")
+
+
+def _conferir(cache: CacheDiario, api: ApiFalsa, dtDe: str, dtA: str):
+    itens, cargas, _ = cache.buscar(CHAVE, dtDe, dtA, api)
+    itens_api, cargas_api = api(dtDe, dtA)
+    pd.testing.assert_frame_equal(_ordenado(itens), _ordenado(itens_api))
+    pd.testing.assert_frame_equal(_ordenado(cargas), _ordenado(cargas_api))
+    relacionado = _relacionado(itens, cargas)
+    assert relacionado[variables_data.Desc_Motorista].notna().all()
+    assert relacionado[variables_data.Desc_Placa].notna().all()
+
+
+@pytest.mark.parametrize(
+    "consultas",
+    [
+        [("01/12/2024", "30/12/2024"), ("15/12/2024", "30/12/2024")],
+        [("15/12/2024", "30/12/2024"), ("01/12/2024", "30/12/2024")],
+        [("01/12/2024", "14/12/2024"), ("10/12/2024", "20/12/2024")],
+    ],
+)
+def test_faixa_montada_igual_a_consulta_direta(tmp_path, retorno, consultas):
+    api = ApiFalsa(*retorno)
+    cache = CacheDiario(str(tmp_path))
+    for dtDe, dtA in consultas:
+        _conferir(cache, api, dtDe, dtA)
+
+
+def test_segunda_consulta_usa_so_o_cache(tmp_path, retorno):
+    api = ApiFalsa(*retorno)
+    cache = CacheDiario(str(tmp_path))
+    cache.buscar(CHAVE, "01/12/2024", "30/12/2024", api)
+    _, _, relatorio = cache.buscar(CHAVE, "15/12/2024", "30/12/2024", api)
+    assert relatorio["dias_api"] == 0
+
+
+def test_particao_gravada_antes_do_fim_do_dia_expira(tmp_path, retorno):
+    api = ApiFalsa(*retorno)
+    cache = CacheDiario(str(tmp_path), ttl_hoje=300)
+    dia = date(2024, 12, 10)
+    cache.buscar(CHAVE, "10/12/2024", "10/12/2024", api)
+    assert cache.valido(CHAVE, dia)
+
+    # Gravada às 18h do próprio dia: o resto do dia ainda não tinha chegado
+    tarde = datetime.combine(dia, datetime.min.time()) + timedelta(hours=18)
+    for tabela in ("itensNFe", "cargas"):
+        for arquivo in cache.backend._arquivos(CHAVE, cache._nome(dia, tabela)):
+            if os.path.exists(arquivo):
+                os.utime(arquivo, (tarde.timestamp(), tarde.timestamp()))
+    assert not cache.valido(CHAVE, dia)
+
+    _, _, relatorio = cache.buscar(CHAVE, "10/12/2024", "10/12/2024", api)
+    assert relatorio["dias_api"] == 1
+    assert cache.valido(CHAVE, dia)
+
+
+def test_token_errado_nao_le_o_cache(tmp_path, retorno):
+    cache = CacheDiario(str(tmp_path))
+    api = ApiFalsa(*retorno)
+    itens, _, _ = cache.buscar(
+        CacheDiario.chave(1, "certo"), "01/12/2024", "30/12/2024", api
+    )
+    assert len(itens)
+
+    def recusar(dtDe, dtA):
+        raise RuntimeError("token inválido")
+
+    # Mesmo id com outro token: nenhum dia vem do cache, a API recusa
+    with pytest.raises(RuntimeError):
+        cache.buscar(
+            CacheDiario.chave(1, "errado"), "01/12/2024", "30/12/2024", recusar
+        )
+    assert not any(
+        cache.valido(CacheDiario.chave(1, "errado"), date(2024, 12, 1) + timedelta(n))
+        for n in range(30)
+    )
+    assert CacheDiario.chave(1, "certo") != CacheDiario.chave(2, "certo")
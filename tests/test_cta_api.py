@@ -0,0 +1,99 @@
+"""
+tests/test_cta_api.py
+ClienteBIExpress contra o stub local do GetBIExpress (benchmarks/stub_biexpress.py).
+
+Uso: python -m pytest tests/test_cta_api.py
+"""
+
+import socket
+import time
+
+import pytest
+
+from benchmarks.stub_biexpress import StubBIExpress
+from utils.cta_api import ClienteBIExpress
+
+ITENS = 500
+CONSULTA = {
+    "id": 1,
+    "token": "t",
+    "guid": "g",
+    "dtDe": "01/12/2024",
+    "dtA": "31/12/2024",
+}
+
+
+@pytest.fixture
+def stub(request):
+    opcoes = getattr(request, "param", {})
+    servidor = StubBIExpress(ITENS, **opcoes).iniciar()
+    yield servidor
+    servidor.parar()
+
+
+def test_resposta_gzip(stub):
+    cliente = ClienteBIExpress(stub.url, timeout=(2, 5), tentativas=0)
+    assert cliente.GetBIExpressConteudo(**CONSULTA) == stub.corpo
+
+    registro = cliente.metricas()["ultimas"][-1]
+    assert registro["status"] == 200
+    assert registro["encoding"] == "gzip"
+    assert registro["bytes"] == len(stub.corpo)
+    assert registro["bytes_rede"] == len(stub.corpo_gzip)
+
+
+def test_resposta_gzip_colunar(stub):
+    cliente = ClienteBIExpress(stub.url, timeout=(2, 5), tentativas=0)
+    frames, relatorio = cliente.GetBIExpressColunar(**CONSULTA)
+    retorno = cliente.GetBIExpress(**CONSULTA)
+
+    assert len(frames["itensNFe"]) == len(retorno["itensNFe"]) == ITENS
+    assert len(frames["cargas"]) == len(retorno["cargas"])
+    assert relatorio["http"]["encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("stub", [{"falhas": 1}], indirect=True)
+def test_repete_depois_de_503(stub):
+    cliente = ClienteBIExpress(stub.url, timeout=(2, 5), tentativas=2)
+    assert cliente.GetBIExpressConteudo(**CONSULTA) == stub.corpo
+
+    estatisticas = stub.estatisticas()
+    assert estatisticas["respostas_503"] == 1
+    assert estatisticas["chamadas"] == 1
+    assert cliente.metricas()["erros"] == 0
+
+
+@pytest.mark.parametrize("stub", [{"falhas": 5}], indirect=True)
+def test_503_depois_das_tentativas(stub):
+    cliente = ClienteBIExpress(stub.url, timeout=(2, 5), tentativas=1)
+    assert cliente.GetBIExpressConteudo(**CONSULTA) is None
+    assert stub.estatisticas()["respostas_503"] == 2
+    assert cliente.metricas()["ultimas"][-1]["status"] == 503
+
+
+def test_falha_de_conexao():
+    # Porta livre sem ninguém escutando: conexão recusada
+    with socket.socket() as livre:
+        livre.bind(("127.0.0.1", 0))
+        porta = livre.getsockname()[1]
+    url = f"http://127.0.0.1:{porta}/api/v3.0.0/GetBIExpress/"
+    cliente = ClienteBIExpress(url, timeout=(1, 5), tentativas=0)
+
+    assert cliente.GetBIExpressConteudo(**CONSULTA) is None
+    assert cliente.GetBIExpressColunar(**CONSULTA) is None
+    metricas = cliente.metricas()
+    assert metricas["erros"] == 2
+    assert all(c["status"] is None and c["erro"] for c in metricas["ultimas"])
+
+
+@pytest.mark.parametrize("stub", [{"latencia": 2.0}], indirect=True)
+def test_timeout_de_leitura(stub):
+    cliente = ClienteBIExpress(stub.url, timeout=(1, 0.3), tentativas=2)
+    inicio = time.perf_counter()
+    assert cliente.GetBIExpressConteudo(**CONSULTA) is None
+
+    # Leitura não é repetida (read=0): desiste no primeiro timeout
+    assert time.perf_counter() - inicio < 1.5
+    registro = cliente.metricas()["ultimas"][-1]
+    assert registro["status"] is None
+    assert "timed out" in registro["erro"].lower()
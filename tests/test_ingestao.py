@@ -0,0 +1,53 @@
+"""
+tests/test_ingestao.py
+ingestao.aguardar acompanhando uma carga de outro worker pelo session_control.
+
+Uso: python -m pytest tests/test_ingestao.py
+"""
+
+import threading
+import uuid
+
+import pytest
+
+from app import session_control as sessions
+from pages.loading import ingestao
+
+
+@pytest.fixture
+def session_id():
+    sid = str(uuid.uuid4())
+    # Como o /set_biexpress deixa a sessão antes de o job começar
+    sessions[sid] = {"dtDe": "01/12/2024", "dtA": "31/12/2024", "status": "na_fila"}
+    yield sid
+    sessions.pop(sid, None)
+
+
+def _depois(segundos: float, session_id: str, **campos):
+    def gravar():
+        sessions[session_id] = {**sessions[session_id], **campos}
+
+    threading.Timer(segundos, gravar).start()
+
+
+def test_espera_a_fila_e_levanta_o_erro_gravado(session_id):
+    _depois(0.3, session_id, status="carregando")
+    _depois(0.8, session_id, status="erro", mensagem="Falha ao consultar o BIExpress")
+    with pytest.raises(RuntimeError, match="Falha ao consultar o BIExpress"):
+        ingestao.aguardar(session_id, timeout=5)
+    # Nenhuma carga nova (sem token) foi iniciada neste worker
+    assert session_id not in ingestao._jobs
+
+
+def test_fila_sem_fim_estoura_o_timeout(session_id):
+    with pytest.raises(TimeoutError):
+        ingestao.aguardar(session_id, timeout=1)
+    assert session_id not in ingestao._jobs
+
+
+def test_sessao_da_api_removida_nao_recarrega(session_id):
+    # Carga terminou, mas os frames saíram do store (TTL ou orçamento)
+    sessions[session_id] = {**sessions[session_id], "status": "pronto"}
+    with pytest.raises(ingestao.SessaoExpirada, match="abra o painel novamente"):
+        ingestao.aguardar(session_id, timeout=5)
+    assert session_id not in ingestao._jobs
@@ -0,0 +1,93 @@
+"""
+tests/test_json_colunar.py
+Tipos das colunas lidas em streaming por json_colunar.ler_arrays_colunar.
+
+Uso: python -m pytest tests/test_json_colunar.py
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils import json_colunar
+
+
+def _ler(linhas: list[dict], tamanho: int = 7) -> pd.DataFrame:
+    texto = json.dumps({"itensNFe": linhas, "cargas": []})
+    # Pedaços pequenos: valores cortados no meio, como na rede
+    pedacos = [texto[i : i + tamanho].encode() for i in range(0, len(texto), tamanho)]
+    frames, _ = json_colunar.ler_arrays_colunar(pedacos)
+    return frames["itensNFe"]
+
+
+def test_nulos_antes_do_primeiro_numero():
+    df = _ler(
+        [
+            {"vlr": None, "qtd": None, "nome": None},
+            {"vlr": None, "qtd": None, "nome": None},
+            {"vlr": 1.5, "qtd": 3, "nome": "A"},
+            {"vlr": 2, "qtd": 4, "nome": None},
+        ]
+    )
+    assert df["vlr"].dtype == np.float64
+    assert df["qtd"].dtype == np.float64
+    np.testing.assert_array_equal(df["vlr"], [np.nan, np.nan, 1.5, 2.0])
+    np.testing.assert_array_equal(df["qtd"], [np.nan, np.nan, 3.0, 4.0])
+    assert df["nome"].tolist() == [None, None, "A", None]
+
+
+def test_buffer_tipado_com_nulos_antes():
+    # Os nulos iniciais não podem levar a coluna para uma lista de objetos
+    coluna = json_colunar._Coluna(2)
+    for valor in (None, 10, None, 12):
+        coluna.adicionar(valor)
+    valores = coluna.para_array()
+    assert isinstance(valores, np.ndarray) and valores.dtype == np.float64
+    np.testing.assert_array_equal(valores, [np.nan] * 3 + [10.0, np.nan, 12.0])
+
+    texto = json_colunar._Coluna(1)
+    for valor in (None, "a"):
+        texto.adicionar(valor)
+    assert texto.para_array() == [None, None, "a"]
+
+
+def test_campo_que_aparece_depois():
+    df = _ler([{"a": 1}, {"a": 2}, {"a": 3, "b": 7}, {"a": 4, "b": 8}])
+    assert df["a"].dtype == np.int64
+    assert df["b"].dtype == np.float64
+    np.testing.assert_array_equal(df["b"], [np.nan, np.nan, 7.0, 8.0])
+
+
+def test_inteiros_sem_nulos_continuam_inteiros():
+    df = _ler([{"a": 1}, {"a": 2}, {"a": 3}])
+    assert df["a"].dtype == np.int64
+
+
+def test_coluna_so_de_nulos():
+    df = _ler([{"a": None, "b": 1}, {"a": None, "b": 2}])
+    assert len(df) == 2
+    assert df["a"].isna().all()
+
+
+def test_igual_ao_json_loads():
+    linhas = [
+        {"a": None, "b": "x", "c": None},
+        {"a": 1, "b": None, "c": None},
+        {"a": 2.5, "b": "y", "c": "z"},
+        {"a": None, "b": "w", "c": 3},
+    ]
+    esperado = pd.DataFrame(linhas)
+    pd.testing.assert_frame_equal(_ler(linhas), esperado, check_dtype=False)
+
+
+def test_inteiro_fora_do_int64():
+    # Ids acima de 2**63 - 1: a coluna não pode ficar no buffer "q"
+    grande = 2**63
+    df = _ler([{"a": grande}, {"a": 1}, {"a": 2}])
+    assert df["a"].tolist() == [grande, 1, 2]
+
+    coluna = json_colunar._Coluna(0)
+    for valor in (1.5, 10**400):
+        coluna.adicionar(valor)
+    assert coluna.para_array() == [1.5, 10**400]
@@ -0,0 +1,106 @@
+"""
+tests/test_memo_filtros.py
+MemoFiltros com os callbacks dos cards pedindo o mesmo estado de filtro juntos
+e o tamanho estimado das entradas.
+
+Uso: python -m pytest tests/test_memo_filtros.py
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.memo_filtros import MemoFiltros, _tamanho_bytes
+
+FILTROS = {"desc_Cidade": ["B", "A"]}
+
+
+def _em_paralelo(funcao, quantidade: int = 13) -> list:
+    resultados = [None] * quantidade
+    largada = threading.Barrier(quantidade)
+
+    def rodar(indice):
+        largada.wait()
+        try:
+            resultados[indice] = funcao()
+        except Exception as e:
+            resultados[indice] = e
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+
+def test_pedidos_iguais_calculam_uma_vez():
+    memo = MemoFiltros()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return object()
+
+    resultados = _em_paralelo(lambda: memo.obter("s", "cubo", FILTROS, calcular))
+    assert len(chamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert memo.misses == 1 and memo.hits == 12
+
+
+def test_falha_do_primeiro_nao_prende_os_outros():
+    memo = MemoFiltros()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.1)
+        if len(chamadas) == 1:
+            raise RuntimeError("falhou")
+        return "ok"
+
+    resultados = _em_paralelo(lambda: memo.obter("s", "cubo", FILTROS, calcular), 4)
+    assert sum(isinstance(r, RuntimeError) for r in resultados) == 1
+    assert resultados.count("ok") == 3
+    assert len(chamadas) == 2
+
+
+def test_filtros_diferentes_nao_esperam():
+    memo = MemoFiltros()
+    assert memo.obter("s", "cubo", {"desc_Cidade": ["A"]}, lambda: 1) == 1
+    assert memo.obter("s", "cubo", {"desc_Cidade": ["B"]}, lambda: 2) == 2
+    with pytest.raises(ZeroDivisionError):
+        memo.obter("s", "cubo", {}, lambda: 1 / 0)
+    assert memo.obter("s", "cubo", {}, lambda: 3) == 3
+
+
+class Cubo:
+    def memoria(self) -> int:
+        return 5000
+
+
+def test_tamanho_sem_serializar():
+    df = pd.DataFrame({"a": np.arange(1000), "b": pd.Categorical(["x", "y"] * 500)})
+    assert _tamanho_bytes(df) == df.memory_usage(deep=True).sum()
+    assert _tamanho_bytes(Cubo()) == 5000
+
+    # Figura compactada: o array domina; o layout repetido conta uma vez
+    layout = {"title": {"text": "Vendas"}}
+    figuras = [
+        {"data": [{"x": np.zeros(10_000), "type": "bar"}], "layout": layout}
+        for _ in range(2)
+    ]
+    tamanho = _tamanho_bytes((*figuras, [Cubo(), "R$ 1,00"]))
+    assert 2 * 80_000 + 5000 < tamanho < 2 * 80_000 + 5000 + 4000
+
+
+def test_orcamento_pelo_tamanho_estimado():
+    memo = MemoFiltros(max_bytes=200_000)
+    for cidade in "ABC":
+        memo.obter("s", "pg", {"desc_Cidade": [cidade]}, lambda: np.zeros(10_000))
+    # Cada entrada tem 80 kB: a mais antiga sai para caber no orçamento
+    assert memo.estatisticas()["entradas"] == 2
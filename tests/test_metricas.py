@@ -0,0 +1,41 @@
+"""
+tests/test_metricas.py
+Acesso à rota /metrics: token como Bearer ou só loopback.
+
+Uso: python -m pytest tests/test_metricas.py
+"""
+
+import flask
+import pytest
+
+from utils import metricas
+
+
+def _cliente(token: str = ""):
+    server = flask.Flask(__name__)
+    metricas.publicar(server, token)
+    return server.test_client()
+
+
+@pytest.mark.parametrize(
+    "endereco, status", [("127.0.0.1", 200), ("::1", 200), ("10.0.0.5", 404)]
+)
+def test_sem_token_so_loopback(endereco, status):
+    resposta = _cliente().get("/metrics", environ_base={"REMOTE_ADDR": endereco})
+    assert resposta.status_code == status
+
+
+@pytest.mark.parametrize(
+    "cabecalho, status",
+    [
+        ({"Authorization": "Bearer segredo"}, 200),
+        ({"Authorization": "Bearer x"}, 404),
+        ({}, 404),
+    ],
+)
+def test_com_token(cabecalho, status):
+    # Com token, nem a própria máquina entra sem ele
+    resposta = _cliente("segredo").get(
+        "/metrics", headers=cabecalho, environ_base={"REMOTE_ADDR": "127.0.0.1"}
+    )
+    assert resposta.status_code == status
@@ -0,0 +1,92 @@
+"""
+tests/test_session_store.py
+DiretorioBackend: session_id vindo da URL e permissões do diretório.
+
+Uso: python -m pytest tests/test_session_store.py
+"""
+
+import os
+import stat
+import time
+import uuid
+
+import pandas as pd
+import pytest
+
+from utils.session_store import DiretorioBackend, SessionStore
+
+raiz = pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0,
+    reason="precisa de root para trocar o dono dos arquivos",
+)
+
+
+@pytest.mark.parametrize("session_id", ["../fora", "..", "a/b", "", "x" * 32])
+def test_session_id_invalido_nao_toca_o_disco(tmp_path, session_id):
+    vizinha = tmp_path / "fora"
+    vizinha.mkdir()
+    backend = DiretorioBackend(str(tmp_path / "sessoes"))
+
+    assert not backend.existe(session_id)
+    assert backend.modificado(session_id, "detalhamento") is None
+    backend.remover(session_id)
+    backend.tocar(session_id)
+    with pytest.raises(ValueError):
+        backend.salvar(session_id, "detalhamento", pd.DataFrame({"a": [1]}))
+    assert vizinha.exists()
+
+    store = SessionStore(backend=backend)
+    assert f"{session_id}_detalhamento" not in store
+    assert not store.contem_sessao(session_id)
+
+
+def test_uuid_com_e_sem_hifens(tmp_path):
+    backend = DiretorioBackend(str(tmp_path))
+    for session_id in (str(uuid.uuid4()), uuid.uuid4().hex):
+        backend.salvar(session_id, "parametros", {"dtDe": "01/12/2024"})
+        assert backend.carregar(session_id, "parametros") == {"dtDe": "01/12/2024"}
+
+
+def test_diretorio_fica_so_para_o_dono(tmp_path):
+    pasta = tmp_path / "sessoes"
+    pasta.mkdir(mode=0o777)
+    os.chmod(pasta, 0o777)
+    DiretorioBackend(str(pasta))
+    assert stat.S_IMODE(os.stat(pasta).st_mode) == 0o700
+
+
+@raiz
+def test_recusa_diretorio_de_outro_usuario(tmp_path):
+    pasta = tmp_path / "sessoes"
+    pasta.mkdir()
+    os.chown(pasta, 65534, 65534)
+    with pytest.raises(PermissionError):
+        DiretorioBackend(str(pasta))
+
+
+@raiz
+def test_recusa_pickle_de_outro_usuario(tmp_path):
+    backend = DiretorioBackend(str(tmp_path))
+    session_id = str(uuid.uuid4())
+    backend.salvar(session_id, "parametros", {"token": None})
+    _, arq_pickle = backend._arquivos(session_id, "parametros")
+    os.chown(arq_pickle, 65534, 65534)
+    with pytest.raises(PermissionError):
+        backend.carregar(session_id, "parametros")
+
+
+def test_ler_frames_renova_os_parametros():
+    controle = SessionStore(ttl=0.6)
+    frames = SessionStore(ttl=60)
+    frames.ao_acessar(controle.tocar_sessao)
+    session_id = str(uuid.uuid4())
+    controle[session_id] = {"dtDe": "01/12/2024"}
+    frames[f"{session_id}_detalhamento"] = pd.DataFrame({"a": [1]})
+
+    for _ in range(4):
+        time.sleep(0.3)
+        frames[f"{session_id}_detalhamento"]
+    assert controle.get(session_id) == {"dtDe": "01/12/2024"}
+
+    time.sleep(0.8)
+    assert controle.get(session_id) is None
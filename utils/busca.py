@@ -0,0 +1,119 @@
+"""
+utils/busca.py
+Busca dos dropdowns com muitos valores (produtos), respondida no servidor.
+
+Esses dropdowns vão para o layout sem opções; o callback de ``search_value``
+consulta um ``IndiceBusca`` montado sobre as categorias da coluna e devolve
+só as primeiras ``Settings.BuscaLimite`` correspondências.
+
+O índice é de trigramas sobre o texto normalizado (minúsculo e sem acento):
+cada trigrama aponta para as posições dos valores que o contêm. Uma busca
+com 3 ou mais caracteres intersecta as listas dos seus trigramas e só
+confere o texto dos candidatos; buscas menores percorrem todos os valores.
+As posições são as mesmas dos códigos da categoria, então o resultado pode
+ser cruzado com os valores permitidos pelos outros filtros (ver
+filtros.presentes).
+"""
+
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+from utils import filtros as indice_filtros
+
+
+def normalizar_texto(texto) -> str:
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def trigramas(texto: str) -> set[str]:
+    return {texto[i : i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusca:
+    """Índice de trigramas sobre ``valores`` (na ordem dos códigos da categoria)."""
+
+    def __init__(self, valores):
+        self.valores = [str(v) for v in valores]
+        self.normalizados = [normalizar_texto(v) for v in self.valores]
+        listas = defaultdict(list)
+        for posicao, texto in enumerate(self.normalizados):
+            for trigrama in trigramas(texto):
+                listas[trigrama].append(posicao)
+        self.listas = {t: np.array(p, dtype=np.int32) for t, p in listas.items()}
+
+    def candidatos(self, consulta: str) -> np.ndarray:
+        if len(consulta) < 3:
+            return np.arange(len(self.valores))
+        listas = []
+        for trigrama in trigramas(consulta):
+            lista = self.listas.get(trigrama)
+            if lista is None:
+                return np.empty(0, dtype=np.int32)
+            listas.append(lista)
+        # Menores primeiro: a interseção encolhe mais rápido
+        listas.sort(key=len)
+        resultado = listas[0]
+        for lista in listas[1:]:
+            resultado = np.intersect1d(resultado, lista, assume_unique=True)
+        return resultado
+
+    def buscar(self, texto: str, limite: int = 50, permitidos: np.ndarray | None = None) -> list[str]:
+        """
+        Valores que contêm ``texto``: primeiro os que começam com ele, depois
+        os que têm uma palavra começando com ele, depois os demais, cada grupo
+        em ordem alfabética. ``permitidos`` é uma máscara booleana por posição.
+        """
+        consulta = normalizar_texto(texto).strip()
+        candidatos = self.candidatos(consulta)
+        if permitidos is not None:
+            candidatos = candidatos[permitidos[candidatos]]
+
+        encontrados = []
+        for posicao in candidatos:
+            inicio = self.normalizados[posicao].find(consulta)
+            if inicio < 0:
+                continue
+            if inicio == 0:
+                ordem = 0
+            elif not self.normalizados[posicao][inicio - 1].isalnum():
+                ordem = 1
+            else:
+                ordem = 2
+            encontrados.append((ordem, self.valores[posicao]))
+        encontrados.sort()
+        return [valor for _, valor in encontrados[:limite]]
+
+
+def opcoes(encontrados: list, selecionados) -> list:
+    """Opções do dropdown: "Todos", a seleção atual e as correspondências."""
+    atuais = [v for v in selecionados or [] if v != "Todos"]
+    ja_listados = set(atuais)
+    return ["Todos"] + atuais + [v for v in encontrados if v not in ja_listados]
+
+
+def buscar_sessao(memo, store, session_id: str, coluna: str, filtros: dict, texto: str, selecionados, limite: int):
+    """
+    Opções do dropdown de ``coluna`` para ``texto`` na sessão, restritas aos
+    valores que ainda têm linhas com os outros ``filtros``. O índice e a
+    máscara dos permitidos ficam em ``memo`` (app.memo_filtros); ``None``
+    quando a sessão não tem a tabela de coocorrências.
+    """
+    tabela = store.get(f"{session_id}_coocorrencias")
+    if tabela is None or coluna not in tabela.columns:
+        return None
+    indice = memo.obter(
+        session_id,
+        f"busca:{coluna}",
+        {},
+        lambda: IndiceBusca(tabela[coluna].cat.categories),
+    )
+    permitidos = memo.obter(
+        session_id,
+        f"presentes:{coluna}",
+        {c: v for c, v in filtros.items() if c != coluna},
+        lambda: indice_filtros.presentes(tabela, filtros, coluna),
+    )
+    return opcoes(indice.buscar(texto, limite, permitidos), selecionados)
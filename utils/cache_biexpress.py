@@ -0,0 +1,188 @@
+"""
+utils/cache_biexpress.py
+Cache local do GetBIExpress particionado por (chave, dia de emissão).
+
+Cada dia consultado vira dois arquivos colunares (itensNFe e cargas) em
+DiretorioBackend. Um pedido dtDe..dtA é dividido em dias já guardados e dias
+faltantes; só as faixas contínuas de dias faltantes vão para a API e o
+resultado é montado juntando as partições.
+
+A chave (``CacheDiario.chave``) é um hash do id com o token da consulta: o
+cache não chama a API nos dias guardados, então só quem já consultou com o
+mesmo token lê as partições; outro token cai numa pasta vazia e a API
+valida as credenciais dele como numa consulta sem cache.
+
+Regras de particionamento:
+- itens entram no dia do seu dT_Emissao; itens sem data ficam no primeiro dia
+  da faixa consultada e itens de fora da faixa são descartados (a API filtra
+  pela emissão, e esses dias vêm nas próprias consultas);
+- cada carga entra em todos os dias em que tem itens, e a leitura remove as
+  repetidas pelo guid_Carga; cargas sem itens ficam no primeiro dia da faixa.
+Assim, a mesma faixa montada de partições gravadas por consultas diferentes
+(01-30 e depois 15-30, por exemplo) devolve as mesmas linhas que uma consulta
+direta, e o merge com as cargas encontra motorista e placa de todos os itens.
+
+Um dia ainda recebe notas até acabar: a partição só vale para sempre se foi
+gravada depois do fim do dia; antes disso (hoje, ou um dia passado gravado
+enquanto era hoje) é reaproveitada por ``ttl_hoje`` segundos e depois
+buscada de novo (0 desliga o cache desses dias).
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+from utils.session_store import DiretorioBackend
+
+FORMATO_API = "%d/%m/%Y"
+TABELAS = ("itensNFe", "cargas")
+
+
+def _dia(texto: str) -> date:
+    return datetime.strptime(texto, FORMATO_API).date()
+
+
+def _faixas(dias: list[date]) -> list[tuple[date, date]]:
+    """Agrupa dias ordenados em faixas contínuas (inicio, fim)."""
+    faixas = []
+    for dia in dias:
+        if faixas and dia - faixas[-1][1] == timedelta(days=1):
+            faixas[-1] = (faixas[-1][0], dia)
+        else:
+            faixas.append((dia, dia))
+    return faixas
+
+
+class CacheDiario:
+    """
+    Cache de respostas do BIExpress por dia de emissão.
+
+    diretorio: pasta dos arquivos (um subdiretório por id).
+    ttl_hoje: segundos em que uma partição gravada antes do fim do seu dia
+        (hoje ou futura, quando foi gravada) continua válida.
+    """
+
+    def __init__(self, diretorio: str | None = None, ttl_hoje: float = 300):
+        self.backend = DiretorioBackend(
+            diretorio or os.path.join(tempfile.gettempdir(), "serverbi_cache_biexpress")
+        )
+        self.ttl_hoje = ttl_hoje
+
+    @staticmethod
+    def chave(id, token: str | None) -> str:
+        """Pasta das partições de ``id`` consultadas com ``token`` (hex de 32)."""
+        return hashlib.sha256(f"{id}:{token or ''}".encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _nome(dia: date, tabela: str) -> str:
+        return f"{dia.isoformat()}_{tabela}"
+
+    def valido(self, id, dia: date) -> bool:
+        gravacoes = [self.backend.modificado(str(id), self._nome(dia, t)) for t in TABELAS]
+        if None in gravacoes:
+            return False
+        # Gravada depois do fim do dia: o dia estava fechado e não muda mais
+        fim_do_dia = datetime.combine(dia + timedelta(days=1), datetime.min.time())
+        if min(gravacoes) >= fim_do_dia.timestamp():
+            return True
+        return time.time() - min(gravacoes) < self.ttl_hoje
+
+    def ler(self, id, dia: date) -> tuple[pd.DataFrame, pd.DataFrame]:
+        return tuple(self.backend.carregar(str(id), self._nome(dia, t)) for t in TABELAS)
+
+    def gravar(self, id, inicio: date, fim: date, itens: pd.DataFrame, cargas: pd.DataFrame):
+        """Divide o retorno da faixa inicio..fim em partições diárias e grava."""
+        limite_ini, limite_fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+        if variables_data.DT_Emissao in itens.columns and len(itens):
+            dia_item = (
+                pd.to_datetime(itens[variables_data.DT_Emissao], errors="coerce")
+                .dt.normalize()
+                .fillna(limite_ini)
+            )
+            fora = ~dia_item.between(limite_ini, limite_fim)
+            if fora.any():
+                print(
+                    f"Cache BIExpress {id}: {int(fora.sum())} itens fora de "
+                    f"{inicio}..{fim} ignorados"
+                )
+        else:
+            dia_item = pd.Series(limite_ini, index=itens.index)
+
+        # Dias de cada carga: todos em que ela tem itens, ou o primeiro da faixa
+        guid = variables_data.Guid_Carga
+        if guid in cargas.columns and guid in itens.columns and len(cargas):
+            dias_carga = (
+                pd.DataFrame({"guid": itens[guid].values, "dia": dia_item.dt.date.values})
+                .drop_duplicates()
+                .groupby("guid")["dia"]
+                .agg(set)
+            )
+            dias_carga = [
+                dias if isinstance(dias, set) else {inicio}
+                for dias in cargas[guid].map(dias_carga)
+            ]
+        else:
+            dias_carga = [{inicio}] * len(cargas)
+
+        dia = inicio
+        while dia <= fim:
+            marca = pd.Timestamp(dia)
+            # Dias sem movimento também são gravados (partição vazia)
+            self.backend.salvar(
+                str(id), self._nome(dia, "itensNFe"),
+                itens[dia_item.values == marca].reset_index(drop=True),
+            )
+            self.backend.salvar(
+                str(id), self._nome(dia, "cargas"),
+                cargas[[dia in dias for dias in dias_carga]].reset_index(drop=True),
+            )
+            dia += timedelta(days=1)
+
+    def buscar(self, id, dtDe: str, dtA: str, buscar_api):
+        """
+        Devolve ``(itens, cargas, relatorio)`` para dtDe..dtA (formato dd/mm/aaaa).
+
+        id: pasta das partições; para a API, ``chave(id, token)``.
+        buscar_api(dtDe, dtA) deve retornar ``(itens, cargas)`` da API para a
+        faixa pedida ou levantar exceção em caso de falha.
+        """
+        inicio, fim = _dia(dtDe), _dia(dtA)
+        dias = [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)]
+        faltando = [d for d in dias if not self.valido(id, d)]
+        faixas = _faixas(faltando)
+
+        for faixa_ini, faixa_fim in faixas:
+            itens, cargas = buscar_api(
+                faixa_ini.strftime(FORMATO_API), faixa_fim.strftime(FORMATO_API)
+            )
+            self.gravar(id, faixa_ini, faixa_fim, itens, cargas)
+
+        partes = [self.ler(id, d) for d in dias]
+        # Partições vazias só entram se todas forem vazias (mantêm as colunas)
+        df_itens = pd.concat(
+            [p[0] for p in partes if len(p[0])] or [partes[0][0]], ignore_index=True
+        )
+        df_cargas = pd.concat(
+            [p[1] for p in partes if len(p[1])] or [partes[0][1]], ignore_index=True
+        )
+        if variables_data.Guid_Carga in df_cargas.columns:
+            df_cargas = df_cargas.drop_duplicates(
+                subset=variables_data.Guid_Carga, keep="first"
+            ).reset_index(drop=True)
+
+        relatorio = {
+            "dias": len(dias),
+            "dias_cache": len(dias) - len(faltando),
+            "dias_api": len(faltando),
+            "chamadas_api": len(faixas),
+        }
+        print(
+            f"Cache BIExpress {id}: {relatorio['dias_cache']}/{relatorio['dias']} dias "
+            f"do cache, {relatorio['dias_api']} da API em {relatorio['chamadas_api']} chamada(s)"
+        )
+        return df_itens, df_cargas, relatorio
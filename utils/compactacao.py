@@ -0,0 +1,78 @@
+"""
+utils/compactacao.py
+Reduz o tamanho em memória dos DataFrames da sessão depois da carga.
+
+- Texto com poucos valores distintos (motorista, cidade, placa, guid da
+  carga...) vira ``category``: cada linha guarda só um código inteiro.
+- Inteiros que cabem em int32 são reduzidos para int32. Somas e agregações
+  continuam em int64 (o pandas promove), então não há risco de estouro.
+- Floats ficam em float64: float32 só seria sem perda para poucos valores e
+  as somas passariam a acumular em precisão simples.
+
+Com colunas ``category`` os ``groupby`` das páginas devem usar
+``observed=True``; sem isso o pandas devolve também as categorias que não
+aparecem no recorte filtrado.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_integer_dtype, is_object_dtype, is_string_dtype
+
+# Proporção máxima de valores distintos para converter texto em category
+LIMITE_CARDINALIDADE = 0.5
+
+_INT32 = np.iinfo(np.int32)
+
+
+def compactar_frame(
+    df: pd.DataFrame, limite: float = LIMITE_CARDINALIDADE
+) -> pd.DataFrame:
+    """Devolve ``df`` com as colunas convertidas (altera o frame recebido)."""
+    linhas = len(df)
+    if not linhas:
+        return df
+    for coluna in df.columns:
+        serie = df[coluna]
+        if is_object_dtype(serie) or (
+            is_string_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype)
+        ):
+            if serie.nunique(dropna=True) <= limite * linhas:
+                df[coluna] = serie.astype("category")
+        elif is_integer_dtype(serie) and serie.dtype.itemsize > 4:
+            if serie.min() >= _INT32.min and serie.max() <= _INT32.max:
+                df[coluna] = serie.astype(np.int32)
+    return df
+
+
+def compactar(frames: dict[str, pd.DataFrame]) -> dict:
+    """
+    Compacta os frames de uma sessão e devolve o relatório de bytes.
+
+    frames: ``{"detalhamento": df, ...}``; os frames são alterados no lugar.
+    """
+    relatorio = {}
+    for nome, df in frames.items():
+        antes = int(df.memory_usage(deep=True).sum())
+        compactar_frame(df)
+        depois = int(df.memory_usage(deep=True).sum())
+        relatorio[nome] = {"bytes_antes": antes, "bytes_depois": depois}
+    relatorio["total"] = {
+        "bytes_antes": sum(r["bytes_antes"] for r in relatorio.values()),
+        "bytes_depois": sum(r["bytes_depois"] for r in relatorio.values()),
+    }
+    return relatorio
+
+
+def imprimir_relatorio(relatorio: dict, session_id: str = ""):
+    print(f"Compactação da sessão {session_id}:")
+    for nome, r in relatorio.items():
+        antes, depois = r["bytes_antes"], r["bytes_depois"]
+        if not antes:
+            # Estruturas criadas na carga (ex.: cubo), sem tamanho anterior
+            print(f"  {nome}: {depois / 1024 / 1024:.1f} MB")
+            continue
+        fator = antes / depois if depois else 0
+        print(
+            f"  {nome}: {antes / 1024 / 1024:.1f} MB -> "
+            f"{depois / 1024 / 1024:.1f} MB ({fator:.1f}x)"
+        )
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -91,6 +92,31 @@ def MetricMoedaInteiroValores(Valor):
         return f"{Valor}"
 
 
+# Formatação de colunas inteiras (Series ou ndarray) no padrão pt-BR.
+# Cada valor é formatado com o separador americano e a troca de "," e "." é
+# feita uma vez só sobre o texto de todos os valores juntos, em vez de três
+# replace por linha. Nulos (NaN/None) e valores não numéricos viram ``nulo``.
+_SEPARADORES = str.maketrans({",": ".", ".": ","})
+
+
+def formatarSerie(valores, casas: int = 2, nulo: str = "-"):
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    numeros = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    validos = ~np.isnan(numeros)
+    formato = f",.{casas}f"
+    textos = [format(valor, formato) for valor in numeros[validos].tolist()]
+    resultado = np.full(len(numeros), nulo, dtype=object)
+    if textos:
+        resultado[validos] = "\n".join(textos).translate(_SEPARADORES).split("\n")
+    if isinstance(valores, pd.Series):
+        return pd.Series(resultado, index=valores.index, name=valores.name)
+    return resultado
+
+
+def MetricInteiroValoresSerie(valores, nulo: str = "-"):
+    return formatarSerie(valores, 0, nulo=nulo)
+
+
 def ContagemDist(df: pd.DataFrame, colunas) -> int:
     return df[colunas].unique().size
 
@@ -126,16 +152,27 @@ def Formatar_hora(minutos: int) -> str:
         return f"{horas:02}:{minutos_restantes:02}:{segundos:02}"
 
 
-def format_hover(
-    fig, df, col_label, col_value_label, col_value, locale_col="valor_formatado"
-):
-    df[locale_col] = df[col_value].apply(lambda x: f"{x:,.0f}".replace(",", "."))
+def format_hover(fig, col_label, col_value_label):
+    # Valor formatado no navegador (d3-format com os separadores do layout)
     fig.update_traces(
-        customdata=df[[locale_col]],
-        hovertemplate=f"<b>{col_label}:</b> %{{label}}<br><b>{col_value_label}:</b> %{{customdata[0]}}<extra></extra>",
+        hovertemplate=f"<b>{col_label}:</b> %{{label}}<br><b>{col_value_label}:</b> %{{value:,.0f}}<extra></extra>",
     )
 
 
+MESES = (
+    "janeiro", "fevereiro", "março", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+)
+
+
+def diaMes(datas: pd.Series) -> pd.Series:
+    """
+    "05 dezembro", como ``strftime("%d %B")`` em pt_BR, sem depender do
+    locale do processo (setlocale é global e não é seguro entre threads).
+    """
+    return datas.dt.strftime("%d ") + datas.dt.month.map(lambda mes: MESES[mes - 1])
+
+
 def abreviar(texto, limite: int = 15):
     if len(texto) > limite:
         return texto[: limite - 3] + "..."
@@ -1,19 +1,176 @@
-import requests
 import json
+import requests
+import threading
+import time
+from collections import deque
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+from utils import json_colunar
+from assets.static import Settings
 
 # Definir a URL base e o ID
-BIExpress = "http://159.112.183.102:9021/api/v3.0.0/GetBIExpress/"
+BIExpress = Settings.BIExpressURL
+
+
+class ClienteBIExpress:
+    """
+    Cliente HTTP reaproveitável para a API do BIExpress.
+
+    Usa um requests.Session com pool de conexões keep-alive, negocia
+    compressão (gzip/deflate e br quando o brotli estiver instalado), aplica
+    timeout de conexão e de leitura e repete com backoff em erros 5xx.
+    Cada chamada registra latência e tamanho da resposta em ``metricas``.
+    """
+
+    def __init__(
+        self,
+        url_base: str = BIExpress,
+        timeout: tuple[float, float] = (Settings.ApiConnectTimeout, Settings.ApiReadTimeout),
+        tentativas: int = Settings.ApiRetries,
+        pool: int = 10,
+        historico: int = 200,
+    ):
+        self.url_base = url_base
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=tentativas,
+            connect=tentativas,
+            read=0,
+            status=tentativas,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(make_headers(keep_alive=True, accept_encoding=True))
+        self.session.verify = False
+        self._lock = threading.Lock()
+        self.chamadas = deque(maxlen=historico)
+        self.total_chamadas = 0
+        self.total_erros = 0
+
+    def _get(self, id, params: dict, stream: bool = False) -> requests.Response:
+        return self.session.get(
+            f"{self.url_base}{id}", params=params, timeout=self.timeout, stream=stream
+        )
+
+    def _registrar(self, inicio: float, response, bytes_corpo: int, erro: str = None):
+        bytes_rede = None
+        if response is not None:
+            try:
+                # bytes efetivamente lidos da rede (antes da descompressão)
+                bytes_rede = response.raw.tell()
+            except Exception:
+                pass
+        registro = {
+            "inicio": datetime.now().isoformat(timespec="seconds"),
+            "segundos": time.perf_counter() - inicio,
+            "status": response.status_code if response is not None else None,
+            "bytes": bytes_corpo,
+            "bytes_rede": bytes_rede,
+            "encoding": response.headers.get("Content-Encoding") if response is not None else None,
+            "erro": erro,
+        }
+        with self._lock:
+            self.chamadas.append(registro)
+            self.total_chamadas += 1
+            if erro or (response is not None and response.status_code != 200):
+                self.total_erros += 1
+        print(
+            f"BIExpress: {registro['status']} em {registro['segundos']:.2f}s, "
+            f"{bytes_corpo / 1024:.0f} KB ({registro['encoding'] or 'sem compressão'})"
+        )
+        return registro
+
+    def GetBIExpressConteudo(self, id: int, token: str, guid: str, dtDe: str, dtA: str):
+        """Corpo da resposta (bytes, já descomprimido) ou ``None`` em erro."""
+        params = {"token": token, "guid": guid, "datDe": dtDe, "datA": dtA}
+        inicio = time.perf_counter()
+        try:
+            response = self._get(id, params)
+        except requests.RequestException as e:
+            self._registrar(inicio, None, 0, erro=str(e))
+            print(f"Erro: {e}")
+            return None
+        self._registrar(inicio, response, len(response.content))
+
+        if response.status_code == 200:
+            return response.content
+        else:
+            print(f"Erro: {response.status_code} - {response.text}")
+
+    def GetBIExpress(self, id: int, token: str, guid: str, dtDe: str, dtA: str):
+        conteudo = self.GetBIExpressConteudo(id=id, token=token, guid=guid, dtDe=dtDe, dtA=dtA)
+        if conteudo is not None:
+            return json.loads(conteudo.decode("utf-8", errors="replace"))
+
+    def GetBIExpressColunar(
+        self, id: int, token: str, guid: str, dtDe: str, dtA: str, medir_memoria: bool = False
+    ):
+        """
+        Mesma consulta de GetBIExpress, mas lendo o corpo em streaming direto para
+        DataFrames de itensNFe e cargas (sem montar a lista de dicts).
+
+        Retorna ``({"itensNFe": df, "cargas": df}, relatorio)`` ou ``None`` em erro.
+        """
+        params = {"token": token, "guid": guid, "datDe": dtDe, "datA": dtA}
+        inicio = time.perf_counter()
+        response = None
+        try:
+            with self._get(id, params, stream=True) as response:
+                if response.status_code != 200:
+                    self._registrar(inicio, response, len(response.content))
+                    print(f"Erro: {response.status_code} - {response.text}")
+                    return None
+                frames, relatorio = json_colunar.ler_arrays_colunar(
+                    response.iter_content(chunk_size=256 * 1024),
+                    arrays=("itensNFe", "cargas"),
+                    medir_memoria=medir_memoria,
+                )
+                relatorio["http"] = self._registrar(inicio, response, relatorio["bytes"])
+        except requests.RequestException as e:
+            self._registrar(inicio, response, 0, erro=str(e))
+            print(f"Erro: {e}")
+            return None
+        json_colunar.imprimir_relatorio(relatorio)
+        return frames, relatorio
+
+    def metricas(self) -> dict:
+        with self._lock:
+            chamadas = list(self.chamadas)
+            total, erros = self.total_chamadas, self.total_erros
+        latencias = sorted(c["segundos"] for c in chamadas)
+        return {
+            "chamadas": total,
+            "erros": erros,
+            "latencia_media_s": sum(latencias) / len(latencias) if latencias else None,
+            "latencia_max_s": latencias[-1] if latencias else None,
+            "bytes_medio": (
+                sum(c["bytes"] for c in chamadas) / len(chamadas) if chamadas else None
+            ),
+            "ultimas": chamadas[-10:],
+        }
+
+
+cliente = ClienteBIExpress()
+
 
 def GetBIExpress(id: int, token: str, guid: str, dtDe: str, dtA: str):
-    params = {"token": token, "guid": guid, "datDe": dtDe, "datA": dtA}
-    print(f"enviando requisição as {datetime.now().time()}")
-    response = requests.get(f"{BIExpress}{id}", params=params, verify=False)
-    print(f"recebemos requisição as {datetime.now().time()}")
-
-    if response.status_code == 200:
-        response.encoding = 'utf-8'
-        print(response)
-        return json.loads(json.dumps(response.json(), ensure_ascii=False))
-    else:
-        print(f"Erro: {response.status_code} - {response.text}")
+    return cliente.GetBIExpress(id=id, token=token, guid=guid, dtDe=dtDe, dtA=dtA)
+
+
+def GetBIExpressConteudo(id: int, token: str, guid: str, dtDe: str, dtA: str):
+    return cliente.GetBIExpressConteudo(id=id, token=token, guid=guid, dtDe=dtDe, dtA=dtA)
+
+
+def GetBIExpressColunar(
+    id: int, token: str, guid: str, dtDe: str, dtA: str, medir_memoria: bool = False
+):
+    return cliente.GetBIExpressColunar(
+        id=id, token=token, guid=guid, dtDe=dtDe, dtA=dtA, medir_memoria=medir_memoria
+    )
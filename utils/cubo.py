@@ -0,0 +1,289 @@
+"""
+utils/cubo.py
+Cubo de agregados por sessão, montado uma vez na carga.
+
+Dois níveis:
+- células: uma linha por combinação das dimensões dos gráficos (motorista,
+  placa, cidade, grupo, data, tipo de operação e motivo de devolução) com as
+  medidas aditivas somadas. Atende consultas com filtros nessas dimensões;
+- agregados por dimensão: as mesmas medidas já somadas por cada dimensão
+  isolada, mais os totais. A visão sem filtro (a primeira que a página
+  mostra) sai direto daqui, com poucas dezenas de linhas.
+
+Rota, bairro, supervisor e vendedor não são dimensões: com eles quase cada
+cliente vira uma célula e o cubo deixa de ser menor que o detalhamento.
+Filtros nessas colunas ou em produto fazem ``consultar`` montar um cubo
+temporário a partir das linhas já filtradas; o resultado é o mesmo, só não é
+pré-calculado.
+
+Contagens distintas (entregas = pares carga x cliente, notas fiscais e
+cargas) não são aditivas entre células. O cubo guarda os pares distintos
+(célula, id) em int32 e a contagem continua exata. Não usamos sketches
+aproximados porque esses números aparecem nos cabeçalhos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+
+DIMENSOES = (
+    variables_data.Desc_Motorista,
+    variables_data.Desc_Placa,
+    variables_data.Desc_Cidade,
+    variables_data.Desc_Grupo,
+    variables_data.DT_Emissao,
+    variables_data.TP_TipoOperacao,
+    variables_data.Desc_Motivo_Devolucao,
+)
+
+MEDIDAS = (
+    variables_data.Valor_Venda,
+    variables_data.Valor_Cubagem,
+    variables_data.Valor_Cubagem_Devolvida,
+    variables_data.Valor_Peso,
+)
+
+# Quantidade de itens (linhas com guid_Carga) em cada célula
+ITENS = "itens"
+
+DISTINTOS = {
+    "entregas": (variables_data.Guid_Carga, variables_data.Cod_Cliente),
+    "notas": (variables_data.Num_NFE,),
+    "cargas": (variables_data.Guid_Carga,),
+}
+
+# Contagens distintas pré-calculadas por dimensão (as usadas nos gráficos)
+DISTINTOS_POR_DIMENSAO = {
+    "entregas": (
+        variables_data.Desc_Motorista,
+        variables_data.Desc_Placa,
+        variables_data.Desc_Cidade,
+    ),
+}
+
+
+class CuboAgregado:
+    """
+    Células agregadas do detalhamento, pares distintos e agregados por dimensão.
+
+    ``filtrar`` devolve outro cubo com uma máscara sobre as mesmas células
+    (não copia dados). Sem máscara, as consultas usam os agregados por
+    dimensão quando existem.
+    """
+
+    def __init__(
+        self,
+        celulas: pd.DataFrame,
+        distintos: dict[str, pd.DataFrame],
+        agregados: dict[str, pd.DataFrame] | None = None,
+        mascara: np.ndarray | None = None,
+    ):
+        self.celulas = celulas
+        self.distintos = distintos
+        self.agregados = agregados or {}
+        self.mascara = mascara
+        self.dimensoes = [d for d in DIMENSOES if d in celulas.columns]
+
+    @classmethod
+    def construir(
+        cls, df_detalhamento: pd.DataFrame, agregados: bool = True
+    ) -> "CuboAgregado":
+        dimensoes = [d for d in DIMENSOES if d in df_detalhamento.columns]
+        medidas = [m for m in MEDIDAS if m in df_detalhamento.columns]
+        if not dimensoes or df_detalhamento.empty:
+            celula = np.zeros(len(df_detalhamento), dtype=np.int32)
+        else:
+            celula = (
+                df_detalhamento.groupby(dimensoes, observed=True, dropna=False, sort=False)
+                .ngroup()
+                .to_numpy(np.int32)
+            )
+        grupos = df_detalhamento.groupby(celula)
+        celulas = grupos[dimensoes].first()
+        for medida in medidas:
+            celulas[medida] = grupos[medida].sum()
+        celulas[ITENS] = grupos[variables_data.Guid_Carga].count().astype(np.int32)
+        celulas = celulas.reset_index(drop=True)
+
+        distintos = {}
+        for nome, chaves in DISTINTOS.items():
+            if not all(c in df_detalhamento.columns for c in chaves):
+                continue
+            ids = (
+                df_detalhamento.groupby(list(chaves), observed=True, sort=False)
+                .ngroup()
+                .to_numpy(np.int32)
+            )
+            pares = pd.DataFrame({"celula": celula, "id": ids})
+            # ngroup marca chaves nulas com -1
+            distintos[nome] = (
+                pares[pares["id"] >= 0].drop_duplicates().reset_index(drop=True)
+            )
+
+        cubo = cls(celulas, distintos)
+        if agregados:
+            cubo.agregados = cubo._calcular_agregados()
+        return cubo
+
+    def _calcular_agregados(self) -> dict[str, pd.DataFrame]:
+        medidas = [m for m in MEDIDAS if m in self.celulas.columns] + [ITENS]
+        agregados = {}
+        for dimensao in self.dimensoes:
+            agregados[f"soma_{dimensao}"] = (
+                self.celulas.groupby(dimensao, observed=True)[medidas].sum().reset_index()
+            )
+        for nome, dimensoes in DISTINTOS_POR_DIMENSAO.items():
+            for dimensao in dimensoes:
+                if nome in self.distintos and dimensao in self.dimensoes:
+                    agregados[f"{nome}_{dimensao}"] = self._contar_por(nome, dimensao)
+        totais = {m: [self.celulas[m].sum()] for m in medidas}
+        for nome, pares in self.distintos.items():
+            totais[nome] = [int(pares["id"].nunique())]
+        agregados["totais"] = pd.DataFrame(totais)
+        return agregados
+
+    # -- gravação no SessionStore ----------------------------------------
+
+    def para_sessao(self, session_id: str) -> dict[str, pd.DataFrame]:
+        frames = {f"{session_id}_cubo": self.celulas}
+        for nome, pares in self.distintos.items():
+            frames[f"{session_id}_cubo_pares_{nome}"] = pares
+        for nome, agregado in self.agregados.items():
+            frames[f"{session_id}_cubo_agregado_{nome}"] = agregado
+        return frames
+
+    @classmethod
+    def da_sessao(cls, store, session_id: str) -> "CuboAgregado | None":
+        celulas = store.get(f"{session_id}_cubo")
+        if celulas is None:
+            return None
+        distintos = {}
+        for nome in DISTINTOS:
+            pares = store.get(f"{session_id}_cubo_pares_{nome}")
+            if pares is not None:
+                distintos[nome] = pares
+        cubo = cls(celulas, distintos)
+        nomes = [f"soma_{d}" for d in cubo.dimensoes] + ["totais"]
+        for nome, dimensoes in DISTINTOS_POR_DIMENSAO.items():
+            nomes += [f"{nome}_{d}" for d in dimensoes]
+        for nome in nomes:
+            agregado = store.get(f"{session_id}_cubo_agregado_{nome}")
+            if agregado is not None:
+                cubo.agregados[nome] = agregado
+        return cubo
+
+    # -- consultas --------------------------------------------------------
+
+    def filtrar(self, filtros: dict) -> "CuboAgregado":
+        """Aplica ``{coluna: valores}``; todas as colunas precisam ser dimensões."""
+        if not filtros:
+            return self
+        mascara = (
+            np.ones(len(self.celulas), dtype=bool)
+            if self.mascara is None
+            else self.mascara.copy()
+        )
+        for coluna, valores in filtros.items():
+            mascara &= self.celulas[coluna].isin(valores).to_numpy()
+        return CuboAgregado(self.celulas, self.distintos, self.agregados, mascara)
+
+    def _celulas(self) -> pd.DataFrame:
+        if self.mascara is None:
+            return self.celulas
+        return self.celulas[self.mascara]
+
+    def _agregado(self, nome: str) -> pd.DataFrame | None:
+        if self.mascara is not None:
+            return None
+        return self.agregados.get(nome)
+
+    def total(self, medida: str):
+        totais = self._agregado("totais")
+        if totais is not None and medida in totais.columns:
+            return totais[medida].iloc[0]
+        if medida in self.distintos:
+            return self.contar_distintos(medida)
+        return self._celulas()[medida].sum()
+
+    def somar(self, por, medidas, rotulos: dict | None = None) -> pd.DataFrame:
+        """
+        Equivalente a ``df.groupby(por)[medidas].sum().reset_index()`` no
+        detalhamento filtrado.
+
+        rotulos: ``{coluna: funcao}`` aplicada aos valores da dimensão antes
+            de agrupar (ex.: ``conversores.abreviar``).
+        """
+        por = [por] if isinstance(por, str) else list(por)
+        medidas = [medidas] if isinstance(medidas, str) else list(medidas)
+        base = self._agregado(f"soma_{por[0]}") if len(por) == 1 else None
+        if base is None:
+            base = self._celulas()
+        base = base[por + medidas]
+        if rotulos:
+            base = base.copy()
+            for coluna, funcao in rotulos.items():
+                base[coluna] = base[coluna].map(funcao)
+        return base.groupby(por, observed=True)[medidas].sum().reset_index()
+
+    def contar_distintos(
+        self, nome: str, por=None, coluna: str | None = None, rotulos: dict | None = None
+    ):
+        """
+        Quantidade de ``nome`` distintos (ver DISTINTOS); com ``por``, devolve
+        um DataFrame ``[por, coluna]`` com a contagem em cada valor da dimensão.
+
+        Um id que aparece em mais de um valor de ``por`` conta em cada um
+        (ex.: entregas por grupo). Para dimensões da carga ou do cliente
+        (motorista, placa, cidade) o resultado é o mesmo de
+        ``drop_duplicates`` + ``groupby``; nesse caso ``rotulos`` (como em
+        ``somar``) junta as contagens dos valores com o mesmo rótulo.
+        """
+        if por is None:
+            totais = self._agregado("totais")
+            if totais is not None and nome in totais.columns:
+                return int(totais[nome].iloc[0])
+            return int(self._pares(nome)["id"].nunique())
+        contagem = self._agregado(f"{nome}_{por}")
+        if contagem is None:
+            contagem = self._contar_por(nome, por)
+        if rotulos and por in rotulos:
+            contagem = contagem.assign(**{por: contagem[por].map(rotulos[por])})
+            contagem = contagem.groupby(por, observed=True)[nome].sum().reset_index()
+        return contagem.rename(columns={nome: coluna or nome})
+
+    def _pares(self, nome: str) -> pd.DataFrame:
+        pares = self.distintos[nome]
+        if self.mascara is not None:
+            pares = pares[self.mascara[pares["celula"].to_numpy()]]
+        return pares
+
+    def _contar_por(self, nome: str, por: str) -> pd.DataFrame:
+        pares = self._pares(nome)
+        valores = self.celulas[por].to_numpy()[pares["celula"].to_numpy()]
+        if isinstance(self.celulas[por].dtype, pd.CategoricalDtype):
+            valores = pd.Categorical(valores, dtype=self.celulas[por].dtype)
+        contagem = (
+            pd.DataFrame({por: valores, "id": pares["id"].to_numpy()})
+            .groupby(por, observed=True)["id"]
+            .nunique()
+        )
+        return contagem.reset_index(name=nome)
+
+    def memoria(self) -> int:
+        frames = [self.celulas, *self.distintos.values(), *self.agregados.values()]
+        return sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+
+
+def consultar(store, session_id: str, filtros: dict, df_filtrado: pd.DataFrame):
+    """
+    Cubo da sessão com os filtros aplicados.
+
+    filtros: ``{coluna: valores}`` já sem "Todos" (ver filtros.filtros_ativos).
+    df_filtrado: detalhamento com os mesmos filtros, usado quando algum filtro
+        não é dimensão do cubo ou a sessão foi carregada sem cubo.
+    """
+    cubo = CuboAgregado.da_sessao(store, session_id)
+    if cubo is None or any(c not in cubo.dimensoes for c in filtros):
+        return CuboAgregado.construir(df_filtrado, agregados=False)
+    return cubo.filtrar(filtros)
@@ -0,0 +1,52 @@
+"""
+utils/detalhes.py
+Tabelas dos modais "Ver detalhes", paginadas e ordenadas no servidor.
+
+O layout leva só o modal vazio (packCode.detailModal); quando ele abre, o
+callback da página pega o gráfico e a tabela já calculados para o estado de
+filtro (app.memo_filtros) e devolve só a página pedida pelo DataTable
+(``page_current``, ``page_size`` e ``sort_by``, com page_action e
+sort_action "custom"). Colunas numéricas seguem como números e o DataTable
+as formata no navegador.
+"""
+
+import math
+
+import pandas as pd
+from dash.dash_table.Format import Format, Group, Scheme
+
+
+def _coluna(df: pd.DataFrame, coluna) -> dict:
+    definicao = {"name": str(coluna), "id": str(coluna)}
+    serie = df[coluna]
+    # Números vão crus e o DataTable formata (locale_format do modal é pt-BR)
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        casas = 0 if pd.api.types.is_integer_dtype(serie) else 2
+        definicao["type"] = "numeric"
+        definicao["format"] = Format(precision=casas, scheme=Scheme.fixed, group=Group.yes)
+    return definicao
+
+
+def colunas(df: pd.DataFrame) -> list[dict]:
+    return [_coluna(df, coluna) for coluna in df.columns]
+
+
+def ordenar(df: pd.DataFrame, sort_by) -> pd.DataFrame:
+    """Aplica o ``sort_by`` do DataTable (lista de {column_id, direction})."""
+    criterios = [c for c in sort_by or [] if c.get("column_id") in df.columns]
+    if not criterios:
+        return df
+    return df.sort_values(
+        [c["column_id"] for c in criterios],
+        ascending=[c.get("direction") != "desc" for c in criterios],
+        kind="stable",
+    )
+
+
+def pagina(df: pd.DataFrame, page_current, page_size, sort_by) -> tuple[list[dict], int]:
+    """Registros da página pedida e a quantidade de páginas."""
+    tamanho = max(int(page_size or 1), 1)
+    total = max(math.ceil(len(df) / tamanho), 1)
+    atual = min(max(int(page_current or 0), 0), total - 1)
+    df = ordenar(df.rename(columns=str), sort_by)
+    return df.iloc[atual * tamanho : (atual + 1) * tamanho].to_dict("records"), total
@@ -0,0 +1,211 @@
+"""
+utils/figuras.py
+Serialização compacta das figuras que os callbacks mandam ao navegador.
+
+``compactar`` converte a figura no dicionário que vai para o dcc.Graph:
+- arrays numéricos dos traces viram buffers base64 tipados
+  (``{"dtype": "f8", "bdata": ...}``, lidos pelo plotly.js >= 2.28), em vez
+  de listas de números em texto, quando isso sai menor; inteiros usam o
+  menor tipo que os comporta e floats usam float32 quando não perdem casas;
+- floats são arredondados a ``Settings.FiguraCasas`` casas antes (o hover
+  mostra duas).
+
+``registrar_templates`` registra uma vez em ``plotly.io.templates`` o
+template do projeto ("serverbi": o "plotly" sem as seções de tipos de
+gráfico e subplots que o sistema não usa) e o deixa como padrão, então cada
+figura carrega só essa parte. O plotly.js não guarda templates por nome: o
+template resolvido vai dentro de cada figura, por isso ele precisa ser
+enxuto.
+
+Com ``Settings.FiguraMedir`` ligado, cada ``compactar`` imprime os bytes da
+figura em JSON antes e depois.
+
+Os cards com filtro começam com ``vazia()`` (sem traces, já com o template)
+e o callback de cada um responde com ``atualizacao(figura)``: um
+``dash.Patch`` que troca os traces e as chaves do layout, menos o template,
+que já está no navegador. Chaves de ``LAYOUT_VARIAVEIS`` que a figura nova
+não tem vão como ``None`` para não sobrar, por exemplo, a linha de média de
+um estado de filtro anterior.
+"""
+
+import base64
+import json
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import Patch
+from plotly.utils import PlotlyJSONEncoder
+
+from assets.static import Settings
+
+TEMPLATE = "serverbi"
+
+# Tipos de trace usados pelas páginas (px.line e px.area geram scatter)
+TIPOS_TRACE = (
+    "bar",
+    "pie",
+    "scatter",
+    "scattermapbox",
+    "densitymapbox",
+    "treemap",
+    "indicator",
+)
+# Subplots do template "plotly" que nenhuma página usa
+SUBPLOTS_SEM_USO = ("polar", "ternary", "scene", "geo")
+
+# Chaves do layout que mudam entre estados de filtro (ex.: barra com linha
+# de média x pizza); as ausentes na figura nova são limpas no Patch
+LAYOUT_VARIAVEIS = (
+    "annotations",
+    "shapes",
+    "title",
+    "xaxis",
+    "yaxis",
+    "legend",
+    "showlegend",
+    "barmode",
+    "bargap",
+    "coloraxis",
+    "height",
+    "hovermode",
+    "uniformtext",
+)
+
+# Menor tipo inteiro (nome do plotly.js, dtype) que comporta os valores
+_INTEIROS = (
+    ("u1", np.uint8),
+    ("i1", np.int8),
+    ("u2", np.uint16),
+    ("i2", np.int16),
+    ("u4", np.uint32),
+    ("i4", np.int32),
+)
+
+
+def registrar_templates():
+    base = pio.templates["plotly"].to_plotly_json()
+    dados = {tipo: v for tipo, v in base["data"].items() if tipo in TIPOS_TRACE}
+    layout = {k: v for k, v in base["layout"].items() if k not in SUBPLOTS_SEM_USO}
+    pio.templates[TEMPLATE] = go.layout.Template(data=dados, layout=layout)
+    pio.templates.default = TEMPLATE
+
+
+def _tipo_inteiro(valores: np.ndarray):
+    minimo, maximo = valores.min(), valores.max()
+    for nome, tipo in _INTEIROS:
+        limites = np.iinfo(tipo)
+        if limites.min <= minimo and maximo <= limites.max:
+            return nome, tipo
+    return None
+
+
+def buffer(valores, casas: int | None = None):
+    """
+    ``{"dtype", "bdata"[, "shape"]}`` do array numérico, ou ``None`` quando
+    não dá (texto, datas, booleanos, inteiros fora de 32 bits) ou quando a
+    lista em texto sai menor (poucos dígitos por valor: base64 de float64
+    gasta ~10,7 caracteres por valor).
+    """
+    if not isinstance(valores, np.ndarray) or valores.ndim not in (1, 2):
+        return None
+    if valores.dtype.kind not in "iuf" or valores.size < 2:
+        return None
+    casas = Settings.FiguraCasas if casas is None else casas
+    if valores.dtype.kind == "f":
+        valores = np.round(valores, casas)
+        finitos = valores[np.isfinite(valores)]
+        if finitos.size == valores.size and np.array_equal(finitos, np.round(finitos)):
+            tipo = _tipo_inteiro(finitos)
+        elif np.array_equal(
+            np.round(finitos.astype(np.float32).astype(np.float64), casas), finitos
+        ):
+            # float32 basta quando volta ao mesmo valor nas casas pedidas
+            tipo = ("f4", np.float32)
+        else:
+            tipo = ("f8", np.float64)
+    else:
+        tipo = _tipo_inteiro(valores)
+    if tipo is None:
+        return None
+    nome, dtype = tipo
+    bdata = base64.b64encode(np.ascontiguousarray(valores, dtype=dtype).tobytes())
+    if len(bdata) >= len(json.dumps(valores.tolist())):
+        return None
+    resultado = {"dtype": nome, "bdata": bdata.decode("ascii")}
+    if valores.ndim == 2:
+        resultado["shape"] = f"{valores.shape[0]},{valores.shape[1]}"
+    return resultado
+
+
+def _compactar_valor(valor, casas: int):
+    if isinstance(valor, dict):
+        return {k: _compactar_valor(v, casas) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_compactar_valor(v, casas) for v in valor]
+    if isinstance(valor, np.ndarray):
+        codificado = buffer(valor, casas)
+        if codificado is not None:
+            return codificado
+        if valor.dtype.kind == "f":
+            return np.round(valor, casas)
+        return valor
+    if isinstance(valor, float):
+        return round(valor, casas)
+    return valor
+
+
+def compactar(figura, rotulo: str = ""):
+    """
+    Dicionário compacto da ``figura`` para o dcc.Graph. Aceita também o
+    retorno das funções de gráfico com a tabela dos detalhes (tupla com a
+    figura primeiro) e ``None``.
+    """
+    if isinstance(figura, tuple):
+        return (compactar(figura[0], rotulo), *figura[1:])
+    if figura is None:
+        return None
+    casas = Settings.FiguraCasas
+    original = figura.to_plotly_json() if isinstance(figura, go.Figure) else figura
+    resultado = {
+        **original,
+        "data": [_compactar_valor(trace, casas) for trace in original.get("data", [])],
+    }
+    if Settings.FiguraMedir:
+        antes = len(json.dumps(original, cls=PlotlyJSONEncoder))
+        depois = len(json.dumps(resultado, cls=PlotlyJSONEncoder))
+        print(f"[figura] {rotulo}: {antes} -> {depois} bytes ({depois / max(antes, 1):.0%})")
+    return resultado
+
+
+@lru_cache
+def _template_json(nome: str) -> dict:
+    return pio.templates[nome].to_plotly_json()
+
+
+def _template() -> dict:
+    return _template_json(pio.templates.default)
+
+
+def vazia() -> dict:
+    """Figura inicial dos cards atualizados por ``atualizacao``."""
+    return {"data": [], "layout": {"template": _template()}}
+
+
+def atualizacao(figura):
+    """
+    ``Patch`` que leva o card da figura anterior para ``figura`` (o dicionário
+    de ``compactar``) sem reenviar o template; ``None`` vira a figura vazia.
+    """
+    if figura is None:
+        return vazia()
+    layout = dict(figura.get("layout", {}))
+    template = layout.pop("template", None)
+    # Template diferente do padrão (não acontece hoje) vai junto
+    if template is not None and template != _template():
+        layout["template"] = template
+    patch = Patch()
+    patch["data"] = figura.get("data", [])
+    patch["layout"].update({**{chave: None for chave in LAYOUT_VARIAVEIS}, **layout})
+    return patch
@@ -0,0 +1,153 @@
+"""
+utils/filtros.py
+Filtros dos callbacks showBody sobre códigos inteiros.
+
+Na carga, ``indexar`` garante que as colunas filtráveis do detalhamento e do
+resumo sejam ``category``: os códigos da categoria são o índice do filtro e
+não ocupam memória extra. Uma combinação de filtros vira, por coluna, uma
+tabela booleana do tamanho do número de categorias indexada pelos códigos
+(``tabela[codigos]``), combinada com AND; no fim um único ``take`` monta o
+frame filtrado, em vez de uma cópia por filtro como no encadeamento de
+``FiltrarColuna``.
+
+Não guardamos um bitmap por valor: com ~1M linhas e milhares de produtos
+seriam gigabytes, e a consulta na tabela pelos códigos já custa uma leitura
+sequencial dos códigos por coluna filtrada.
+
+Para as opções em cascata dos dropdowns, ``coocorrencias`` guarda as
+combinações distintas das colunas filtráveis (só os códigos, com as mesmas
+categorias do detalhamento). ``opcoes`` responde, para o estado atual, quais
+valores de cada coluna ainda têm linhas, consultando essa tabela em vez do
+detalhamento; ``presentes`` faz o mesmo por coluna para a busca dos
+dropdowns de produto (utils/busca.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+
+COLUNAS = (
+    variables_data.Desc_Cidade,
+    variables_data.Desc_Rota,
+    variables_data.Desc_Bairro,
+    variables_data.Desc_Motorista,
+    variables_data.Desc_Supervisor,
+    variables_data.Desc_Vendedor,
+    variables_data.Desc_Grupo,
+    variables_data.Desc_Produto,  # o mesmo que Desc_Cod_Produto
+    variables_data.Desc_Placa,
+)
+
+
+def indexar(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas filtráveis presentes em ``category`` (altera ``df``)."""
+    for coluna in COLUNAS:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype("category")
+    return df
+
+
+def filtros_ativos(filtros: dict) -> dict:
+    """Remove filtros vazios ou com "Todos", como nos callbacks showBody."""
+    return {
+        coluna: valores
+        for coluna, valores in filtros.items()
+        if valores and "Todos" not in valores
+    }
+
+
+def _mascara_coluna(serie: pd.Series, valores) -> np.ndarray:
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.isin(valores).to_numpy()
+    categorias = serie.cat.categories
+    # Última posição fica False e atende o código -1 (valor nulo)
+    tabela = np.zeros(len(categorias) + 1, dtype=bool)
+    posicoes = categorias.get_indexer(pd.Index(valores))
+    tabela[posicoes[posicoes >= 0]] = True
+    return tabela[serie.cat.codes.to_numpy()]
+
+
+def mascara(df: pd.DataFrame, filtros: dict) -> np.ndarray | None:
+    """
+    Máscara das linhas que atendem ``{coluna: valores}`` (já sem "Todos",
+    ver filtros_ativos); ``None`` quando não há filtro.
+    """
+    resultado = None
+    for coluna, valores in filtros.items():
+        atual = _mascara_coluna(df[coluna], valores)
+        resultado = atual if resultado is None else resultado & atual
+    return resultado
+
+
+def filtrar(df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+    """Equivale a aplicar ``FiltrarColuna`` para cada filtro, com uma só cópia."""
+    linhas = mascara(df, filtros)
+    if linhas is None:
+        return df
+    return df.take(np.flatnonzero(linhas))
+
+
+def coocorrencias(df: pd.DataFrame, colunas=COLUNAS) -> pd.DataFrame:
+    """Combinações distintas das colunas filtráveis presentes em ``df``."""
+    presentes = [c for c in colunas if c in df.columns]
+    return df[presentes].drop_duplicates(ignore_index=True)
+
+
+def _presentes(serie: pd.Series, linhas: np.ndarray | None) -> np.ndarray:
+    """Máscara por categoria dos valores que aparecem nas ``linhas``."""
+    codigos = serie.cat.codes.to_numpy()
+    if linhas is not None:
+        codigos = codigos[linhas]
+    # Contagem por código (o -1 dos nulos cai na posição 0)
+    contagem = np.bincount(codigos + 1, minlength=len(serie.cat.categories) + 1)
+    return contagem[1:] > 0
+
+
+def presentes(tabela: pd.DataFrame, filtros: dict, coluna: str) -> np.ndarray:
+    """
+    Máscara por categoria de ``coluna`` dos valores que ainda têm linhas com
+    os outros ``filtros`` aplicados (o filtro da própria coluna é ignorado).
+    """
+    outros = {c: v for c, v in filtros.items() if c != coluna}
+    return _presentes(tabela[coluna], mascara(tabela, outros))
+
+
+def opcoes(tabela: pd.DataFrame, filtros: dict, colunas) -> dict[str, list]:
+    """
+    Valores de cada coluna que ainda têm linhas com os ``filtros`` aplicados.
+
+    O filtro da própria coluna não restringe as opções dela (dá para trocar
+    ou acrescentar valores sem limpar o filtro antes).
+    """
+    # Máscara de cada filtro calculada uma vez e combinada por coluna
+    mascaras = {c: _mascara_coluna(tabela[c], v) for c, v in filtros.items()}
+    resultado = {}
+    for coluna in colunas:
+        if coluna not in tabela.columns:
+            resultado[coluna] = []
+            continue
+        linhas = None
+        for outra, atual in mascaras.items():
+            if outra != coluna:
+                linhas = atual if linhas is None else linhas & atual
+        serie = tabela[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.categories[_presentes(serie, linhas)]
+        else:
+            valores = serie[linhas] if linhas is not None else serie
+            valores = valores.dropna().unique()
+        resultado[coluna] = sorted(valores)
+    return resultado
+
+def opcoes_dropdown(permitidas: dict, selecao: dict) -> list[list]:
+    """
+    Opções dos dropdowns das colunas de ``permitidas`` (ver ``opcoes``), na
+    mesma ordem: "Todos", os valores permitidos e os já selecionados em
+    ``selecao``, para o dropdown não perder a seleção atual.
+    """
+    resultado = []
+    for coluna, valores in permitidas.items():
+        selecionados = {v for v in selecao.get(coluna) or [] if v != "Todos"}
+        resultado.append(["Todos"] + sorted(set(valores) | selecionados))
+    return resultado
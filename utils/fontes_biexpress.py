@@ -0,0 +1,155 @@
+"""
+utils/fontes_biexpress.py
+Fontes dos dados do BIExpress para o pipeline de ingestão.
+
+Toda fonte tem ``nome`` e ``buscar(relatorio, dtDe, dtA)``, que devolve
+``(itensNFe, cargas)`` como DataFrames e registra no relatório as etapas
+busca, decodificação e frames:
+- FonteAPI: GetBIExpress (modo padrão ou colunar, ver Settings.IngestMode);
+- FonteArquivo: JSON local no formato da API (ex.: db/BITESTE.json);
+- FonteCache: envolve outra fonte com o CacheDiario; só as faixas de dias
+  sem cache chegam à fonte original.
+
+No modo colunar a leitura em streaming faz busca e decodificação juntas; o
+tempo de espera da rede vira a etapa busca e o restante, decodificação.
+"""
+
+import json
+import time
+
+import pandas as pd
+
+from assets.static import Settings
+from utils import cta_api, json_colunar
+from utils.relatorio_ingestao import RelatorioIngestao, tamanho
+
+TABELAS = ("itensNFe", "cargas")
+
+
+def lowercase_initial_keys(obj):
+    if isinstance(obj, dict):
+        return {
+            k[0].lower() + k[1:] if k else k: lowercase_initial_keys(v)
+            for k, v in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [lowercase_initial_keys(item) for item in obj]
+    else:
+        return obj
+
+
+def _decodificar(relatorio: RelatorioIngestao, conteudo: bytes, minusculo: bool) -> dict:
+    with relatorio.etapa("decodificacao") as medida:
+        retorno = json.loads(conteudo.decode("utf-8", errors="replace"))
+        if minusculo:
+            retorno = lowercase_initial_keys(retorno)
+        medida["linhas"] = sum(len(retorno.get(t) or []) for t in TABELAS)
+    return retorno
+
+
+def _montar_frames(relatorio: RelatorioIngestao, retorno: dict):
+    with relatorio.etapa("frames") as medida:
+        df_detalhamento = pd.DataFrame(retorno["itensNFe"])
+        df_resumo = pd.DataFrame(retorno["cargas"])
+        medida["linhas"] = len(df_detalhamento) + len(df_resumo)
+        medida["bytes"] = tamanho(df_detalhamento, df_resumo)
+    return df_detalhamento, df_resumo
+
+
+def _registrar_colunar(relatorio: RelatorioIngestao, leitura: dict, frames: dict):
+    """Traduz o relatório de json_colunar nas etapas do pipeline."""
+    etapas = {e["etapa"]: e for e in leitura["etapas"]}
+    parse = etapas["stream+parse"]
+    rede = parse.get("rede_s", 0.0)
+    relatorio.registrar("busca", rede, bytes=leitura["bytes"])
+    relatorio.registrar(
+        "decodificacao", max(parse["segundos"] - rede, 0.0), linhas=parse["linhas"]
+    )
+    relatorio.registrar(
+        "frames",
+        etapas["frames"]["segundos"],
+        linhas=etapas["frames"]["linhas"],
+        bytes=tamanho(*frames.values()),
+    )
+    return frames["itensNFe"], frames["cargas"]
+
+
+class FonteAPI:
+    nome = "api"
+
+    def __init__(self, id, token: str, guid: str, modo: str | None = None):
+        self.id = id
+        self.token = token
+        self.guid = guid
+        self.modo = modo or Settings.IngestMode
+
+    def buscar(self, relatorio: RelatorioIngestao, dtDe: str, dtA: str):
+        if self.modo == "colunar":
+            retorno = cta_api.GetBIExpressColunar(
+                id=self.id, token=self.token, dtDe=dtDe, dtA=dtA, guid=self.guid
+            )
+            if retorno is None:
+                raise RuntimeError("Falha ao consultar o BIExpress")
+            frames, leitura = retorno
+            return _registrar_colunar(relatorio, leitura, frames)
+
+        with relatorio.etapa("busca") as medida:
+            conteudo = cta_api.GetBIExpressConteudo(
+                id=self.id, token=self.token, dtDe=dtDe, dtA=dtA, guid=self.guid
+            )
+            if conteudo is None:
+                raise RuntimeError("Falha ao consultar o BIExpress")
+            medida["bytes"] = len(conteudo)
+        return _montar_frames(relatorio, _decodificar(relatorio, conteudo, False))
+
+
+class FonteArquivo:
+    """JSON local com chaves iniciando em maiúscula; dtDe/dtA são ignorados."""
+
+    nome = "arquivo"
+
+    def __init__(self, caminho: str, modo: str | None = None):
+        self.caminho = caminho
+        self.modo = modo or Settings.IngestMode
+
+    def buscar(self, relatorio: RelatorioIngestao, dtDe: str = "", dtA: str = ""):
+        if self.modo == "colunar":
+            frames, leitura = json_colunar.ler_arrays_colunar(
+                json_colunar.pedacos_arquivo(self.caminho), minusculo_inicial=True
+            )
+            return _registrar_colunar(relatorio, leitura, frames)
+
+        with relatorio.etapa("busca") as medida:
+            with open(self.caminho, "rb") as arquivo:
+                conteudo = arquivo.read()
+            medida["bytes"] = len(conteudo)
+        return _montar_frames(relatorio, _decodificar(relatorio, conteudo, True))
+
+
+class FonteCache:
+    """
+    Fonte com o cache diário (utils/cache_biexpress.py) na frente.
+
+    A etapa cache mede só a leitura e gravação das partições; o tempo das
+    chamadas à fonte original fica nas etapas dela. ``id`` é a pasta das
+    partições (CacheDiario.chave do id com o token da fonte).
+    """
+
+    def __init__(self, fonte, cache, id):
+        self.fonte = fonte
+        self.cache = cache
+        self.id = id
+        self.nome = f"cache+{fonte.nome}"
+
+    def buscar(self, relatorio: RelatorioIngestao, dtDe: str, dtA: str):
+        inicio = time.perf_counter()
+        antes = relatorio.total_s
+        itens, cargas, leitura = self.cache.buscar(
+            self.id, dtDe, dtA, lambda de, a: self.fonte.buscar(relatorio, de, a)
+        )
+        segundos = time.perf_counter() - inicio - (relatorio.total_s - antes)
+        relatorio.registrar(
+            "cache", segundos, linhas=len(itens) + len(cargas), bytes=tamanho(itens, cargas)
+        )
+        relatorio.extras["cache"] = leitura
+        return itens, cargas
@@ -0,0 +1,327 @@
+"""
+utils/json_colunar.py
+Leitura em streaming de respostas JSON grandes direto para colunas.
+
+Os arrays de interesse (ex.: ``itensNFe`` e ``cargas``) são lidos elemento a
+elemento: cada objeto é decodificado, distribuído em um buffer por campo e
+descartado. Nunca existe uma lista de dicts com todas as linhas; o DataFrame é
+montado a partir dos buffers (arrays tipados para números).
+"""
+
+import codecs
+import json
+import time
+import tracemalloc
+from array import array
+
+import numpy as np
+import pandas as pd
+
+_decoder = json.JSONDecoder()
+
+
+def _minusculo_inicial(chave: str) -> str:
+    return chave[0].lower() + chave[1:] if chave else chave
+
+
+class _Coluna:
+    """
+    Buffer de uma coluna: array tipado enquanto os valores permitirem.
+
+    O tipo sai do primeiro valor não nulo; os nulos antes dele só são
+    contados e entram como NaN (coluna numérica) ou None (objeto).
+    """
+
+    __slots__ = ("valores", "tipo", "nulos")
+
+    def __init__(self, linhas_antes: int):
+        # Linhas anteriores sem o campo ficam como ausentes
+        self.valores = None
+        self.tipo = None
+        self.nulos = linhas_antes
+
+    def adicionar(self, valor):
+        tipo = self.tipo
+        if tipo is None:
+            if valor is None:
+                self.nulos += 1
+                return
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                self.tipo = "objeto"
+                self.valores = [None] * self.nulos
+                self.valores.append(valor)
+                return
+            try:
+                # Inteiros com nulos antes já começam como float (NaN)
+                if isinstance(valor, int) and not self.nulos:
+                    self.valores = array("q", [valor])
+                    self.tipo = "int"
+                else:
+                    self.valores = array("d", [float("nan")]) * self.nulos
+                    self.valores.append(valor)
+                    self.tipo = "float"
+            except OverflowError:
+                # Inteiro fora do int64 (ou do double) já no primeiro valor
+                self.tipo = "objeto"
+                self.valores = [None] * self.nulos
+                self.valores.append(valor)
+            return
+        if tipo == "objeto":
+            self.valores.append(valor)
+        elif tipo == "float":
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                try:
+                    self.valores.append(valor)
+                except OverflowError:
+                    self._virar_objeto(valor)
+            elif valor is None:
+                self.valores.append(float("nan"))
+            else:
+                self._virar_objeto(valor)
+        else:
+            if isinstance(valor, int) and not isinstance(valor, bool):
+                try:
+                    self.valores.append(valor)
+                    return
+                except OverflowError:
+                    pass
+            if isinstance(valor, float) or valor is None:
+                self.valores = array("d", self.valores)
+                self.tipo = "float"
+                self.valores.append(float("nan") if valor is None else valor)
+            else:
+                self._virar_objeto(valor)
+
+    def _virar_objeto(self, valor):
+        self.valores = list(self.valores)
+        self.tipo = "objeto"
+        self.valores.append(valor)
+
+    def para_array(self) -> np.ndarray | list:
+        if self.tipo == "int":
+            return np.frombuffer(self.valores, dtype=np.int64)
+        if self.tipo == "float":
+            return np.frombuffer(self.valores, dtype=np.float64)
+        if self.tipo is None:
+            return [None] * self.nulos
+        return self.valores
+
+    def __len__(self):
+        return self.nulos if self.tipo is None else len(self.valores)
+
+
+class _ColunasArray:
+    """Acumula os objetos de um array JSON em colunas."""
+
+    def __init__(self, minusculo: bool):
+        self.colunas: dict[str, _Coluna] = {}
+        self.linhas = 0
+        self._nomes: dict[str, str] = {}
+        self._minusculo = minusculo
+
+    def adicionar(self, linha: dict):
+        for chave, valor in linha.items():
+            nome = self._nomes.get(chave)
+            if nome is None:
+                nome = _minusculo_inicial(chave) if self._minusculo else chave
+                self._nomes[chave] = nome
+            coluna = self.colunas.get(nome)
+            if coluna is None:
+                coluna = self.colunas[nome] = _Coluna(self.linhas)
+            coluna.adicionar(valor)
+        self.linhas += 1
+        # Campos ausentes nesta linha
+        if len(linha) != len(self.colunas):
+            for coluna in self.colunas.values():
+                if len(coluna) < self.linhas:
+                    coluna.adicionar(None)
+
+    def para_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {nome: coluna.para_array() for nome, coluna in self.colunas.items()},
+            copy=False,
+        )
+
+
+class _LeitorStream:
+    """Cursor sobre um fluxo de texto JSON lido sob demanda."""
+
+    def __init__(self, pedacos, relatorio: dict):
+        self._pedacos = iter(pedacos)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.fim = False
+        self._relatorio = relatorio
+
+    def _ler_mais(self) -> bool:
+        if self.fim:
+            return False
+        inicio = time.perf_counter()
+        try:
+            pedaco = next(self._pedacos)
+        except StopIteration:
+            pedaco = None
+        self._relatorio["rede_s"] += time.perf_counter() - inicio
+        if pedaco is None:
+            self.fim = True
+            texto = self._decoder.decode(b"", final=True)
+        else:
+            self._relatorio["bytes"] += len(pedaco)
+            texto = (
+                self._decoder.decode(pedaco) if isinstance(pedaco, bytes) else pedaco
+            )
+        # Descarta o trecho já consumido: o buffer guarda no máximo um valor
+        # incompleto mais o pedaço novo
+        self.buffer = self.buffer[self.pos :] + texto
+        self.pos = 0
+        return True
+
+    def proximo_char(self) -> str:
+        """Pula espaços e devolve o próximo caractere sem consumi-lo."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._ler_mais():
+                raise ValueError("JSON terminou inesperadamente")
+
+    def consumir(self, esperado: str):
+        if self.proximo_char() != esperado:
+            raise ValueError(
+                f"JSON inválido: esperado '{esperado}' na posição {self.pos}"
+            )
+        self.pos += 1
+
+    def ler_valor(self):
+        self.proximo_char()
+        while True:
+            try:
+                valor, fim = _decoder.raw_decode(self.buffer, self.pos)
+                # Um número no fim do buffer pode continuar no próximo pedaço
+                if fim < len(self.buffer) or self.fim:
+                    self.pos = fim
+                    return valor
+            except json.JSONDecodeError:
+                if self.fim:
+                    raise
+            self._ler_mais()
+
+
+def ler_arrays_colunar(
+    pedacos,
+    arrays: tuple[str, ...] = ("itensNFe", "cargas"),
+    minusculo_inicial: bool = False,
+    medir_memoria: bool = False,
+) -> tuple[dict[str, pd.DataFrame], dict]:
+    """
+    Lê um objeto JSON em streaming e devolve os ``arrays`` pedidos como DataFrames.
+
+    pedacos: iterável de bytes/str (ex.: ``response.iter_content``).
+    minusculo_inicial: converte a inicial das chaves para minúscula, como
+        ``lowercase_initial_keys`` do carregamento local.
+    medir_memoria: liga o tracemalloc para medir o pico de cada etapa
+        (deixa a leitura mais lenta; use só para diagnóstico).
+
+    Retorna ``(frames, relatorio)``. As chaves de topo que não são arrays
+    pedidos são decodificadas normalmente e devolvidas em ``relatorio["outros"]``.
+    """
+    relatorio = {"bytes": 0, "rede_s": 0.0, "etapas": [], "outros": {}}
+    if medir_memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        parar_tracemalloc = True
+    else:
+        parar_tracemalloc = False
+
+    def registrar(etapa: str, inicio: float, linhas: int):
+        pico = None
+        if tracemalloc.is_tracing():
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        relatorio["etapas"].append(
+            {
+                "etapa": etapa,
+                "segundos": time.perf_counter() - inicio,
+                "linhas": linhas,
+                "pico_bytes": pico,
+            }
+        )
+
+    try:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        leitor = _LeitorStream(pedacos, relatorio)
+        colunas: dict[str, _ColunasArray] = {}
+
+        leitor.consumir("{")
+        if leitor.proximo_char() == "}":
+            leitor.pos += 1
+        else:
+            while True:
+                chave = leitor.ler_valor()
+                if minusculo_inicial:
+                    chave = _minusculo_inicial(chave)
+                leitor.consumir(":")
+                if chave in arrays and leitor.proximo_char() == "[":
+                    destino = colunas[chave] = _ColunasArray(minusculo_inicial)
+                    leitor.pos += 1
+                    if leitor.proximo_char() == "]":
+                        leitor.pos += 1
+                    else:
+                        while True:
+                            destino.adicionar(leitor.ler_valor())
+                            separador = leitor.proximo_char()
+                            leitor.pos += 1
+                            if separador == "]":
+                                break
+                            if separador != ",":
+                                raise ValueError(
+                                    f"JSON inválido: '{separador}' dentro de {chave}"
+                                )
+                else:
+                    relatorio["outros"][chave] = leitor.ler_valor()
+                separador = leitor.proximo_char()
+                leitor.pos += 1
+                if separador == "}":
+                    break
+                if separador != ",":
+                    raise ValueError(f"JSON inválido: '{separador}' após {chave}")
+        linhas = sum(c.linhas for c in colunas.values())
+        registrar("stream+parse", inicio, linhas)
+        relatorio["etapas"][-1]["rede_s"] = relatorio["rede_s"]
+
+        inicio = time.perf_counter()
+        frames = {}
+        for nome in arrays:
+            destino = colunas.pop(nome, None)
+            frames[nome] = (
+                destino.para_dataframe() if destino is not None else pd.DataFrame()
+            )
+            del destino
+        registrar("frames", inicio, sum(len(df) for df in frames.values()))
+    finally:
+        if parar_tracemalloc:
+            tracemalloc.stop()
+
+    return frames, relatorio
+
+
+def pedacos_arquivo(caminho: str, tamanho: int = 256 * 1024):
+    """Gera o conteúdo de um arquivo em pedaços de ``tamanho`` bytes."""
+    with open(caminho, "rb") as arquivo:
+        while pedaco := arquivo.read(tamanho):
+            yield pedaco
+
+
+def imprimir_relatorio(relatorio: dict):
+    """Mostra o relatório de ``ler_arrays_colunar`` no padrão de logs do projeto."""
+    print(f"Ingestão colunar: {relatorio['bytes'] / 1024 / 1024:.1f} MB recebidos")
+    for etapa in relatorio["etapas"]:
+        pico = etapa["pico_bytes"]
+        pico_txt = f", pico {pico / 1024 / 1024:.1f} MB" if pico is not None else ""
+        print(
+            f"  {etapa['etapa']}: {etapa['segundos']:.3f}s, "
+            f"{etapa['linhas']} linhas{pico_txt}"
+        )
@@ -0,0 +1,147 @@
+"""
+utils/mapa.py
+Agregação espacial do mapa de vendas do resumo, montada uma vez na carga.
+
+O mapa mandava um ponto por item do detalhamento e um heatmap por
+coordenada de cliente; com centenas de milhares de itens só essa figura
+passava de megabytes. ``construir`` agrupa na carga:
+- pontos: uma linha por cliente (coordenada, cidade e cliente) com itens,
+  venda e cubagem somadas;
+- células: as mesmas somas numa grade de ``LADO_ZOOM / 2**zoom`` graus para
+  cada zoom de ``ZOOMS``, com o centro de massa (pelos itens) dos clientes
+  da célula.
+
+O gráfico calcula o zoom inicial pela extensão dos dados (``enquadrar``) e
+usa a grade desse zoom (``grade``): a célula fica com ~6 px de lado, bem
+abaixo do raio do heatmap (25 px), e o desenho praticamente não muda. Quando
+o usuário muda o zoom para outro ``nivel``, o resumo troca as células pelas
+da grade nova (callback no relayoutData do mapa).
+Clientes individuais só vão para o navegador quando são até
+``Settings.MapaPontos``; acima disso o mapa usa as células.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pages.cta_express.cta_express_globals import variables_data
+
+ZOOMS = tuple(range(5, 12))
+# Lado da célula no zoom 0 (graus); ~6 px em qualquer zoom
+LADO_ZOOM = 8.0
+
+LAT = variables_data.cliente_lat
+LON = variables_data.cliente_log
+MEDIDAS = (variables_data.Valor_Venda, variables_data.Valor_Cubagem)
+
+
+def pontos(df_detalhamento: pd.DataFrame) -> pd.DataFrame:
+    """Clientes com coordenada válida e as somas dos seus itens."""
+    df = df_detalhamento[
+        [
+            LAT,
+            LON,
+            variables_data.Desc_Cidade,
+            variables_data.Desc_Cliente,
+            *MEDIDAS,
+        ]
+    ]
+    df = df[(df[LAT] != 0) & (df[LON] != 0)]
+    df = df.assign(
+        **{
+            variables_data.Valor_Venda: pd.to_numeric(
+                df[variables_data.Valor_Venda], errors="coerce"
+            )
+        }
+    ).dropna(subset=[LAT, LON, variables_data.Valor_Venda])
+    return (
+        df.groupby(
+            [LAT, LON, variables_data.Desc_Cidade, variables_data.Desc_Cliente],
+            observed=True,
+        )
+        .agg(
+            itens=(LAT, "size"),
+            **{medida: (medida, "sum") for medida in MEDIDAS},
+        )
+        .reset_index()
+    )
+
+
+def celulas(df_pontos: pd.DataFrame) -> pd.DataFrame:
+    """Grades de todos os ``ZOOMS`` numa tabela só (coluna ``zoom``)."""
+    lat, lon = df_pontos[LAT].to_numpy(), df_pontos[LON].to_numpy()
+    itens = df_pontos["itens"].to_numpy()
+    pesos = pd.DataFrame(
+        {
+            "clientes": 1,
+            "itens": itens,
+            "lat_itens": lat * itens,
+            "lon_itens": lon * itens,
+            **{medida: df_pontos[medida].to_numpy() for medida in MEDIDAS},
+        }
+    )
+    grades = []
+    for zoom in ZOOMS:
+        lado = LADO_ZOOM / 2**zoom
+        chave = [
+            np.floor(lat / lado).astype(np.int64),
+            np.floor(lon / lado).astype(np.int64),
+        ]
+        grade = pesos.groupby(chave, sort=False).sum()
+        grades.append(
+            pd.DataFrame(
+                {
+                    "zoom": np.int8(zoom),
+                    LAT: grade["lat_itens"] / grade["itens"],
+                    LON: grade["lon_itens"] / grade["itens"],
+                    "clientes": grade["clientes"].astype(np.int32),
+                    "itens": grade["itens"].astype(np.int32),
+                    **{medida: grade[medida] for medida in MEDIDAS},
+                }
+            )
+        )
+    return pd.concat(grades, ignore_index=True)
+
+
+def construir(df_detalhamento: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    df_pontos = pontos(df_detalhamento)
+    return df_pontos, celulas(df_pontos)
+
+
+def para_sessao(session_id: str, df_pontos, df_celulas) -> dict:
+    return {
+        f"{session_id}_mapa_pontos": df_pontos,
+        f"{session_id}_mapa_celulas": df_celulas,
+    }
+
+
+def da_sessao(store, session_id: str, df_detalhamento: pd.DataFrame):
+    """Pontos e células da sessão; monta na hora se a carga não os gravou."""
+    df_pontos = store.get(f"{session_id}_mapa_pontos")
+    df_celulas = store.get(f"{session_id}_mapa_celulas")
+    if df_pontos is None or df_celulas is None:
+        return construir(df_detalhamento)
+    return df_pontos, df_celulas
+
+
+def enquadrar(df_pontos: pd.DataFrame) -> tuple[float, float, float]:
+    """(zoom, latitude, longitude) iniciais pela extensão dos clientes."""
+    if df_pontos.empty:
+        return 6.5, np.nan, np.nan
+    # Centro pela média dos itens, como era sobre as linhas do detalhamento
+    centro_lat = np.average(df_pontos[LAT], weights=df_pontos["itens"])
+    centro_lon = np.average(df_pontos[LON], weights=df_pontos["itens"])
+    extensao = np.ptp(df_pontos[LAT]) + np.ptp(df_pontos[LON])
+    for limite, zoom in ((0.5, 11), (1, 10), (2, 9), (4, 8), (8, 7), (15, 6)):
+        if extensao < limite:
+            return zoom, centro_lat, centro_lon
+    return 5, centro_lat, centro_lon
+
+
+def nivel(zoom: float) -> int:
+    """Grade usada no ``zoom`` do mapa (limitado a ``ZOOMS``)."""
+    return min(max(int(zoom), ZOOMS[0]), ZOOMS[-1])
+
+
+def grade(df_celulas: pd.DataFrame, zoom: float) -> pd.DataFrame:
+    """Células da grade do ``zoom``."""
+    return df_celulas[df_celulas["zoom"] == nivel(zoom)]
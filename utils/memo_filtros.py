@@ -0,0 +1,199 @@
+"""
+utils/memo_filtros.py
+Memória dos resultados por estado de filtro, por sessão.
+
+Os usuários alternam entre poucas combinações de filtro; cada troca refazia
+o filtro e todos os gráficos. ``MemoFiltros`` guarda, por sessão, em LRU:
+- o retorno do callback (gráficos e métricas) por (página, filtros, versão);
+- as posições das linhas selecionadas por (frame, filtros, versão), que
+  páginas diferentes com os mesmos filtros reaproveitam.
+Pedidos simultâneos da mesma chave (os callbacks dos cards de uma página)
+esperam o primeiro calcular em vez de calcular juntos.
+
+Filtros são normalizados (ordem das colunas e dos valores não importa;
+vazio e "Todos" são o mesmo que sem filtro). A versão vem da carga da
+sessão: recarregar os dados muda a versão e as entradas antigas deixam de
+ser usadas. Entradas saem por limite de entradas por sessão, por orçamento
+total de bytes e quando a sessão sai do SessionStore (ver ``ao_expulsar``).
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils import filtros as indice_filtros
+
+
+def normalizar(filtros: dict) -> tuple:
+    ativos = indice_filtros.filtros_ativos(filtros)
+    return tuple(
+        sorted(
+            (coluna, tuple(sorted(set(map(str, valores)))))
+            for coluna, valores in ativos.items()
+        )
+    )
+
+
+_ESCALARES = (str, bytes, int, float)
+
+
+def _tamanho_bytes(valor, vistos: set | None = None) -> int:
+    """
+    Estimativa do tamanho em memória sem serializar o valor: arrays e frames
+    pelos buffers, figuras compactadas, tuplas e listas dos callbacks somando
+    as partes; objetos com ``memoria()`` (o cubo) informam o próprio tamanho.
+    """
+    if isinstance(valor, _ESCALARES) or valor is None:
+        return sys.getsizeof(valor)
+    if isinstance(valor, np.ndarray):
+        if valor.dtype == object:
+            return valor.nbytes + sum(map(sys.getsizeof, valor.flat))
+        return valor.nbytes
+    if isinstance(valor, (pd.DataFrame, pd.Index)):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if hasattr(valor, "memoria"):
+        return valor.memoria()
+    # Contêineres compartilhados (ex.: o mesmo layout em duas figuras) contam uma vez
+    vistos = set() if vistos is None else vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        partes = [*valor.keys(), *valor.values()]
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        partes = valor
+    elif hasattr(valor, "__dict__"):
+        partes = vars(valor).values()
+    else:
+        partes = ()
+    for parte in partes:
+        # Folhas (a maior parte dos nós de uma figura) sem chamada recursiva
+        if isinstance(parte, _ESCALARES) or parte is None:
+            tamanho += sys.getsizeof(parte)
+        else:
+            tamanho += _tamanho_bytes(parte, vistos)
+    return tamanho
+
+
+class MemoFiltros:
+    """
+    max_entradas: entradas por sessão (0 desliga a memória).
+    max_bytes: orçamento somando todas as sessões.
+    versao: ``versao(session_id)`` com a versão atual dos dados da sessão.
+    """
+
+    def __init__(self, max_entradas: int = 32, max_bytes: int | None = None, versao=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.versao = versao or (lambda session_id: None)
+        self._sessoes: OrderedDict[str, OrderedDict] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Chaves sendo calculadas agora; pedidos iguais esperam o primeiro
+        self._calculando: dict[tuple, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obter(self, session_id: str, pagina: str, filtros: dict, calcular):
+        """Resultado guardado para o estado de filtro ou ``calcular()``."""
+        if not self.max_entradas:
+            return calcular()
+        chave = (pagina, normalizar(filtros), self.versao(session_id))
+        while True:
+            with self._lock:
+                entradas = self._sessoes.get(session_id)
+                if entradas is not None and chave in entradas:
+                    self.hits += 1
+                    entradas.move_to_end(chave)
+                    self._sessoes.move_to_end(session_id)
+                    return entradas[chave][0]
+                calculando = self._calculando.get((session_id, chave))
+                if calculando is None:
+                    calculando = self._calculando[(session_id, chave)] = threading.Event()
+                    self.misses += 1
+                    break
+            # Os callbacks dos cards chegam juntos com o mesmo filtro: espera o
+            # primeiro e lê o resultado dele (ou calcula, se ele falhou)
+            calculando.wait()
+
+        # Calculado fora do lock; só este pedido calcula a chave
+        try:
+            valor = calcular()
+            tamanho = _tamanho_bytes(valor)
+        except BaseException:
+            with self._lock:
+                del self._calculando[(session_id, chave)]
+            calculando.set()
+            raise
+        with self._lock:
+            del self._calculando[(session_id, chave)]
+            entradas = self._sessoes.setdefault(session_id, OrderedDict())
+            self._sessoes.move_to_end(session_id)
+            anterior = entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(entradas) > self.max_entradas:
+                self._remover_mais_antiga(session_id)
+            self._aplicar_orcamento()
+        calculando.set()
+        return valor
+
+    def filtrar(self, session_id: str, nome: str, df: pd.DataFrame, filtros: dict) -> pd.DataFrame:
+        """Como ``filtros.filtrar``, guardando as posições das linhas selecionadas."""
+        ativos = indice_filtros.filtros_ativos(filtros)
+        if not ativos:
+            return df
+        posicoes = self.obter(
+            session_id,
+            f"linhas:{nome}",
+            ativos,
+            lambda: np.flatnonzero(indice_filtros.mascara(df, ativos)),
+        )
+        return df.take(posicoes)
+
+    def remover_sessao(self, session_id: str):
+        with self._lock:
+            entradas = self._sessoes.pop(session_id, None)
+            if entradas:
+                self._bytes -= sum(tamanho for _, tamanho in entradas.values())
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "sessoes": len(self._sessoes),
+                "entradas": sum(len(e) for e in self._sessoes.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+            }
+
+    # -- internos ----------------------------------------------------------
+
+    def _remover_mais_antiga(self, session_id: str):
+        entradas = self._sessoes[session_id]
+        _, (_, tamanho) = entradas.popitem(last=False)
+        self._bytes -= tamanho
+        self.evictions += 1
+        if not entradas:
+            del self._sessoes[session_id]
+
+    def _aplicar_orcamento(self):
+        if self.max_bytes is None:
+            return
+        # Sessões menos usadas primeiro; a entrada recém-criada pode sair se
+        # sozinha já passar do orçamento
+        while self._bytes > self.max_bytes and self._sessoes:
+            self._remover_mais_antiga(next(iter(self._sessoes)))
@@ -0,0 +1,245 @@
+"""
+utils/metricas.py
+Métricas dos callbacks e dos caches em memória, no formato texto do
+Prometheus.
+
+``instrumentar_callbacks(app)`` envolve a rota de callbacks do Dash
+(/_dash-update-component), por onde passam todos os ``@app.callback`` das
+páginas, e registra por callback (o id das saídas, ``output`` no corpo da
+requisição):
+- tempo total e tempo de CPU da thread (histogramas, em segundos);
+- bytes do corpo recebido (entradas e states) e da resposta (histogramas);
+- exceções por tipo e respostas sem atualização (PreventUpdate).
+
+``publicar(server, token)`` expõe ``registro.texto()`` em /metrics: com
+token, só para ``Authorization: Bearer <token>``; sem token, só para
+requisições da própria máquina (loopback). Estatísticas
+que já existem em outros módulos (SessionStore, MemoFiltros, cliente do
+BIExpress) entram como gauges por ``registro.estatisticas``, lidas na hora
+da coleta.
+
+Cada worker do gunicorn tem o seu registro; a coleta mostra o worker que
+atendeu a requisição (rótulo ``pid``).
+"""
+
+import hmac
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+import flask
+from dash.exceptions import PreventUpdate
+
+ROTA_CALLBACKS = "_dash-update-component"
+
+# Limites dos histogramas (Prometheus: "le", acumulados)
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(rotulos: dict) -> str:
+    if not rotulos:
+        return ""
+    pares = ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos.items())
+    return "{" + pares + "}"
+
+
+def _numero(valor) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = tuple(limites)
+        self.contagens = [0] * len(self.limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.soma += valor
+        self.total += 1
+        for posicao, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[posicao] += 1
+                break
+
+    def linhas(self, nome: str, rotulos: dict) -> list[str]:
+        linhas, acumulado = [], 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            linhas.append(
+                f"{nome}_bucket{_rotulos({**rotulos, 'le': _numero(limite)})} {acumulado}"
+            )
+        linhas.append(
+            f"{nome}_bucket{_rotulos({**rotulos, 'le': '+Inf'})} {self.total}"
+        )
+        linhas.append(f"{nome}_sum{_rotulos(rotulos)} {_numero(self.soma)}")
+        linhas.append(f"{nome}_count{_rotulos(rotulos)} {self.total}")
+        return linhas
+
+
+class Registro:
+    """Histogramas e contadores por rótulos, mais gauges lidos na coleta."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tipos: dict[str, tuple[str, str, tuple]] = {}
+        self._series: dict[str, dict[tuple, object]] = defaultdict(dict)
+        self._coletores = []
+
+    def histograma(self, nome: str, ajuda: str, limites):
+        self._tipos[nome] = ("histogram", ajuda, tuple(limites))
+
+    def contador(self, nome: str, ajuda: str):
+        self._tipos[nome] = ("counter", ajuda, ())
+
+    def observar(self, nome: str, valor: float, **rotulos):
+        chave = tuple(rotulos.items())
+        with self._lock:
+            serie = self._series[nome].get(chave)
+            if serie is None:
+                serie = self._series[nome][chave] = Histograma(self._tipos[nome][2])
+            serie.observar(valor)
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        chave = tuple(rotulos.items())
+        with self._lock:
+            self._series[nome][chave] = self._series[nome].get(chave, 0) + valor
+
+    def estatisticas(self, prefixo: str, funcao, **rotulos):
+        """
+        Gauges ``{prefixo}_{chave}`` com os valores numéricos do dicionário
+        devolvido por ``funcao()`` (ex.: SessionStore.estatisticas).
+        """
+        self._coletores.append((prefixo, funcao, rotulos))
+
+    def texto(self) -> str:
+        linhas = []
+        processo = {"pid": os.getpid()}
+        with self._lock:
+            for nome, (tipo, ajuda, _) in self._tipos.items():
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+                for chave, serie in self._series[nome].items():
+                    rotulos = {**processo, **dict(chave)}
+                    if tipo == "histogram":
+                        linhas += serie.linhas(nome, rotulos)
+                    else:
+                        linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(serie)}")
+        # Gauges do mesmo nome (ex.: um por store) saem juntos, sob um TYPE
+        gauges = defaultdict(list)
+        for prefixo, funcao, rotulos in self._coletores:
+            try:
+                valores = funcao()
+            except Exception as e:
+                print(f"[metricas] {prefixo}: {e}")
+                continue
+            for chave, valor in valores.items():
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    continue
+                gauges[f"{prefixo}_{chave}"].append(
+                    f"{prefixo}_{chave}{_rotulos({**processo, **rotulos})} {_numero(valor)}"
+                )
+        for nome, series in gauges.items():
+            linhas += [f"# TYPE {nome} gauge", *series]
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+registro.histograma(
+    "serverbi_callback_segundos", "Tempo total do callback (s).", SEGUNDOS
+)
+registro.histograma(
+    "serverbi_callback_cpu_segundos",
+    "Tempo de CPU da thread no callback (s).",
+    SEGUNDOS,
+)
+registro.histograma(
+    "serverbi_callback_entrada_bytes",
+    "Bytes do corpo da requisição do callback.",
+    BYTES,
+)
+registro.histograma(
+    "serverbi_callback_saida_bytes", "Bytes da resposta JSON do callback.", BYTES
+)
+registro.contador("serverbi_callback_erros_total", "Exceções nos callbacks, por tipo.")
+registro.contador(
+    "serverbi_callback_sem_atualizacao_total", "Callbacks encerrados com PreventUpdate."
+)
+
+
+def _medir(view):
+    def medido(*args, **kwargs):
+        corpo = flask.request.get_json(silent=True) or {}
+        callback = corpo.get("output", "?")
+        entrada = flask.request.content_length or 0
+        inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+        try:
+            resposta = view(*args, **kwargs)
+        except PreventUpdate:
+            registro.incrementar(
+                "serverbi_callback_sem_atualizacao_total", callback=callback
+            )
+            raise
+        except Exception as e:
+            registro.incrementar(
+                "serverbi_callback_erros_total",
+                callback=callback,
+                tipo=type(e).__name__,
+            )
+            raise
+        finally:
+            registro.observar(
+                "serverbi_callback_segundos",
+                time.perf_counter() - inicio,
+                callback=callback,
+            )
+            registro.observar(
+                "serverbi_callback_cpu_segundos",
+                time.thread_time() - inicio_cpu,
+                callback=callback,
+            )
+            registro.observar(
+                "serverbi_callback_entrada_bytes", entrada, callback=callback
+            )
+        saida = flask.make_response(resposta).calculate_content_length() or 0
+        registro.observar("serverbi_callback_saida_bytes", saida, callback=callback)
+        return resposta
+
+    return medido
+
+
+def instrumentar_callbacks(app):
+    """Mede todos os callbacks do ``app`` na rota de atualização do Dash."""
+    endpoint = app.config.routes_pathname_prefix + ROTA_CALLBACKS
+    server = app.server
+    server.view_functions[endpoint] = _medir(server.view_functions[endpoint])
+
+
+_LOOPBACK = ("127.0.0.1", "::1")
+
+
+def _autorizado(token: str) -> bool:
+    if token:
+        enviado = flask.request.headers.get("Authorization", "")
+        return hmac.compare_digest(enviado.encode(), f"Bearer {token}".encode())
+    return flask.request.remote_addr in _LOOPBACK
+
+
+def publicar(server, token: str = "", rota: str = "/metrics"):
+    @server.route(rota)
+    def metricas():
+        if not _autorizado(token):
+            flask.abort(404)
+        return flask.Response(
+            registro.texto(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    return metricas
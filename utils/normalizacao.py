@@ -0,0 +1,72 @@
+"""
+utils/normalizacao.py
+Normalização dos DataFrames do BIExpress, executada uma vez na carga da sessão.
+
+Depois desta etapa as páginas podem assumir:
+- cliente_lat/cliente_log em float64 (texto com vírgula decimal convertido
+  com operações vetorizadas; valores inválidos viram NaN);
+- dT_Emissao em datetime64;
+- tipo_Operacao como categoria com os nomes (Venda, Bonificação, Troca).
+
+Cada conversão verifica o dtype antes, então rodar de novo sobre um frame já
+normalizado (ex.: lido do backend de sessão) não refaz o trabalho.
+"""
+
+import pandas as pd
+from pandas.api.types import (
+    is_datetime64_any_dtype,
+    is_float_dtype,
+    is_numeric_dtype,
+)
+
+from pages.cta_express.cta_express_globals import variables_data
+
+TIPOS_OPERACAO = {0: "Venda", 1: "Bonificação", 2: "Troca"}
+
+
+def decimal_virgula(serie: pd.Series) -> pd.Series:
+    """Converte texto com vírgula decimal ("-25,43") em float64."""
+    if is_float_dtype(serie):
+        return serie
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    texto = serie.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def datas(serie: pd.Series) -> pd.Series:
+    if is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie, errors="coerce")
+
+
+def tipos_operacao(serie: pd.Series) -> pd.Series:
+    """Troca os códigos de operação pelos nomes, como categoria."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    nomes = serie.map(TIPOS_OPERACAO)
+    # Códigos desconhecidos continuam aparecendo, como texto
+    nomes = nomes.where(serie.isna() | nomes.notna(), serie.astype(str))
+    categorias = list(TIPOS_OPERACAO.values()) + sorted(
+        set(nomes.dropna().unique()) - set(TIPOS_OPERACAO.values())
+    )
+    return pd.Series(
+        pd.Categorical(nomes, categories=categorias), index=serie.index, name=serie.name
+    )
+
+
+def normalizar(
+    df_detalhamento: pd.DataFrame, df_resumo: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Aplica as conversões nas colunas presentes (altera os frames recebidos)."""
+    for coluna in (variables_data.cliente_lat, variables_data.cliente_log):
+        if coluna in df_detalhamento.columns:
+            df_detalhamento[coluna] = decimal_virgula(df_detalhamento[coluna])
+    for df in (df_detalhamento, df_resumo):
+        if variables_data.DT_Emissao in df.columns:
+            df[variables_data.DT_Emissao] = datas(df[variables_data.DT_Emissao])
+    if variables_data.TP_TipoOperacao in df_detalhamento.columns:
+        df_detalhamento[variables_data.TP_TipoOperacao] = tipos_operacao(
+            df_detalhamento[variables_data.TP_TipoOperacao]
+        )
+    return df_detalhamento, df_resumo
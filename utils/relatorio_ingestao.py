@@ -0,0 +1,127 @@
+"""
+utils/relatorio_ingestao.py
+Relatório por sessão das etapas da carga (tempo, linhas e bytes).
+
+O pipeline de pages/loading/ingestao.py mede cada etapa com
+``RelatorioIngestao.etapa``. O relatório fica nos parâmetros da sessão
+(chave "ingestao"), aparece resumido na página de carregamento e, com
+SERVERBI_INGEST_RELATORIO, é acrescentado como uma linha JSON ao arquivo
+indicado para análise de tendência.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# Ordem de exibição e nomes das etapas conhecidas
+ETAPAS = {
+    "cache": "cache",
+    "busca": "busca",
+    "decodificacao": "decodificação",
+    "frames": "frames",
+    "normalizacao": "normalização",
+    "merge": "merge",
+    "compactacao": "compactação",
+    "indice": "índice",
+    "gravacao": "gravação",
+}
+
+_lock_arquivo = threading.Lock()
+
+
+def tamanho(*frames: pd.DataFrame) -> int:
+    """Bytes em memória dos DataFrames (contando o conteúdo do texto)."""
+    return sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+
+
+class RelatorioIngestao:
+    """
+    Tempo, linhas e bytes de cada etapa da carga de uma sessão.
+
+    Etapas repetidas (ex.: várias chamadas à API para faixas sem cache) são
+    acumuladas na mesma entrada, com ``vezes`` indicando quantas rodaram.
+    """
+
+    def __init__(self, session_id: str = "", fonte: str = ""):
+        self.session_id = session_id
+        self.fonte = fonte
+        self.inicio = datetime.now()
+        self.etapas: dict[str, dict] = {}
+        self.extras: dict = {}
+
+    @contextmanager
+    def etapa(self, nome: str):
+        """
+        Mede o bloco como a etapa ``nome``. O dict devolvido aceita
+        ``linhas`` e ``bytes`` para completar o registro.
+        """
+        medida = {"linhas": None, "bytes": None}
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio, **medida)
+
+    def registrar(
+        self, nome: str, segundos: float, linhas: int | None = None, bytes: int | None = None
+    ):
+        atual = self.etapas.setdefault(
+            nome,
+            {"etapa": nome, "segundos": 0.0, "linhas": None, "bytes": None, "vezes": 0},
+        )
+        atual["segundos"] += segundos
+        atual["vezes"] += 1
+        if linhas is not None:
+            atual["linhas"] = (atual["linhas"] or 0) + int(linhas)
+        if bytes is not None:
+            atual["bytes"] = (atual["bytes"] or 0) + int(bytes)
+
+    @property
+    def total_s(self) -> float:
+        return sum(e["segundos"] for e in self.etapas.values())
+
+    def para_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "fonte": self.fonte,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "total_s": round(self.total_s, 4),
+            "etapas": [
+                {**e, "segundos": round(e["segundos"], 4)} for e in self.etapas.values()
+            ],
+            **self.extras,
+        }
+
+    def imprimir(self):
+        print(
+            f"Ingestão da sessão {self.session_id} ({self.fonte}): "
+            f"{self.total_s:.2f}s"
+        )
+        for e in self.etapas.values():
+            linhas = f", {e['linhas']} linhas" if e["linhas"] is not None else ""
+            tam = f", {e['bytes'] / 1024 / 1024:.1f} MB" if e["bytes"] is not None else ""
+            vezes = f" ({e['vezes']}x)" if e["vezes"] > 1 else ""
+            print(f"  {e['etapa']}: {e['segundos']:.3f}s{vezes}{linhas}{tam}")
+
+    def exportar(self, caminho: str):
+        """Acrescenta o relatório como uma linha JSON em ``caminho``."""
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        linha = json.dumps(self.para_dict(), ensure_ascii=False, default=str)
+        with _lock_arquivo, open(caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+
+
+def texto_resumo(relatorio: dict) -> str:
+    """Uma linha com o tempo total e das etapas (para a página de carregamento)."""
+    partes = [
+        f"{ETAPAS.get(e['etapa'], e['etapa'])} {e['segundos']:.1f}s"
+        for e in relatorio.get("etapas", [])
+    ]
+    return f"Carga em {relatorio.get('total_s', 0):.1f}s: " + ", ".join(partes)
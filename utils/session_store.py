@@ -0,0 +1,430 @@
+"""
+utils/session_store.py
+Armazenamento dos DataFrames de sessão com limite de memória e expiração.
+
+As chaves seguem o padrão já usado pelas páginas (``f"{session_id}_{nome}"``),
+então o store pode ser indexado como um dict comum. A contabilização e a
+expulsão acontecem por sessão: todos os frames de uma sessão saem juntos.
+
+Com um backend (ex.: DiretorioBackend) os valores também são gravados fora do
+processo, e qualquer worker do gunicorn consegue ler a sessão criada por outro.
+A memória local passa a funcionar como cache do backend.
+"""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _tamanho_bytes(valor) -> int:
+    """Estima o tamanho em memória de um valor guardado na sessão."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    return sys.getsizeof(valor)
+
+
+def _id_sessao(chave: str) -> str:
+    # session_id é um uuid4 (sem "_"), o restante da chave é o nome do frame
+    return str(chave).split("_", 1)[0]
+
+
+def _id_valido(session_id: str) -> bool:
+    """uuid com ou sem hífens; qualquer outra coisa (ex.: ``../x``) não vira pasta."""
+    try:
+        valor = uuid.UUID(session_id)
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return session_id.lower() in (str(valor), valor.hex)
+
+
+def _dono(caminho: str) -> bool:
+    """O arquivo/pasta é deste usuário (sempre verdadeiro onde não há uid)."""
+    if not hasattr(os, "getuid"):
+        return True
+    return os.stat(caminho).st_uid == os.getuid()
+
+
+def _nome_valor(chave: str) -> str:
+    partes = str(chave).split("_", 1)
+    return partes[1] if len(partes) > 1 else "_sessao"
+
+
+class DiretorioBackend:
+    """
+    Backend de sessão em diretório local, compartilhado entre processos.
+
+    DataFrames são gravados em Feather (Arrow IPC) e lidos com memory-map;
+    os demais valores vão em pickle. Apontar ``diretorio`` para /dev/shm
+    mantém tudo em memória compartilhada.
+
+    O session_id vem da URL: só uuids viram pasta (os demais contam como
+    sessão inexistente). O diretório fica com permissão 0o700 e é recusado se
+    for de outro usuário, assim como pickles de outro usuário, porque os
+    valores que não são DataFrame voltam por pickle.load.
+
+    Interface esperada pelo SessionStore: salvar, carregar, existe, tocar,
+    remover e expirar.
+    """
+
+    def __init__(self, diretorio: str | None = None):
+        self.diretorio = diretorio or os.path.join(
+            tempfile.gettempdir(), "serverbi_sessoes"
+        )
+        os.makedirs(self.diretorio, mode=0o700, exist_ok=True)
+        if not _dono(self.diretorio):
+            raise PermissionError(
+                f"{self.diretorio} é de outro usuário; "
+                "aponte SERVERBI_SESSION_DIR para um diretório próprio"
+            )
+        # Já existia com outra permissão (ex.: versão anterior): fecha para os outros
+        if hasattr(os, "getuid") and os.stat(self.diretorio).st_mode & 0o077:
+            os.chmod(self.diretorio, 0o700)
+
+    def _pasta(self, session_id: str) -> str:
+        if not _id_valido(session_id):
+            raise ValueError(f"session_id inválido: {session_id!r}")
+        return os.path.join(self.diretorio, session_id)
+
+    def _arquivos(self, session_id: str, nome: str) -> tuple[str, str]:
+        base = os.path.join(self._pasta(session_id), nome)
+        return f"{base}.feather", f"{base}.pkl"
+
+    def salvar(self, session_id: str, nome: str, valor):
+        os.makedirs(self._pasta(session_id), exist_ok=True)
+        arq_feather, arq_pickle = self._arquivos(session_id, nome)
+        # Grava em arquivo temporário e troca de uma vez para que outro worker
+        # nunca leia um arquivo pela metade
+        if isinstance(valor, pd.DataFrame):
+            from pyarrow import feather
+
+            tmp = f"{arq_feather}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                feather.write_feather(
+                    valor.reset_index(drop=True), tmp, compression="uncompressed"
+                )
+                os.replace(tmp, arq_feather)
+                if os.path.exists(arq_pickle):
+                    os.remove(arq_pickle)
+                return
+            except Exception as e:
+                # Colunas com tipos mistos não são aceitas pelo Arrow
+                print(f"Feather indisponível para {nome}, usando pickle: {e}")
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        tmp = f"{arq_pickle}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, arq_pickle)
+        if os.path.exists(arq_feather):
+            os.remove(arq_feather)
+
+    def carregar(self, session_id: str, nome: str):
+        arq_feather, arq_pickle = self._arquivos(session_id, nome)
+        if os.path.exists(arq_feather):
+            from pyarrow import feather
+
+            tabela = feather.read_table(arq_feather, memory_map=True)
+            # split_blocks evita consolidar colunas numéricas em uma cópia nova
+            return tabela.to_pandas(split_blocks=True)
+        if os.path.exists(arq_pickle):
+            if not _dono(arq_pickle):
+                raise PermissionError(f"{arq_pickle} não foi gravado por este usuário")
+            with open(arq_pickle, "rb") as f:
+                return pickle.load(f)
+        raise KeyError(nome)
+
+    def existe(self, session_id: str, nome: str | None = None) -> bool:
+        if not _id_valido(session_id):
+            return False
+        if nome is None:
+            return os.path.isdir(self._pasta(session_id))
+        return any(os.path.exists(a) for a in self._arquivos(session_id, nome))
+
+    def modificado(self, session_id: str, nome: str) -> float | None:
+        """Horário (epoch) da última gravação de ``nome``, ou None se não existe."""
+        if not _id_valido(session_id):
+            return None
+        for arquivo in self._arquivos(session_id, nome):
+            try:
+                return os.path.getmtime(arquivo)
+            except FileNotFoundError:
+                pass
+        return None
+
+    def tocar(self, session_id: str):
+        if not _id_valido(session_id):
+            return
+        try:
+            os.utime(self._pasta(session_id))
+        except FileNotFoundError:
+            pass
+
+    def remover(self, session_id: str, nome: str | None = None):
+        if not _id_valido(session_id):
+            return
+        if nome is None:
+            shutil.rmtree(self._pasta(session_id), ignore_errors=True)
+            return
+        for arquivo in self._arquivos(session_id, nome):
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+    def expirar(self, ttl: float) -> list[str]:
+        """Remove sessões sem acesso de nenhum worker há mais de ``ttl`` segundos."""
+        limite = time.time() - ttl
+        removidas = []
+        for session_id in os.listdir(self.diretorio):
+            if not _id_valido(session_id):
+                continue
+            pasta = self._pasta(session_id)
+            try:
+                if os.path.getmtime(pasta) < limite:
+                    shutil.rmtree(pasta, ignore_errors=True)
+                    removidas.append(session_id)
+            except FileNotFoundError:
+                pass
+        return removidas
+
+
+class SessionStore:
+    """
+    Dicionário de sessões com orçamento de memória, LRU e TTL de inatividade.
+
+    max_bytes: orçamento total; None desativa o limite por memória.
+    ttl: segundos sem acesso até a sessão expirar; None desativa o TTL.
+    backend: armazenamento compartilhado opcional (ver DiretorioBackend).
+        Sessões removidas da memória pelo orçamento continuam no backend e
+        são recarregadas no próximo acesso; o TTL remove dos dois.
+    """
+
+    # Intervalo mínimo (s) entre varreduras de expiração no backend
+    INTERVALO_VARREDURA = 60
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        backend=None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._sessoes: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.RLock()
+        self._ultima_varredura = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.backend_loads = 0
+        self.evictions = 0
+        self._ao_expulsar = []
+        self._ao_acessar = []
+
+    # -- interface de dict -------------------------------------------------
+
+    def __getitem__(self, chave: str):
+        session_id = _id_sessao(chave)
+        with self._lock:
+            self._expirar()
+            sessao = self._sessoes.get(session_id)
+            if sessao is not None and chave in sessao["frames"]:
+                self.hits += 1
+                self._tocar(session_id)
+                self._avisar_acesso(session_id)
+                return sessao["frames"][chave]
+            if self.backend is not None and self.backend.existe(
+                session_id, _nome_valor(chave)
+            ):
+                valor = self.backend.carregar(session_id, _nome_valor(chave))
+                self.backend_loads += 1
+                self._guardar(chave, valor)
+                self._avisar_acesso(session_id)
+                return valor
+            self.misses += 1
+            raise KeyError(chave)
+
+    def __setitem__(self, chave: str, valor):
+        if self.backend is not None:
+            self.backend.salvar(_id_sessao(chave), _nome_valor(chave), valor)
+        with self._lock:
+            self._guardar(chave, valor)
+            self._expirar()
+
+    def __delitem__(self, chave: str):
+        session_id = _id_sessao(chave)
+        with self._lock:
+            sessao = self._sessoes.get(session_id)
+            em_memoria = sessao is not None and chave in sessao["frames"]
+            no_backend = self.backend is not None and self.backend.existe(
+                session_id, _nome_valor(chave)
+            )
+            if not em_memoria and not no_backend:
+                raise KeyError(chave)
+            if em_memoria:
+                del sessao["frames"][chave]
+                del sessao["bytes"][chave]
+                if not sessao["frames"]:
+                    del self._sessoes[session_id]
+            if no_backend:
+                self.backend.remover(session_id, _nome_valor(chave))
+
+    def __contains__(self, chave) -> bool:
+        session_id = _id_sessao(chave)
+        with self._lock:
+            self._expirar()
+            sessao = self._sessoes.get(session_id)
+            if sessao is not None and chave in sessao["frames"]:
+                return True
+            return self.backend is not None and self.backend.existe(
+                session_id, _nome_valor(chave)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(s["frames"]) for s in self._sessoes.values())
+
+    def get(self, chave: str, default=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return default
+
+    def pop(self, chave: str, *default):
+        with self._lock:
+            try:
+                valor = self[chave]
+            except KeyError:
+                if default:
+                    return default[0]
+                raise
+            del self[chave]
+            return valor
+
+    def keys(self) -> list:
+        with self._lock:
+            return [c for s in self._sessoes.values() for c in s["frames"]]
+
+    # -- operações por sessão ----------------------------------------------
+
+    def contem_sessao(self, session_id: str) -> bool:
+        with self._lock:
+            self._expirar()
+            if session_id in self._sessoes:
+                return True
+            return self.backend is not None and self.backend.existe(session_id)
+
+    def remover_sessao(self, session_id: str):
+        with self._lock:
+            self._sessoes.pop(session_id, None)
+            if self.backend is not None:
+                self.backend.remover(session_id)
+            for funcao in self._ao_expulsar:
+                funcao(session_id)
+
+    def bytes_sessao(self, session_id: str) -> int:
+        with self._lock:
+            sessao = self._sessoes.get(session_id)
+            return sum(sessao["bytes"].values()) if sessao else 0
+
+    def bytes_total(self) -> int:
+        with self._lock:
+            return sum(sum(s["bytes"].values()) for s in self._sessoes.values())
+
+    def tocar_sessao(self, session_id: str):
+        """Renova o TTL da sessão sem ler os valores."""
+        with self._lock:
+            if session_id in self._sessoes:
+                self._tocar(session_id)
+            elif self.backend is not None:
+                self.backend.tocar(session_id)
+
+    def ao_acessar(self, funcao):
+        """Registra ``funcao(session_id)`` para cada leitura de um valor da sessão."""
+        self._ao_acessar.append(funcao)
+        return funcao
+
+    def ao_expulsar(self, funcao):
+        """Registra ``funcao(session_id)`` para ser chamada quando uma sessão sai do store."""
+        self._ao_expulsar.append(funcao)
+        return funcao
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "sessoes": len(self._sessoes),
+                "bytes": self.bytes_total(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend_loads": self.backend_loads,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+            }
+
+    # -- internos ----------------------------------------------------------
+
+    def _guardar(self, chave: str, valor):
+        session_id = _id_sessao(chave)
+        sessao = self._sessoes.setdefault(
+            session_id, {"frames": {}, "bytes": {}, "acesso": 0.0}
+        )
+        sessao["frames"][chave] = valor
+        sessao["bytes"][chave] = _tamanho_bytes(valor)
+        self._tocar(session_id)
+        self._aplicar_orcamento(manter=session_id)
+
+    def _tocar(self, session_id: str):
+        self._sessoes[session_id]["acesso"] = time.monotonic()
+        self._sessoes.move_to_end(session_id)
+        if self.backend is not None:
+            self.backend.tocar(session_id)
+
+    def _avisar_acesso(self, session_id: str):
+        for funcao in self._ao_acessar:
+            funcao(session_id)
+
+    def _expulsar(self, session_id: str):
+        self._sessoes.pop(session_id, None)
+        self.evictions += 1
+        print(f"Sessão {session_id} removida da memória")
+        for funcao in self._ao_expulsar:
+            funcao(session_id)
+
+    def _expirar(self):
+        if self.ttl is None:
+            return
+        agora = time.monotonic()
+        limite = agora - self.ttl
+        # OrderedDict mantém a ordem de acesso: as mais antigas vêm primeiro
+        while self._sessoes:
+            session_id, sessao = next(iter(self._sessoes.items()))
+            if sessao["acesso"] >= limite:
+                break
+            self._expulsar(session_id)
+        if (
+            self.backend is not None
+            and agora - self._ultima_varredura > self.INTERVALO_VARREDURA
+        ):
+            self._ultima_varredura = agora
+            for session_id in self.backend.expirar(self.ttl):
+                if self._sessoes.pop(session_id, None) is not None:
+                    self.evictions += 1
+
+    def _aplicar_orcamento(self, manter: str):
+        if self.max_bytes is None:
+            return
+        while self.bytes_total() > self.max_bytes:
+            candidatos = [s for s in self._sessoes if s != manter]
+            if not candidatos:
+                break
+            self._expulsar(candidatos[0])
@@ -0,0 +1,22 @@
+"""
+utils/tempos.py
+Medição do tempo de montagem de gráficos e outras partes das páginas.
+
+``medir(rotulo)`` envolve um trecho e imprime quanto ele levou, no mesmo
+formato dos outros logs do servidor:
+
+    with tempos.medir(f"[{pageTag}] fig3 {session_id}"):
+        ...
+"""
+
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def medir(rotulo: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"{rotulo}: {(time.perf_counter() - inicio) * 1000:.0f} ms")